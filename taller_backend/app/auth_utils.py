@@ -1,14 +1,16 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, NamedTuple, Optional
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
 from . import models
-from .deps import get_db
+from .cache import principales
+from .deps import get_db, get_fabrica_sesion
 
 # ============================================================
 # CONFIGURACIÓN JWT Y PASSWORD
@@ -66,31 +68,111 @@ def autenticar_usuario(db: Session, username: str, password: str) -> Optional[mo
     return usuario
 
 
+# ------------------------------------------------------------
+# PRINCIPAL (USUARIO AUTENTICADO) EN CACHE
+# ------------------------------------------------------------
+# Validar roles en cada request sólo necesita id, activo y nombre del rol.
+# Se leen en una sola consulta y se guardan en cache.principales por
+# username, así los requests siguientes no tocan la base. crud.create_usuario
+# y crud.create_rol invalidan; cualquier otro cambio hecho por fuera se ve
+# al vencer PRINCIPAL_CACHE_TTL.
+# ------------------------------------------------------------
+
+class Principal(NamedTuple):
+    id: int
+    username: str
+    activo: bool
+    rol: str | None     # nombre del rol en minúsculas
+
+
+def cargar_principal(db: Session, username: str) -> Optional[Principal]:
+    fila = (
+        db.query(models.Usuario.id, models.Usuario.activo, models.Rol.nombre)
+        .outerjoin(models.Rol, models.Usuario.rol_id == models.Rol.id)
+        .filter(models.Usuario.username == username)
+        .first()
+    )
+    if fila is None:
+        return None
+    usuario_id, activo, rol = fila
+    return Principal(usuario_id, username, bool(activo), rol.lower() if rol else None)
+
+
+def _cargar_principal_en_sesion(crear_sesion: Callable[[], Session], username: str) -> Optional[Principal]:
+    db = crear_sesion()
+    try:
+        return cargar_principal(db, username)
+    finally:
+        db.close()
+
+
+async def obtener_principal(crear_sesion: Callable[[], Session], username: str) -> Optional[Principal]:
+    """De la cache; sólo si falla se abre una sesión (en el threadpool) y se consulta."""
+    principal = principales.obtener(username)
+    if principal is None:
+        principal = await run_in_threadpool(_cargar_principal_en_sesion, crear_sesion, username)
+        if principal is not None:
+            principales.guardar(username, principal)
+    return principal
+
+
 # ------------------------------------------------------------
 # DEPENDENCIAS DE SEGURIDAD
 # ------------------------------------------------------------
+# get_current_principal, get_current_active_principal y el role_checker de
+# roles.require_role son async y no dependen de get_db: un acierto en cache
+# no pasa por el threadpool ni abre sesión. Sólo en un fallo se abre una
+# sesión con get_fabrica_sesion, en el threadpool, porque la Session es
+# síncrona. get_current_user sí necesita el modelo completo y usa get_db.
+# ------------------------------------------------------------
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-) -> models.Usuario:
-    cred_exception = HTTPException(
+def _error_credenciales() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="No se pudo validar las credenciales",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+
+def _username_del_token(token: str) -> str:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str | None = payload.get("sub")
-        if username is None:
-            raise cred_exception
     except JWTError:
-        raise cred_exception
+        raise _error_credenciales()
 
-    usuario = obtener_usuario_por_username(db, username)
+    username: str | None = payload.get("sub")
+    if username is None:
+        raise _error_credenciales()
+    return username
+
+
+async def get_current_principal(
+    token: str = Depends(oauth2_scheme),
+    crear_sesion: Callable[[], Session] = Depends(get_fabrica_sesion),
+) -> Principal:
+    principal = await obtener_principal(crear_sesion, _username_del_token(token))
+    if principal is None:
+        raise _error_credenciales()
+    return principal
+
+
+async def get_current_active_principal(
+    principal: Principal = Depends(get_current_principal),
+) -> Principal:
+    if not principal.activo:
+        raise HTTPException(status_code=400, detail="Usuario inactivo")
+    return principal
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+) -> models.Usuario:
+    """Usuario completo (modelo ORM); para validar roles basta el Principal."""
+    username = _username_del_token(token)
+    usuario = await run_in_threadpool(obtener_usuario_por_username, db, username)
     if usuario is None:
-        raise cred_exception
+        raise _error_credenciales()
 
     return usuario
 
@@ -0,0 +1,178 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# -------------------------------------------------------------------
+# SNAPSHOTS EN MEMORIA (POR PROCESO)
+# -------------------------------------------------------------------
+# Cada snapshot guarda el resultado de un cálculo costoso junto con la
+# versión vigente al momento de calcularlo. Las escrituras que afectan al
+# resultado llaman a invalidar(), que sube la versión; así la siguiente
+# lectura recalcula. DASHBOARD_CACHE_TTL acota además la antigüedad máxima
+# (útil con varios workers, donde cada proceso tiene su propia cache).
+# -------------------------------------------------------------------
+
+DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", "30"))
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+PRINCIPAL_CACHE_MAX = int(os.getenv("PRINCIPAL_CACHE_MAX", "1024"))
+
+
+class CacheSnapshots:
+    def __init__(self, ttl_segundos: float):
+        self.ttl_segundos = ttl_segundos
+        self._version = 0
+        self._entradas = {}
+        self._locks = {}
+        self._locks_async = {}
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def _vigente(self, entrada) -> bool:
+        if entrada is None:
+            return False
+        version, generado, _ = entrada
+        return version == self._version and time.monotonic() - generado < self.ttl_segundos
+
+    def obtener(self, clave: str, calcular):
+        """
+        Devuelve el snapshot de `clave` si sigue vigente; si no, lo recalcula con
+        `calcular()`. Un solo hilo recalcula cada clave; los demás esperan su resultado.
+        """
+        if self.ttl_segundos <= 0:
+            return calcular()
+
+        entrada = self._entradas.get(clave)
+        if self._vigente(entrada):
+            return entrada[2]
+
+        with self._lock:
+            lock_clave = self._locks.setdefault(clave, threading.Lock())
+
+        with lock_clave:
+            entrada = self._entradas.get(clave)
+            if self._vigente(entrada):
+                return entrada[2]
+
+            version = self._version
+            valor = calcular()
+            self._entradas[clave] = (version, time.monotonic(), valor)
+            return valor
+
+    async def obtener_async(self, clave: str, calcular):
+        """
+        Como obtener(), para el event loop: `calcular` es una corrutina y la
+        espera es con asyncio.Lock (un threading.Lock tomado a través de un
+        await bloquearía el loop entero).
+        """
+        if self.ttl_segundos <= 0:
+            return await calcular()
+
+        entrada = self._entradas.get(clave)
+        if self._vigente(entrada):
+            return entrada[2]
+
+        lock_clave = self._locks_async.setdefault(clave, asyncio.Lock())
+        async with lock_clave:
+            entrada = self._entradas.get(clave)
+            if self._vigente(entrada):
+                return entrada[2]
+
+            version = self._version
+            valor = await calcular()
+            self._entradas[clave] = (version, time.monotonic(), valor)
+            return valor
+
+    def invalidar(self):
+        with self._lock:
+            self._version += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._version += 1
+            self._entradas.clear()
+            self._locks_async.clear()
+
+
+
+# -------------------------------------------------------------------
+# CACHE LRU CON VIGENCIA (POR PROCESO)
+# -------------------------------------------------------------------
+# Para búsquedas pequeñas y muy repetidas (p. ej. el usuario de cada
+# request). Cada entrada vence a los `ttl_segundos`; si se llega a
+# `max_entradas` se descarta la usada hace más tiempo. Lleva contadores
+# de aciertos/fallos para poder medir si vale la pena.
+# -------------------------------------------------------------------
+
+class CacheLRU:
+    def __init__(self, ttl_segundos: float, max_entradas: int):
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+        self._entradas: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+
+    @property
+    def activa(self) -> bool:
+        return self.ttl_segundos > 0 and self.max_entradas > 0
+
+    def obtener(self, clave):
+        """Valor vigente de `clave` o None."""
+        if not self.activa:
+            return None
+
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and time.monotonic() - entrada[0] < self.ttl_segundos:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return entrada[1]
+
+            if entrada is not None:
+                del self._entradas[clave]
+            self.fallos += 1
+            return None
+
+    def guardar(self, clave, valor):
+        if not self.activa:
+            return
+
+        with self._lock:
+            self._entradas[clave] = (time.monotonic(), valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self.expulsiones += 1
+
+    def invalidar(self, clave):
+        with self._lock:
+            self._entradas.pop(clave, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "max_entradas": self.max_entradas,
+                "ttl_segundos": self.ttl_segundos,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "expulsiones": self.expulsiones,
+                "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else None,
+            }
+
+
+snapshots_dashboard = CacheSnapshots(DASHBOARD_CACHE_TTL)
+
+# username -> auth_utils.Principal
+principales = CacheLRU(PRINCIPAL_CACHE_TTL, PRINCIPAL_CACHE_MAX)
@@ -1,23 +1,41 @@
 # ============================
 # IMPORTS ESTÁNDAR
 # ============================
-import re
 import io
+import json
+import os
+import random
+import time
+from collections import defaultdict
 from datetime import datetime
+from itertools import islice
+from typing import Iterable
 
 # ============================
 # IMPORTS DE TERCEROS
 # ============================
 import pdfplumber
-import openpyxl
+import pandas as pd
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, bindparam, case, func, insert, or_, select, update
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.orm import Session, joinedload, selectinload
 
 # ============================
 # IMPORTS INTERNOS
 # ============================
 from . import models, schemas
 from .auth_utils import hash_password
+from .cache import principales, snapshots_dashboard
+from .parsers import texto_oc
+from .parsers.excel import HojaOC
+from .paginacion import (
+    Pagina,
+    ParametrosPagina,
+    codificar_cursor,
+    decodificar_cursor,
+    paginar_keyset,
+)
 
 
 # ============================================================
@@ -32,8 +50,168 @@ def create_vehiculo(db: Session, vehiculo_in: schemas.VehiculoCreate):
     return db_veh
 
 
-def get_vehiculos(db: Session):
-    return db.query(models.Vehiculo).all()
+def _filtros_vehiculos(
+    marca: str | None = None,
+    tipo: str | None = None,
+    area_asignada: str | None = None,
+    q: str | None = None,
+) -> list:
+    """Condiciones del listado de vehículos (las usan get_vehiculos e iterar_vehiculos)."""
+    veh = models.Vehiculo
+    filtros = []
+    if marca:
+        filtros.append(veh.marca == marca)
+    if tipo:
+        filtros.append(veh.tipo == tipo)
+    if area_asignada:
+        filtros.append(veh.area_asignada == area_asignada)
+    if q:
+        filtros.append(or_(veh.numero_economico.ilike(f"%{q}%"), veh.placas.ilike(f"%{q}%")))
+    return filtros
+
+
+def get_vehiculos(
+    db: Session,
+    pagina: ParametrosPagina | None = None,
+    marca: str | None = None,
+    tipo: str | None = None,
+    area_asignada: str | None = None,
+    q: str | None = None,
+) -> Pagina:
+    veh = models.Vehiculo
+    query = db.query(veh).filter(*_filtros_vehiculos(marca, tipo, area_asignada, q))
+
+    return paginar_keyset(query, veh.id, {
+        "numero_economico": veh.numero_economico,
+        "placas": veh.placas,
+        "marca": veh.marca,
+        "modelo": veh.modelo,
+        "anio": veh.anio,
+    }, pagina)
+
+
+# ============================================================
+# IMPORTAR VEHICULOS (EXCEL)
+# ============================================================
+# La limpieza y validación se hace por columnas con pandas; los duplicados
+# se detectan dentro del archivo y contra la base con una sola consulta, y
+# los vehículos válidos se insertan por bloques en una transacción.
+# ============================================================
+
+COLUMNAS_IMPORTACION_VEHICULOS = [
+    "numero_economico",
+    "tipo",
+    "placas",
+    "marca",
+    "modelo",
+    "anio",
+    "numero_serie",
+    "area_asignada",
+]
+CAMPOS_OBLIGATORIOS_VEHICULO = ["numero_economico", "tipo", "placas", "marca", "modelo"]
+CAMPOS_UNICOS_VEHICULO = ["numero_economico", "placas", "numero_serie"]
+
+TAMANO_LOTE_IMPORTACION = 500
+
+
+def _limpiar_texto(serie: pd.Series) -> pd.Series:
+    """Texto sin espacios; vacíos, NaN y 'nan' quedan como nulos."""
+    texto = serie.astype("string").str.strip()
+    return texto.mask(texto.str.lower().isin(["", "nan", "none"]))
+
+
+def importar_vehiculos_desde_dataframe(db: Session, df: pd.DataFrame) -> dict:
+    for col in COLUMNAS_IMPORTACION_VEHICULOS:
+        if col not in df.columns:
+            raise HTTPException(status_code=400, detail=f"Falta la columna requerida: {col}")
+
+    df = df[COLUMNAS_IMPORTACION_VEHICULOS].reset_index(drop=True)
+    filas_excel = df.index + 2  # fila 1 es header
+
+    for col in COLUMNAS_IMPORTACION_VEHICULOS:
+        if col != "anio":
+            df[col] = _limpiar_texto(df[col])
+
+    errores = []
+    validas = pd.Series(True, index=df.index)
+
+    def descartar(mascara: pd.Series, tipo: str, mensajes: pd.Series):
+        nonlocal validas
+        mascara = mascara & validas
+        for idx in mascara[mascara].index:
+            errores.append({"fila_excel": int(filas_excel[idx]), "tipo": tipo, "error": mensajes[idx]})
+        validas = validas & ~mascara
+
+    # Campos obligatorios
+    for col in CAMPOS_OBLIGATORIOS_VEHICULO:
+        descartar(
+            df[col].isna(), "error",
+            pd.Series(f"{col} es obligatorio", index=df.index)
+        )
+
+    # Año: numérico y entero (acepta 2020 y 2020.0)
+    anio = pd.to_numeric(df["anio"], errors="coerce")
+    descartar(
+        anio.isna() | (anio % 1 != 0), "error",
+        "anio inválido: " + df["anio"].astype("string").fillna("vacío")
+    )
+    df["anio"] = anio.where(validas).astype("Int64")
+
+    # Duplicados dentro del archivo (se conserva la primera aparición)
+    for col in CAMPOS_UNICOS_VEHICULO:
+        valores = df[col].where(validas)
+        descartar(
+            valores.notna() & valores.duplicated(keep="first"), "duplicado",
+            f"{col} repetido en el archivo: " + df[col].fillna("")
+        )
+
+    # Duplicados contra la base: una sola consulta para los tres campos
+    veh = models.Vehiculo
+    candidatos = {
+        col: df.loc[validas, col].dropna().tolist() for col in CAMPOS_UNICOS_VEHICULO
+    }
+    existentes = {col: set() for col in CAMPOS_UNICOS_VEHICULO}
+    if validas.any():
+        filas = db.query(veh.numero_economico, veh.placas, veh.numero_serie).filter(or_(
+            veh.numero_economico.in_(candidatos["numero_economico"]),
+            veh.placas.in_(candidatos["placas"]),
+            veh.numero_serie.in_(candidatos["numero_serie"]),
+        ))
+        for fila in filas:
+            for col in CAMPOS_UNICOS_VEHICULO:
+                existentes[col].add(getattr(fila, col))
+
+    for col in CAMPOS_UNICOS_VEHICULO:
+        descartar(
+            df[col].notna() & df[col].isin(existentes[col]), "duplicado",
+            f"{col} ya existe: " + df[col].fillna("")
+        )
+
+    registros = (
+        df[validas].astype(object).where(df[validas].notna(), None).to_dict(orient="records")
+    )
+
+    try:
+        for inicio in range(0, len(registros), TAMANO_LOTE_IMPORTACION):
+            db.execute(insert(veh), registros[inicio:inicio + TAMANO_LOTE_IMPORTACION])
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail="Otro proceso registró vehículos con los mismos datos; vuelva a importar"
+        )
+
+    errores.sort(key=lambda e: e["fila_excel"])
+    creados = len(registros)
+    duplicados = sum(1 for e in errores if e["tipo"] == "duplicado")
+
+    return {
+        "mensaje": f"Importación completada. Creados={creados}, Duplicados={duplicados}, Errores={len(errores)}",
+        "creados": creados,
+        "duplicados": duplicados,
+        "errores": errores,
+    }
 
 
 # ============================================================
@@ -44,12 +222,35 @@ def create_orden_servicio(db: Session, os_in: schemas.OrdenServicioCreate):
     db_os = models.OrdenServicio(**os_in.model_dump())
     db.add(db_os)
     db.commit()
+    snapshots_dashboard.invalidar()
     db.refresh(db_os)
     return db_os
 
 
-def get_ordenes_servicio(db: Session):
-    return db.query(models.OrdenServicio).all()
+def get_ordenes_servicio(
+    db: Session,
+    pagina: ParametrosPagina | None = None,
+    vehiculo_id: int | None = None,
+    estado: str | None = None,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+) -> Pagina:
+    os_ = models.OrdenServicio
+    query = db.query(os_)
+
+    if vehiculo_id:
+        query = query.filter(os_.vehiculo_id == vehiculo_id)
+    if estado:
+        query = query.filter(os_.estado == estado)
+    if desde:
+        query = query.filter(os_.fecha_creacion >= desde)
+    if hasta:
+        query = query.filter(os_.fecha_creacion <= hasta)
+
+    return paginar_keyset(query, os_.id, {
+        "fecha_creacion": os_.fecha_creacion,
+        "estado": os_.estado,
+    }, pagina)
 
 
 # ============================================================
@@ -79,8 +280,24 @@ def create_solicitud_refaccion(db: Session, solicitud_in: schemas.SolicitudRefac
     return db_solicitud
 
 
-def get_solicitudes(db: Session):
-    return db.query(models.SolicitudRefaccion).all()
+def get_solicitudes(
+    db: Session,
+    pagina: ParametrosPagina | None = None,
+    orden_servicio_id: int | None = None,
+    estado: str | None = None,
+) -> Pagina:
+    sol = models.SolicitudRefaccion
+    query = db.query(sol).options(selectinload(sol.detalles))
+
+    if orden_servicio_id:
+        query = query.filter(sol.orden_servicio_id == orden_servicio_id)
+    if estado:
+        query = query.filter(sol.estado == estado)
+
+    return paginar_keyset(query, sol.id, {
+        "fecha_solicitud": sol.fecha_solicitud,
+        "estado": sol.estado,
+    }, pagina)
 
 
 # ============================================================
@@ -95,8 +312,118 @@ def create_refaccion(db: Session, refaccion_in: schemas.RefaccionCreate):
     return db_ref
 
 
-def get_refacciones(db: Session):
-    return db.query(models.Refaccion).all()
+def get_refacciones(
+    db: Session,
+    pagina: ParametrosPagina | None = None,
+    q: str | None = None,
+) -> Pagina:
+    ref = models.Refaccion
+    query = db.query(ref)
+
+    if q:
+        query = query.filter(or_(ref.clave.ilike(f"%{q}%"), ref.descripcion.ilike(f"%{q}%")))
+
+    return paginar_keyset(query, ref.id, {
+        "clave": ref.clave,
+        "descripcion": ref.descripcion,
+    }, pagina)
+
+
+def normalizar_descripciones_refaccion(db: Session) -> int:
+    """Llena descripcion_normalizada en refacciones creadas antes de la columna."""
+    ref = models.Refaccion
+    pendientes = db.query(ref.id, ref.descripcion).filter(
+        ref.descripcion_normalizada.is_(None)
+    ).all()
+
+    if pendientes:
+        tabla = ref.__table__
+        db.execute(
+            update(tabla)
+            .where(tabla.c.id == bindparam("b_id"))
+            .values(descripcion_normalizada=bindparam("b_normalizada")),
+            [
+                {"b_id": id_, "b_normalizada": models.normalizar_descripcion(descripcion)}
+                for id_, descripcion in pendientes
+            ]
+        )
+        db.commit()
+    return len(pendientes)
+
+
+def _clave_disponible(db: Session, base: str, ocupadas: set[str]) -> str:
+    """`base` si está libre; si no, base-2, base-3, ... (consulta sólo si hay choque)."""
+    if base not in ocupadas:
+        return base
+    ocupadas |= {
+        clave for (clave,) in db.query(models.Refaccion.clave).filter(
+            models.Refaccion.clave.like(f"{base}-%")
+        )
+    }
+    n = 2
+    while f"{base}-{n}" in ocupadas:
+        n += 1
+    return f"{base}-{n}"
+
+
+def resolver_refacciones(db: Session, items: list[dict]) -> list[int]:
+    """
+    Devuelve el refaccion_id de cada partida importada, en el mismo orden.
+    Se busca primero por clave y luego por descripción normalizada, todo en
+    una consulta; las refacciones que no existan se crean en un solo flush
+    (una por descripción distinta). No hace commit.
+    """
+    ref = models.Refaccion
+
+    normalizadas = [models.normalizar_descripcion(item["descripcion"]) for item in items]
+    claves = [(item.get("clave") or "").strip() or None for item in items]
+    claves_nuevas = [
+        clave or item["descripcion"][:20] for clave, item in zip(claves, items)
+    ]
+
+    por_clave, por_descripcion = {}, {}
+    if items:
+        filas = db.query(ref.id, ref.clave, ref.descripcion_normalizada).filter(or_(
+            ref.clave.in_(set(claves_nuevas)),
+            ref.descripcion_normalizada.in_(set(normalizadas)),
+        )).order_by(ref.id)
+        for id_, clave, normalizada in filas:
+            por_clave[clave] = id_
+            por_descripcion.setdefault(normalizada, id_)
+
+    def buscar(i):
+        if claves[i] in por_clave:
+            return por_clave[claves[i]]
+        return por_descripcion.get(normalizadas[i])
+
+    ocupadas = set(por_clave)
+    nuevas = {}            # descripción normalizada -> Refaccion
+    nuevas_por_clave = {}  # clave explícita -> Refaccion
+    for i, item in enumerate(items):
+        if (
+            buscar(i) is not None
+            or normalizadas[i] in nuevas
+            or claves[i] in nuevas_por_clave
+        ):
+            continue
+        clave = _clave_disponible(db, claves_nuevas[i], ocupadas)
+        ocupadas.add(clave)
+        nueva = ref(
+            clave=clave,
+            descripcion=item["descripcion"],
+            unidad_medida=item.get("unidad", "pieza"),
+        )
+        nuevas[normalizadas[i]] = nueva
+        if claves[i]:
+            nuevas_por_clave[claves[i]] = nueva
+
+    if nuevas:
+        db.add_all(nuevas.values())
+        db.flush()
+        por_descripcion.update({n: r.id for n, r in nuevas.items()})
+        por_clave.update({c: r.id for c, r in nuevas_por_clave.items()})
+
+    return [buscar(i) for i in range(len(items))]
 
 
 # ============================================================
@@ -114,6 +441,7 @@ def create_orden_compra(db: Session, oc_in: schemas.OrdenCompraCreate):
     db.commit()
     db.refresh(db_oc)
 
+    detalles = []
     for det in oc_in.detalles:
         db_det = models.OrdenCompraDetalle(
             oc_id=db_oc.id,
@@ -122,14 +450,156 @@ def create_orden_compra(db: Session, oc_in: schemas.OrdenCompraCreate):
             precio_unitario=det.precio_unitario
         )
         db.add(db_det)
+        detalles.append(db_det)
+
+    db.flush()
+    registrar_precios_oc(db, db_oc, detalles)
 
     db.commit()
+    snapshots_dashboard.invalidar()
     db.refresh(db_oc)
     return db_oc
 
 
-def get_ordenes_compra(db: Session):
-    return db.query(models.OrdenCompra).all()
+def get_ordenes_compra(
+    db: Session,
+    pagina: ParametrosPagina | None = None,
+    proveedor: str | None = None,
+    estado: str | None = None,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+) -> Pagina:
+    oc = models.OrdenCompra
+    query = db.query(oc).options(selectinload(oc.detalles))
+
+    if proveedor:
+        query = query.filter(oc.proveedor == proveedor)
+    if estado:
+        query = query.filter(oc.estado == estado)
+    if desde:
+        query = query.filter(oc.fecha_oc >= desde)
+    if hasta:
+        query = query.filter(oc.fecha_oc <= hasta)
+
+    return paginar_keyset(query, oc.id, {
+        "fecha_oc": oc.fecha_oc,
+        "proveedor": oc.proveedor,
+        "estado": oc.estado,
+    }, pagina)
+
+
+# ============================================================
+# PRECIOS DE COMPRA
+# ============================================================
+
+def registrar_precios_oc(db: Session, oc: models.OrdenCompra, detalles: list):
+    """
+    Actualiza el historial, el último precio y las estadísticas (mínimo,
+    máximo, promedio) por refacción con las partidas de una OC. Las
+    partidas deben tener id (llamar después de db.flush()). No hace
+    commit: forma parte de la transacción de la OC.
+    """
+    con_precio = sorted(
+        (d for d in detalles if d.precio_unitario is not None),
+        key=lambda d: d.id
+    )
+    if not con_precio:
+        return
+
+    fecha = oc.fecha_oc or datetime.utcnow()
+
+    db.add_all([
+        models.HistorialPrecio(
+            refaccion_id=d.refaccion_id,
+            oc_id=oc.id,
+            oc_detalle_id=d.id,
+            proveedor=oc.proveedor,
+            precio_unitario=d.precio_unitario,
+            fecha=fecha
+        )
+        for d in con_precio
+    ])
+
+    precios = {
+        p.refaccion_id: p
+        for p in db.query(models.PrecioRefaccion).filter(
+            models.PrecioRefaccion.refaccion_id.in_({d.refaccion_id for d in con_precio})
+        )
+    }
+
+    # Las partidas van en orden de id: la última de cada refacción queda como precio vigente
+    for d in con_precio:
+        precio = precios.get(d.refaccion_id)
+        if not precio:
+            precio = models.PrecioRefaccion(
+                refaccion_id=d.refaccion_id,
+                suma_precios=0,
+                num_compras=0
+            )
+            db.add(precio)
+            precios[d.refaccion_id] = precio
+
+        valor = d.precio_unitario
+        precio.ultimo_precio = valor
+        precio.ultimo_oc_id = oc.id
+        precio.ultimo_detalle_id = d.id
+        precio.fecha_actualizacion = fecha
+        precio.precio_min = valor if precio.precio_min is None else min(precio.precio_min, valor)
+        precio.precio_max = valor if precio.precio_max is None else max(precio.precio_max, valor)
+        precio.suma_precios = (precio.suma_precios or 0) + valor
+        precio.num_compras = (precio.num_compras or 0) + 1
+
+
+def recalcular_precios_refaccion(db: Session):
+    """
+    Reconstruye historial_precios y precios_refaccion a partir de todas las
+    partidas de OC existentes. Pensado para bases creadas antes de estas tablas.
+    """
+    det = models.OrdenCompraDetalle
+    oc = models.OrdenCompra
+
+    db.query(models.PrecioRefaccion).delete(synchronize_session=False)
+    db.query(models.HistorialPrecio).delete(synchronize_session=False)
+
+    db.execute(
+        insert(models.HistorialPrecio).from_select(
+            ["refaccion_id", "oc_id", "oc_detalle_id", "proveedor", "precio_unitario", "fecha"],
+            select(det.refaccion_id, det.oc_id, det.id, oc.proveedor, det.precio_unitario, oc.fecha_oc)
+            .join(oc, oc.id == det.oc_id)
+            .where(det.precio_unitario.isnot(None))
+        )
+    )
+
+    stats = (
+        select(
+            func.max(det.id).label("detalle_id"),
+            func.min(det.precio_unitario).label("precio_min"),
+            func.max(det.precio_unitario).label("precio_max"),
+            func.sum(det.precio_unitario).label("suma_precios"),
+            func.count(det.id).label("num_compras")
+        )
+        .where(det.precio_unitario.isnot(None))
+        .group_by(det.refaccion_id)
+        .subquery()
+    )
+
+    db.execute(
+        insert(models.PrecioRefaccion).from_select(
+            [
+                "refaccion_id", "ultimo_precio", "ultimo_oc_id", "ultimo_detalle_id",
+                "fecha_actualizacion", "precio_min", "precio_max", "suma_precios", "num_compras"
+            ],
+            select(
+                det.refaccion_id, det.precio_unitario, det.oc_id, det.id, oc.fecha_oc,
+                stats.c.precio_min, stats.c.precio_max, stats.c.suma_precios, stats.c.num_compras
+            )
+            .join(stats, stats.c.detalle_id == det.id)
+            .join(oc, oc.id == det.oc_id)
+        )
+    )
+
+    db.commit()
+    snapshots_dashboard.invalidar()
 
 
 # ============================================================
@@ -152,46 +622,292 @@ def agregar_existencia(db: Session, refaccion_id: int, cantidad: int):
 
 
 def descontar_existencia(db: Session, refaccion_id: int, cantidad: int):
-    inv = db.query(models.Inventario).filter(
+    _descontar_existencias(db, {refaccion_id: cantidad})
+    db.commit()
+    return db.query(models.Inventario).filter(
         models.Inventario.refaccion_id == refaccion_id
     ).first()
 
-    if not inv or inv.existencia < cantidad:
-        raise HTTPException(status_code=400, detail="No hay suficiente inventario")
 
-    inv.existencia -= cantidad
-    db.commit()
-    db.refresh(inv)
-    return inv
+def _descontar_existencias(db: Session, cantidades: dict[int, int]):
+    """
+    Descuenta existencias con un UPDATE condicional por refacción
+    (existencia >= cantidad), así dos salidas concurrentes no pueden vender
+    la misma pieza. Las filas se bloquean siempre en orden de refaccion_id
+    para evitar deadlocks entre transacciones. No hace commit.
+    """
+    tabla = models.Inventario.__table__
+
+    for refaccion_id, cantidad in sorted(cantidades.items()):
+        resultado = db.execute(
+            update(tabla)
+            .where(
+                tabla.c.refaccion_id == refaccion_id,
+                tabla.c.existencia >= cantidad
+            )
+            .values(existencia=tabla.c.existencia - cantidad)
+        )
+        if resultado.rowcount != 1:
+            raise HTTPException(
+                status_code=400,
+                detail=f"No hay suficiente inventario (refacción {refaccion_id})"
+            )
+
+
+def _asegurar_inventario(db: Session, refaccion_ids):
+    """Crea (en un solo INSERT) las filas de inventario que falten."""
+    existentes = {
+        rid for (rid,) in db.query(models.Inventario.refaccion_id).filter(
+            models.Inventario.refaccion_id.in_(refaccion_ids)
+        )
+    }
+    faltantes = [
+        {"refaccion_id": rid, "existencia": 0}
+        for rid in sorted(set(refaccion_ids) - existentes)
+    ]
+    if faltantes:
+        db.execute(insert(models.Inventario), faltantes)
+
+
+def _aplicar_entradas(db: Session, cantidades: dict[int, int]):
+    """
+    Suma existencias con un UPDATE por lote (executemany), una fila por
+    refacción. No hace commit.
+    """
+    if not cantidades:
+        return
+
+    _asegurar_inventario(db, cantidades.keys())
+
+    tabla = models.Inventario.__table__
+    db.execute(
+        update(tabla)
+        .where(tabla.c.refaccion_id == bindparam("b_refaccion_id"))
+        .values(existencia=tabla.c.existencia + bindparam("b_cantidad")),
+        [
+            {"b_refaccion_id": rid, "b_cantidad": cantidad}
+            for rid, cantidad in sorted(cantidades.items())
+        ]
+    )
+
+
+# ============================================================
+# TRANSACCIONES CON REINTENTO
+# ============================================================
+
+DB_REINTENTOS = int(os.getenv("DB_REINTENTOS", "3"))
+
+# SQLSTATE de PostgreSQL: serialization_failure y deadlock_detected
+_SQLSTATE_REINTENTABLES = {"40001", "40P01"}
+
+
+class _ConflictoConcurrencia(Exception):
+    """Otra transacción cambió los datos validados; la unidad de trabajo se repite."""
+
+
+def _es_reintentable(exc: DBAPIError) -> bool:
+    codigo = getattr(exc.orig, "pgcode", None) or getattr(exc.orig, "sqlstate", None)
+    if codigo in _SQLSTATE_REINTENTABLES:
+        return True
+    # SQLite: otro proceso/hilo tiene el archivo bloqueado para escritura
+    return "database is locked" in str(exc.orig)
+
+
+def _espera_reintento(intento: int) -> float:
+    return 0.05 * (2 ** intento) * (1 + random.random())
+
+
+def _intentar_transaccion(db: Session, escribir, intento: int) -> tuple[bool, object]:
+    """
+    Un intento de _en_transaccion: devuelve (True, resultado) si hizo commit
+    o (False, None) si revirtió y se debe reintentar. Separado del ciclo para
+    que crud_async espere entre intentos sin bloquear el event loop.
+    """
+    try:
+        resultado = escribir()
+        db.commit()
+        return True, resultado
+    except _ConflictoConcurrencia:
+        db.rollback()
+        if intento == DB_REINTENTOS:
+            raise HTTPException(
+                status_code=409,
+                detail="Conflicto de concurrencia, intente de nuevo"
+            )
+    except DBAPIError as exc:
+        db.rollback()
+        if intento == DB_REINTENTOS or not _es_reintentable(exc):
+            raise
+    except Exception:
+        db.rollback()
+        raise
+    return False, None
+
+
+def _en_transaccion(db: Session, escribir):
+    """
+    Ejecuta `escribir()` y hace commit. Si la base reporta un conflicto de
+    serialización, deadlock o bloqueo (o `escribir` lanza _ConflictoConcurrencia),
+    revierte y reintenta hasta DB_REINTENTOS veces, con espera exponencial.
+    Cualquier otro error revierte y se propaga.
+    """
+    for intento in range(DB_REINTENTOS + 1):
+        hecho, resultado = _intentar_transaccion(db, escribir, intento)
+        if hecho:
+            return resultado
+        time.sleep(_espera_reintento(intento))
 
 
 # ============================================================
 # KARDEX
 # ============================================================
 
+KARDEX_CHECKPOINT_CADA = int(os.getenv("KARDEX_CHECKPOINT_CADA", "200"))
+
+
 def registrar_movimiento(db: Session, mov: schemas.MovimientoInventarioCreate):
+    # Igual que salidas y recepciones: la fila de inventario serializa los
+    # movimientos de la refacción, así dos altas concurrentes no calculan
+    # el mismo checkpoint.
+    _asegurar_inventario(db, [mov.refaccion_id])
+    db.query(models.Inventario).filter(
+        models.Inventario.refaccion_id == mov.refaccion_id
+    ).with_for_update().one()
+
     db_mov = models.MovimientoInventario(**mov.model_dump())
     db.add(db_mov)
+    db.flush()
+    actualizar_checkpoint_kardex(db, db_mov.refaccion_id)
     db.commit()
     db.refresh(db_mov)
     return db_mov
 
 
-def get_kardex(db: Session, refaccion_id: int):
-    movimientos = db.query(models.MovimientoInventario).filter(
-        models.MovimientoInventario.refaccion_id == refaccion_id
-    ).order_by(models.MovimientoInventario.fecha.asc()).all()
+def _registrar_movimientos(db: Session, movimientos: list[dict]):
+    """
+    Inserta movimientos de kardex en lote y actualiza los checkpoints de las
+    refacciones afectadas. No hace commit.
+    """
+    if not movimientos:
+        return
 
-    saldo = 0
-    resultado = []
+    db.execute(insert(models.MovimientoInventario), movimientos)
+
+    for refaccion_id in sorted({m["refaccion_id"] for m in movimientos}):
+        actualizar_checkpoint_kardex(db, refaccion_id)
+
+
+def _delta_movimiento():
+    """Efecto de un movimiento sobre el saldo, como expresión SQL."""
+    mov = models.MovimientoInventario
+    return case(
+        (mov.tipo == "entrada", mov.cantidad),
+        (mov.tipo == "salida", -mov.cantidad),
+        else_=0
+    )
+
+
+def _movimiento_posterior_a(fecha: datetime, mov_id: int):
+    """Movimientos estrictamente después de la posición (fecha, id)."""
+    mov = models.MovimientoInventario
+    return or_(mov.fecha > fecha, and_(mov.fecha == fecha, mov.id > mov_id))
+
+
+def _ultimo_checkpoint(db: Session, refaccion_id: int, antes_de: datetime | None = None):
+    query = db.query(models.SaldoKardex).filter(models.SaldoKardex.refaccion_id == refaccion_id)
+    if antes_de is not None:
+        query = query.filter(models.SaldoKardex.fecha < antes_de)
+    return query.order_by(
+        models.SaldoKardex.fecha.desc(),
+        models.SaldoKardex.movimiento_id.desc()
+    ).first()
+
+
+def actualizar_checkpoint_kardex(db: Session, refaccion_id: int):
+    """
+    Crea un checkpoint de saldo cuando ya hay KARDEX_CHECKPOINT_CADA movimientos
+    desde el último. No hace commit: se llama dentro de la transacción del movimiento.
+    """
+    mov = models.MovimientoInventario
+    checkpoint = _ultimo_checkpoint(db, refaccion_id)
+
+    pendientes = db.query(mov).filter(mov.refaccion_id == refaccion_id)
+    if checkpoint:
+        pendientes = pendientes.filter(
+            _movimiento_posterior_a(checkpoint.fecha, checkpoint.movimiento_id)
+        )
 
-    for mov in movimientos:
-        if mov.tipo == "entrada":
-            saldo += mov.cantidad
-        elif mov.tipo == "salida":
-            saldo -= mov.cantidad
+    cantidad, delta = pendientes.with_entities(
+        func.count(mov.id),
+        func.coalesce(func.sum(_delta_movimiento()), 0)
+    ).one()
 
-        resultado.append({
+    if cantidad < KARDEX_CHECKPOINT_CADA:
+        return None
+
+    ultimo = pendientes.order_by(mov.fecha.desc(), mov.id.desc()).first()
+    nuevo = models.SaldoKardex(
+        refaccion_id=refaccion_id,
+        movimiento_id=ultimo.id,
+        fecha=ultimo.fecha,
+        saldo=(checkpoint.saldo if checkpoint else 0) + delta
+    )
+    db.add(nuevo)
+    return nuevo
+
+
+def _saldo_antes_de(db: Session, refaccion_id: int, fecha: datetime) -> int:
+    """Saldo acumulado antes de `fecha`, partiendo del checkpoint más cercano."""
+    mov = models.MovimientoInventario
+    checkpoint = _ultimo_checkpoint(db, refaccion_id, antes_de=fecha)
+
+    query = db.query(func.coalesce(func.sum(_delta_movimiento()), 0)).filter(
+        mov.refaccion_id == refaccion_id,
+        mov.fecha < fecha
+    )
+    if checkpoint:
+        query = query.filter(_movimiento_posterior_a(checkpoint.fecha, checkpoint.movimiento_id))
+
+    return (checkpoint.saldo if checkpoint else 0) + query.scalar()
+
+
+def _leer_cursor_kardex(cursor: str) -> tuple[datetime, int, int]:
+    """(fecha, id, saldo) del último movimiento de la página anterior."""
+    datos = decodificar_cursor(cursor)
+    try:
+        return datetime.fromisoformat(datos["f"]), int(datos["id"]), int(datos["s"])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def _saldo_corrido(movimientos: list, saldo: int, limit: int | None):
+    """
+    Acumula el saldo sobre `movimientos` (leídos con limit + 1) y arma el
+    cursor siguiente. Devuelve ([(movimiento, saldo), ...], siguiente_cursor).
+    """
+    hay_mas = bool(limit) and len(movimientos) > limit
+    if hay_mas:
+        movimientos = movimientos[:limit]
+
+    filas = []
+    for m in movimientos:
+        if m.tipo == "entrada":
+            saldo += m.cantidad
+        elif m.tipo == "salida":
+            saldo -= m.cantidad
+        filas.append((m, saldo))
+
+    siguiente = None
+    if hay_mas:
+        ultimo, saldo_ultimo = filas[-1]
+        siguiente = codificar_cursor({"f": ultimo.fecha.isoformat(), "id": ultimo.id, "s": saldo_ultimo})
+
+    return filas, siguiente
+
+
+def _filas_kardex(filas) -> list[dict]:
+    return [
+        {
             "id": mov.id,
             "refaccion_id": mov.refaccion_id,
             "tipo": mov.tipo,
@@ -199,9 +915,58 @@ def get_kardex(db: Session, refaccion_id: int):
             "saldo": saldo,
             "referencia": mov.referencia,
             "fecha": mov.fecha.isoformat() if mov.fecha else None
-        })
+        }
+        for mov, saldo in filas
+    ]
 
-    return resultado
+
+def _pagina_kardex(
+    db: Session,
+    refaccion_id: int,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+    cursor: str | None = None,
+    limit: int | None = None,
+):
+    """
+    Movimientos de una refacción con su saldo corrido, en orden cronológico.
+    El saldo inicial sale del cursor o del checkpoint más cercano a `desde`,
+    así que nunca se recorre el historial completo en Python.
+    Devuelve ([(movimiento, saldo), ...], siguiente_cursor).
+    """
+    mov = models.MovimientoInventario
+    query = db.query(mov).filter(mov.refaccion_id == refaccion_id)
+
+    if cursor:
+        fecha_cursor, id_cursor, saldo = _leer_cursor_kardex(cursor)
+        query = query.filter(_movimiento_posterior_a(fecha_cursor, id_cursor))
+    elif desde:
+        saldo = _saldo_antes_de(db, refaccion_id, desde)
+    else:
+        saldo = 0
+
+    if desde:
+        query = query.filter(mov.fecha >= desde)
+    if hasta:
+        query = query.filter(mov.fecha <= hasta)
+
+    query = query.order_by(mov.fecha.asc(), mov.id.asc())
+    if limit:
+        query = query.limit(limit + 1)
+
+    return _saldo_corrido(query.all(), saldo, limit)
+
+
+def get_kardex(
+    db: Session,
+    refaccion_id: int,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+    cursor: str | None = None,
+    limit: int | None = None,
+) -> Pagina:
+    filas, siguiente = _pagina_kardex(db, refaccion_id, desde, hasta, cursor, limit)
+    return Pagina(_filas_kardex(filas), siguiente)
 
 
 # ============================================================
@@ -209,42 +974,90 @@ def get_kardex(db: Session, refaccion_id: int):
 # ============================================================
 
 def create_recepcion(db: Session, recepcion_in: schemas.RecepcionCreate):
-    db_rec = models.Recepcion(
-        oc_id=recepcion_in.oc_id,
-        recibido_por=recepcion_in.recibido_por
-    )
-    db.add(db_rec)
-    db.commit()
-    db.refresh(db_rec)
-
-    for det in recepcion_in.detalles:
-        db_det = models.RecepcionDetalle(
-            recepcion_id=db_rec.id,
-            refaccion_id=det.refaccion_id,
-            cantidad_recibida=det.cantidad_recibida,
-            cantidad_oc=det.cantidad_oc
-        )
-        db.add(db_det)
-
-        agregar_existencia(db, det.refaccion_id, det.cantidad_recibida)
+    """
+    Registra una recepción como una sola unidad de trabajo: encabezado,
+    partidas, existencias y kardex se confirman juntos o no se confirma nada.
+    """
+    referencia = f"Recepción OC {recepcion_in.oc_id}"
 
-        registrar_movimiento(
-            db,
-            schemas.MovimientoInventarioCreate(
-                refaccion_id=det.refaccion_id,
-                tipo="entrada",
-                cantidad=det.cantidad_recibida,
-                referencia=f"Recepción OC {recepcion_in.oc_id}"
-            )
+    try:
+        db_rec = models.Recepcion(
+            oc_id=recepcion_in.oc_id,
+            recibido_por=recepcion_in.recibido_por
         )
-
-    db.commit()
+        db.add(db_rec)
+        db.flush()
+
+        if recepcion_in.detalles:
+            db.execute(insert(models.RecepcionDetalle), [
+                {
+                    "recepcion_id": db_rec.id,
+                    "refaccion_id": det.refaccion_id,
+                    "cantidad_recibida": det.cantidad_recibida,
+                    "cantidad_oc": det.cantidad_oc
+                }
+                for det in recepcion_in.detalles
+            ])
+
+        entradas = defaultdict(int)
+        for det in recepcion_in.detalles:
+            entradas[det.refaccion_id] += det.cantidad_recibida
+        _aplicar_entradas(db, entradas)
+
+        _registrar_movimientos(db, [
+            {
+                "refaccion_id": det.refaccion_id,
+                "tipo": "entrada",
+                "cantidad": det.cantidad_recibida,
+                "referencia": referencia
+            }
+            for det in recepcion_in.detalles
+        ])
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    snapshots_dashboard.invalidar()
     db.refresh(db_rec)
     return db_rec
 
 
-def get_recepciones(db: Session):
-    return db.query(models.Recepcion).all()
+def _filtros_recepciones(
+    oc_id: int | None = None,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+) -> list:
+    """Condiciones del listado de recepciones (JSON, exportación y versión async)."""
+    rec = models.Recepcion
+    filtros = []
+    if oc_id:
+        filtros.append(rec.oc_id == oc_id)
+    if desde:
+        filtros.append(rec.fecha_recepcion >= desde)
+    if hasta:
+        filtros.append(rec.fecha_recepcion <= hasta)
+    return filtros
+
+
+def get_recepciones(
+    db: Session,
+    pagina: ParametrosPagina | None = None,
+    oc_id: int | None = None,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+) -> Pagina:
+    rec = models.Recepcion
+    query = (
+        db.query(rec)
+        .options(selectinload(rec.detalles))
+        .filter(*_filtros_recepciones(oc_id, desde, hasta))
+    )
+
+    return paginar_keyset(query, rec.id, {
+        "fecha_recepcion": rec.fecha_recepcion,
+    }, pagina)
 
 
 # ============================================================
@@ -252,42 +1065,320 @@ def get_recepciones(db: Session):
 # ============================================================
 
 def create_salida_refaccion(db: Session, salida_in: schemas.SalidaRefaccionCreate):
+    """
+    Registra una salida en una sola transacción: primero descuenta existencias
+    con UPDATE condicional (falla completa si alguna no alcanza), luego inserta
+    partidas y kardex. Se reintenta ante conflictos de concurrencia.
+    """
+    _validar_cantidades_salida(salida_in)
+    db_salida = _en_transaccion(db, lambda: _escribir_salida(db, salida_in))
+    snapshots_dashboard.invalidar()
+    db.refresh(db_salida)
+    return db_salida
+
+
+def _validar_cantidades_salida(salida_in: schemas.SalidaRefaccionCreate):
+    for det in salida_in.detalles:
+        if det.cantidad <= 0:
+            # Igual que _error_partidas en /bulk: una cantidad negativa pasaría
+            # el UPDATE condicional y sumaría existencias
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cantidad inválida para la refacción {det.refaccion_id}"
+            )
+
+
+def _escribir_salida(db: Session, salida_in: schemas.SalidaRefaccionCreate) -> models.SalidaRefaccion:
+    """Unidad de trabajo de create_salida_refaccion (sin commit; la repite _en_transaccion)."""
+    _descontar_existencias(db, _cantidades_por_refaccion(salida_in.detalles))
+
     db_salida = models.SalidaRefaccion(
         orden_servicio_id=salida_in.orden_servicio_id,
         entregado_por=salida_in.entregado_por,
         recibido_por=salida_in.recibido_por
     )
     db.add(db_salida)
-    db.commit()
-    db.refresh(db_salida)
+    db.flush()
 
-    for det in salida_in.detalles:
-        descontar_existencia(db, det.refaccion_id, det.cantidad)
+    if salida_in.detalles:
+        db.execute(insert(models.SalidaDetalle), [
+            {
+                "salida_id": db_salida.id,
+                "refaccion_id": det.refaccion_id,
+                "cantidad": det.cantidad
+            }
+            for det in salida_in.detalles
+        ])
 
-        db_det = models.SalidaDetalle(
-            salida_id=db_salida.id,
-            refaccion_id=det.refaccion_id,
-            cantidad=det.cantidad
+    referencia = f"Salida OS {salida_in.orden_servicio_id}"
+    _registrar_movimientos(db, [
+        {
+            "refaccion_id": det.refaccion_id,
+            "tipo": "salida",
+            "cantidad": det.cantidad,
+            "referencia": referencia
+        }
+        for det in salida_in.detalles
+    ])
+    return db_salida
+
+
+def _cantidades_por_refaccion(detalles) -> dict[int, int]:
+    cantidades = defaultdict(int)
+    for det in detalles:
+        cantidades[det.refaccion_id] += det.cantidad
+    return cantidades
+
+
+def _filtros_salidas(
+    orden_servicio_id: int | None = None,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+) -> list:
+    """Condiciones del listado de salidas (JSON, exportación y versión async)."""
+    sal = models.SalidaRefaccion
+    filtros = []
+    if orden_servicio_id:
+        filtros.append(sal.orden_servicio_id == orden_servicio_id)
+    if desde:
+        filtros.append(sal.fecha_salida >= desde)
+    if hasta:
+        filtros.append(sal.fecha_salida <= hasta)
+    return filtros
+
+
+def get_salidas(
+    db: Session,
+    pagina: ParametrosPagina | None = None,
+    orden_servicio_id: int | None = None,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+) -> Pagina:
+    sal = models.SalidaRefaccion
+    query = (
+        db.query(sal)
+        .options(selectinload(sal.detalles))
+        .filter(*_filtros_salidas(orden_servicio_id, desde, hasta))
+    )
+
+    return paginar_keyset(query, sal.id, {
+        "fecha_salida": sal.fecha_salida,
+    }, pagina)
+
+
+# ============================================================
+# OPERACIONES EN LOTE
+# ============================================================
+# Los endpoints /bulk reciben arreglos. Todo el arreglo se valida con una
+# consulta por tipo de referencia (no una por elemento), los elementos
+# válidos se guardan juntos en una sola transacción y cada elemento recibe
+# su propio resultado: {indice, ok, id} o {indice, ok: false, error}.
+# ============================================================
+
+TAMANO_MAXIMO_LOTE = 1000
+
+
+def _validar_tamano_lote(items: list):
+    if len(items) > TAMANO_MAXIMO_LOTE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"El lote excede el máximo de {TAMANO_MAXIMO_LOTE} elementos"
         )
-        db.add(db_det)
 
-        registrar_movimiento(
-            db,
-            schemas.MovimientoInventarioCreate(
-                refaccion_id=det.refaccion_id,
-                tipo="salida",
-                cantidad=det.cantidad,
-                referencia=f"Salida OS {salida_in.orden_servicio_id}"
+
+def _ids_existentes(db: Session, columna_id, ids) -> set[int]:
+    ids = set(ids)
+    if not ids:
+        return set()
+    return {i for (i,) in db.query(columna_id).filter(columna_id.in_(ids))}
+
+
+def _error_partidas(detalles, refacciones_existentes: set[int]) -> str | None:
+    for det in detalles:
+        if det.cantidad <= 0:
+            return f"Cantidad inválida para la refacción {det.refaccion_id}"
+        if det.refaccion_id not in refacciones_existentes:
+            return f"La refacción {det.refaccion_id} no existe"
+    return None
+
+
+def _resultados_lote(total: int, errores: dict[int, str], ids: dict[int, int]) -> list[dict]:
+    return [
+        {"indice": i, "ok": False, "id": None, "error": errores[i]}
+        if i in errores else
+        {"indice": i, "ok": True, "id": ids[i], "error": None}
+        for i in range(total)
+    ]
+
+
+def create_ordenes_servicio_bulk(db: Session, ordenes_in: list[schemas.OrdenServicioCreate]):
+    _validar_tamano_lote(ordenes_in)
+
+    vehiculos = _ids_existentes(db, models.Vehiculo.id, [o.vehiculo_id for o in ordenes_in])
+    errores = {
+        i: f"El vehículo {os_in.vehiculo_id} no existe"
+        for i, os_in in enumerate(ordenes_in)
+        if os_in.vehiculo_id not in vehiculos
+    }
+    aceptadas = [i for i in range(len(ordenes_in)) if i not in errores]
+
+    def escribir():
+        nuevas = [models.OrdenServicio(**ordenes_in[i].model_dump()) for i in aceptadas]
+        db.add_all(nuevas)
+        db.flush()
+        return {i: os_.id for i, os_ in zip(aceptadas, nuevas)}
+
+    ids = _en_transaccion(db, escribir) if aceptadas else {}
+    if ids:
+        snapshots_dashboard.invalidar()
+    return _resultados_lote(len(ordenes_in), errores, ids)
+
+
+def create_solicitudes_bulk(db: Session, solicitudes_in: list[schemas.SolicitudRefaccionCreate]):
+    _validar_tamano_lote(solicitudes_in)
+
+    ordenes = _ids_existentes(
+        db, models.OrdenServicio.id, [s.orden_servicio_id for s in solicitudes_in]
+    )
+    refacciones = _ids_existentes(
+        db, models.Refaccion.id, [d.refaccion_id for s in solicitudes_in for d in s.detalles]
+    )
+
+    errores = {}
+    for i, sol_in in enumerate(solicitudes_in):
+        if sol_in.orden_servicio_id not in ordenes:
+            errores[i] = f"La orden de servicio {sol_in.orden_servicio_id} no existe"
+        elif error := _error_partidas(sol_in.detalles, refacciones):
+            errores[i] = error
+    aceptadas = [i for i in range(len(solicitudes_in)) if i not in errores]
+
+    def escribir():
+        nuevas = [
+            models.SolicitudRefaccion(
+                orden_servicio_id=solicitudes_in[i].orden_servicio_id,
+                solicitante=solicitudes_in[i].solicitante,
+                estado=solicitudes_in[i].estado or "pendiente"
             )
-        )
+            for i in aceptadas
+        ]
+        db.add_all(nuevas)
+        db.flush()
+
+        detalles = [
+            {"solicitud_id": sol.id, "refaccion_id": det.refaccion_id, "cantidad": det.cantidad}
+            for i, sol in zip(aceptadas, nuevas)
+            for det in solicitudes_in[i].detalles
+        ]
+        if detalles:
+            db.execute(insert(models.SolicitudDetalle), detalles)
+        return {i: sol.id for i, sol in zip(aceptadas, nuevas)}
+
+    ids = _en_transaccion(db, escribir) if aceptadas else {}
+    return _resultados_lote(len(solicitudes_in), errores, ids)
 
-    db.commit()
-    db.refresh(db_salida)
-    return db_salida
 
+def create_salidas_bulk(db: Session, salidas_in: list[schemas.SalidaRefaccionCreate]):
+    """
+    Registra varias salidas en una transacción. Las existencias se asignan en
+    orden de llegada: una salida que ya no alcanza con lo que dejaron las
+    anteriores del mismo lote se rechaza y las demás continúan.
+    """
+    _validar_tamano_lote(salidas_in)
+
+    ordenes = _ids_existentes(
+        db, models.OrdenServicio.id, [s.orden_servicio_id for s in salidas_in]
+    )
+    refacciones = _ids_existentes(
+        db, models.Refaccion.id, [d.refaccion_id for s in salidas_in for d in s.detalles]
+    )
+
+    errores_validacion = {}
+    for i, sal_in in enumerate(salidas_in):
+        if sal_in.orden_servicio_id not in ordenes:
+            errores_validacion[i] = f"La orden de servicio {sal_in.orden_servicio_id} no existe"
+        elif error := _error_partidas(sal_in.detalles, refacciones):
+            errores_validacion[i] = error
+
+    cantidades = {
+        i: _cantidades_por_refaccion(sal_in.detalles)
+        for i, sal_in in enumerate(salidas_in)
+        if i not in errores_validacion
+    }
+    requeridas = sorted({rid for c in cantidades.values() for rid in c})
+
+    def escribir():
+        errores = dict(errores_validacion)
+
+        # Existencias leídas (y bloqueadas en PostgreSQL) en orden de refaccion_id
+        inv = models.Inventario
+        disponible = dict(
+            db.query(inv.refaccion_id, inv.existencia)
+            .filter(inv.refaccion_id.in_(requeridas))
+            .order_by(inv.refaccion_id)
+            .with_for_update()
+            .all()
+        ) if requeridas else {}
+
+        totales = defaultdict(int)
+        aceptadas = []
+        for i, por_refaccion in cantidades.items():
+            faltante = next(
+                (rid for rid, c in sorted(por_refaccion.items()) if disponible.get(rid, 0) < c),
+                None
+            )
+            if faltante is not None:
+                errores[i] = f"No hay suficiente inventario (refacción {faltante})"
+                continue
+            for rid, c in por_refaccion.items():
+                disponible[rid] -= c
+                totales[rid] += c
+            aceptadas.append(i)
+
+        if not aceptadas:
+            return errores, {}
 
-def get_salidas(db: Session):
-    return db.query(models.SalidaRefaccion).all()
+        try:
+            _descontar_existencias(db, totales)
+        except HTTPException:
+            # Otra transacción consumió existencias entre la lectura y el UPDATE
+            raise _ConflictoConcurrencia()
+
+        nuevas = [
+            models.SalidaRefaccion(
+                orden_servicio_id=salidas_in[i].orden_servicio_id,
+                entregado_por=salidas_in[i].entregado_por,
+                recibido_por=salidas_in[i].recibido_por
+            )
+            for i in aceptadas
+        ]
+        db.add_all(nuevas)
+        db.flush()
+
+        detalles, movimientos = [], []
+        for i, sal in zip(aceptadas, nuevas):
+            referencia = f"Salida OS {sal.orden_servicio_id}"
+            for det in salidas_in[i].detalles:
+                detalles.append({
+                    "salida_id": sal.id,
+                    "refaccion_id": det.refaccion_id,
+                    "cantidad": det.cantidad
+                })
+                movimientos.append({
+                    "refaccion_id": det.refaccion_id,
+                    "tipo": "salida",
+                    "cantidad": det.cantidad,
+                    "referencia": referencia
+                })
+
+        if detalles:
+            db.execute(insert(models.SalidaDetalle), detalles)
+        _registrar_movimientos(db, movimientos)
+        return errores, {i: sal.id for i, sal in zip(aceptadas, nuevas)}
+
+    errores, ids = _en_transaccion(db, escribir)
+    if ids:
+        snapshots_dashboard.invalidar()
+    return _resultados_lote(len(salidas_in), errores, ids)
 
 
 # ============================================================
@@ -298,6 +1389,34 @@ def get_inventario(db: Session):
     return db.query(models.Inventario).all()
 
 
+def get_inventario_total(db: Session) -> int:
+    return db.query(func.coalesce(func.sum(models.Inventario.existencia), 0)).scalar()
+
+
+def actualizar_umbrales_inventario(
+    db: Session,
+    refaccion_id: int,
+    umbrales: schemas.InventarioUmbrales,
+):
+    if not db.get(models.Refaccion, refaccion_id):
+        return None
+
+    inv = db.query(models.Inventario).filter(
+        models.Inventario.refaccion_id == refaccion_id
+    ).first()
+
+    if not inv:
+        inv = models.Inventario(refaccion_id=refaccion_id, existencia=0)
+        db.add(inv)
+
+    inv.stock_minimo = umbrales.stock_minimo
+    inv.stock_maximo = umbrales.stock_maximo
+    db.commit()
+    snapshots_dashboard.invalidar()
+    db.refresh(inv)
+    return inv
+
+
 def get_inventario_detallado(db: Session):
     inventario = db.query(models.Inventario).all()
     return [
@@ -312,25 +1431,28 @@ def get_inventario_detallado(db: Session):
     ]
 
 
-def get_kardex_detallado(db: Session, refaccion_id: int):
-    movimientos = db.query(models.MovimientoInventario).filter(
-        models.MovimientoInventario.refaccion_id == refaccion_id
-    ).order_by(models.MovimientoInventario.fecha.asc()).all()
+def get_kardex_detallado(
+    db: Session,
+    refaccion_id: int,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+    cursor: str | None = None,
+    limit: int | None = None,
+) -> Pagina:
+    filas, siguiente = _pagina_kardex(db, refaccion_id, desde, hasta, cursor, limit)
 
-    saldo = 0
-    resultado = []
-
-    for mov in movimientos:
-        saldo += mov.cantidad if mov.tipo == "entrada" else -mov.cantidad
-        resultado.append({
+    resultado = [
+        {
             "fecha": mov.fecha,
             "tipo": mov.tipo,
             "cantidad": mov.cantidad,
             "saldo": saldo,
             "referencia": mov.referencia
-        })
+        }
+        for mov, saldo in filas
+    ]
 
-    return resultado
+    return Pagina(resultado, siguiente)
 
 
 def get_consumo_por_os(db: Session, os_id: int):
@@ -355,27 +1477,110 @@ def get_consumo_por_os(db: Session, os_id: int):
     return resultado
 
 
+def _cantidades_oc(db: Session, oc_ids: list[int] | None = None, solo_abiertas: bool = False):
+    """
+    Cantidad pedida vs. recibida por (OC, refacción), agregadas en SQL:
+    partidas de OC agrupadas LEFT JOIN recepciones agrupadas.
+    """
+    det = models.OrdenCompraDetalle
+    rec = models.Recepcion
+    rec_det = models.RecepcionDetalle
+    oc = models.OrdenCompra
+
+    pedido = select(
+        det.oc_id,
+        det.refaccion_id,
+        func.sum(det.cantidad).label("cantidad_oc")
+    ).group_by(det.oc_id, det.refaccion_id)
+
+    recibido = select(
+        rec.oc_id,
+        rec_det.refaccion_id,
+        func.sum(rec_det.cantidad_recibida).label("recibido")
+    ).join(rec, rec.id == rec_det.recepcion_id).group_by(rec.oc_id, rec_det.refaccion_id)
+
+    if oc_ids is not None:
+        pedido = pedido.where(det.oc_id.in_(oc_ids))
+        recibido = recibido.where(rec.oc_id.in_(oc_ids))
+
+    pedido = pedido.subquery()
+    recibido = recibido.subquery()
+    total_recibido = func.coalesce(recibido.c.recibido, 0)
+
+    query = (
+        db.query(
+            pedido.c.oc_id,
+            oc.proveedor,
+            oc.estado,
+            oc.fecha_oc,
+            pedido.c.refaccion_id,
+            models.Refaccion.clave,
+            models.Refaccion.descripcion,
+            pedido.c.cantidad_oc,
+            total_recibido.label("recibido")
+        )
+        .select_from(pedido)
+        .join(oc, oc.id == pedido.c.oc_id)
+        .join(models.Refaccion, models.Refaccion.id == pedido.c.refaccion_id)
+        .outerjoin(
+            recibido,
+            and_(
+                recibido.c.oc_id == pedido.c.oc_id,
+                recibido.c.refaccion_id == pedido.c.refaccion_id
+            )
+        )
+    )
+
+    if solo_abiertas:
+        query = query.filter(pedido.c.cantidad_oc > total_recibido)
+
+    return query.order_by(pedido.c.oc_id, pedido.c.refaccion_id)
+
+
 def get_diferencias_oc(db: Session, oc_id: int):
-    oc = db.query(models.OrdenCompra).filter(models.OrdenCompra.id == oc_id).first()
-    recepciones = db.query(models.Recepcion).filter(models.Recepcion.oc_id == oc_id).all()
+    return [
+        {
+            "refaccion_id": fila.refaccion_id,
+            "clave": fila.clave,
+            "descripcion": fila.descripcion,
+            "cantidad_oc": fila.cantidad_oc,
+            "recibido": fila.recibido,
+            "diferencia": fila.cantidad_oc - fila.recibido
+        }
+        for fila in _cantidades_oc(db, [oc_id])
+    ]
 
-    resultado = []
 
-    for det in oc.detalles:
-        recibido_total = sum(
-            d.cantidad_recibida
-            for rec in recepciones
-            for d in rec.detalles
-            if d.refaccion_id == det.refaccion_id
-        )
+def get_pendientes_oc(db: Session, oc_ids: list[int] | None = None):
+    """
+    Cantidades pendientes de recibir, agrupadas por OC. Sin `oc_ids` se
+    revisan todas las OC que no están cerradas. Sólo se listan partidas con
+    pendiente mayor a cero.
+    """
+    query = _cantidades_oc(db, oc_ids, solo_abiertas=True)
+    if oc_ids is None:
+        query = query.filter(models.OrdenCompra.estado != "cerrada")
 
-        resultado.append({
-            "refaccion_id": det.refaccion_id,
-            "clave": det.refaccion.clave,
-            "descripcion": det.refaccion.descripcion,
-            "cantidad_oc": det.cantidad,
-            "recibido": recibido_total,
-            "diferencia": det.cantidad - recibido_total
+    resultado = []
+    actual = None
+    for fila in query:
+        if actual is None or actual["oc_id"] != fila.oc_id:
+            actual = {
+                "oc_id": fila.oc_id,
+                "proveedor": fila.proveedor,
+                "estado": fila.estado,
+                "fecha_oc": fila.fecha_oc,
+                "partidas": []
+            }
+            resultado.append(actual)
+
+        actual["partidas"].append({
+            "refaccion_id": fila.refaccion_id,
+            "clave": fila.clave,
+            "descripcion": fila.descripcion,
+            "cantidad_oc": fila.cantidad_oc,
+            "recibido": fila.recibido,
+            "pendiente": fila.cantidad_oc - fila.recibido
         })
 
     return resultado
@@ -397,125 +1602,390 @@ def get_compras_por_proveedor(db: Session, proveedor: str):
     ]
 
 
-def get_refacciones_mas_usadas(db: Session):
-    salidas = db.query(models.SalidaDetalle).all()
+def get_refacciones_mas_usadas(
+    db: Session,
+    limit: int | None = None,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+    vehiculo_id: int | None = None,
+    area_asignada: str | None = None,
+):
+    """
+    Refacciones con mayor cantidad entregada en salidas, agregadas en SQL
+    (GROUP BY + ORDER BY + LIMIT) y unidas al catálogo en la misma consulta.
+    """
+    total = func.sum(models.SalidaDetalle.cantidad).label("total_usado")
+
+    query = (
+        db.query(
+            models.Refaccion.id,
+            models.Refaccion.clave,
+            models.Refaccion.descripcion,
+            total
+        )
+        .select_from(models.SalidaDetalle)
+        .join(models.Refaccion, models.Refaccion.id == models.SalidaDetalle.refaccion_id)
+    )
+
+    if desde or hasta or vehiculo_id or area_asignada:
+        query = query.join(
+            models.SalidaRefaccion,
+            models.SalidaRefaccion.id == models.SalidaDetalle.salida_id
+        )
+    if desde:
+        query = query.filter(models.SalidaRefaccion.fecha_salida >= desde)
+    if hasta:
+        query = query.filter(models.SalidaRefaccion.fecha_salida <= hasta)
+    if vehiculo_id or area_asignada:
+        query = query.join(
+            models.OrdenServicio,
+            models.OrdenServicio.id == models.SalidaRefaccion.orden_servicio_id
+        )
+    if vehiculo_id:
+        query = query.filter(models.OrdenServicio.vehiculo_id == vehiculo_id)
+    if area_asignada:
+        query = query.join(
+            models.Vehiculo,
+            models.Vehiculo.id == models.OrdenServicio.vehiculo_id
+        ).filter(models.Vehiculo.area_asignada == area_asignada)
+
+    query = query.group_by(
+        models.Refaccion.id,
+        models.Refaccion.clave,
+        models.Refaccion.descripcion
+    ).order_by(total.desc(), models.Refaccion.id.asc())
+
+    if limit:
+        query = query.limit(limit)
 
-    conteo = {}
-    for det in salidas:
-        conteo[det.refaccion_id] = conteo.get(det.refaccion_id, 0) + det.cantidad
+    return [
+        {
+            "refaccion_id": fila.id,
+            "clave": fila.clave,
+            "descripcion": fila.descripcion,
+            "total_usado": fila.total_usado
+        }
+        for fila in query
+    ]
 
-    resultado = []
-    for ref_id, total in conteo.items():
-        ref = db.query(models.Refaccion).filter(models.Refaccion.id == ref_id).first()
-        resultado.append({
-            "refaccion_id": ref_id,
-            "clave": ref.clave,
-            "descripcion": ref.descripcion,
-            "total_usado": total
-        })
 
-    return sorted(resultado, key=lambda x: x["total_usado"], reverse=True)
+def _condicion_bajo_inventario(minimo: int):
+    """Existencia en o por debajo del mínimo propio de la refacción (o del global)."""
+    inv = models.Inventario
+    return inv.existencia <= func.coalesce(inv.stock_minimo, minimo)
 
 
 def get_bajo_inventario(db: Session, minimo: int = 5):
-    inventario = db.query(models.Inventario).all()
+    inv = models.Inventario
+    filas = (
+        db.query(
+            inv.refaccion_id,
+            models.Refaccion.clave,
+            models.Refaccion.descripcion,
+            inv.existencia,
+            inv.stock_minimo,
+            inv.stock_maximo
+        )
+        .join(models.Refaccion, models.Refaccion.id == inv.refaccion_id)
+        .filter(_condicion_bajo_inventario(minimo))
+        .order_by(inv.existencia.asc(), inv.refaccion_id.asc())
+    )
 
     return [
         {
-            "refaccion_id": item.refaccion_id,
-            "clave": item.refaccion.clave,
-            "descripcion": item.refaccion.descripcion,
-            "existencia": item.existencia
+            "refaccion_id": fila.refaccion_id,
+            "clave": fila.clave,
+            "descripcion": fila.descripcion,
+            "existencia": fila.existencia,
+            "stock_minimo": fila.stock_minimo if fila.stock_minimo is not None else minimo,
+            "stock_maximo": fila.stock_maximo
         }
-        for item in inventario
-        if item.existencia <= minimo
+        for fila in filas
     ]
 
 
-def get_gasto_por_vehiculo(db: Session):
-    salidas = db.query(models.SalidaDetalle).all()
-    resultado = {}
+def contar_bajo_inventario(db: Session, minimo: int = 5) -> int:
+    return db.query(func.count(models.Inventario.id)).filter(
+        _condicion_bajo_inventario(minimo)
+    ).scalar()
 
-    for det in salidas:
-        os = det.salida.orden_servicio
-        vehiculo_id = os.vehiculo_id
 
-        precio = (
-            db.query(models.OrdenCompraDetalle.precio_unitario)
-            .filter(models.OrdenCompraDetalle.refaccion_id == det.refaccion_id)
-            .order_by(models.OrdenCompraDetalle.id.desc())
-            .first()
-        )
+def get_gasto_por_vehiculo(
+    db: Session,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+    area_asignada: str | None = None,
+):
+    """
+    Gasto en refacciones por vehículo, valuado al último precio de compra
+    (tabla precios_refaccion). Se resuelve en una sola consulta agrupada.
+    """
+    total = func.sum(
+        models.SalidaDetalle.cantidad
+        * func.coalesce(models.PrecioRefaccion.ultimo_precio, 0)
+    )
 
-        precio_unitario = precio[0] if precio else 0
-        costo = precio_unitario * det.cantidad
+    query = (
+        db.query(
+            models.Vehiculo.id,
+            models.Vehiculo.placas,
+            models.Vehiculo.marca,
+            models.Vehiculo.modelo,
+            total.label("total_gastado")
+        )
+        .select_from(models.SalidaDetalle)
+        .join(models.SalidaRefaccion, models.SalidaRefaccion.id == models.SalidaDetalle.salida_id)
+        .join(models.OrdenServicio, models.OrdenServicio.id == models.SalidaRefaccion.orden_servicio_id)
+        .join(models.Vehiculo, models.Vehiculo.id == models.OrdenServicio.vehiculo_id)
+        .outerjoin(
+            models.PrecioRefaccion,
+            models.PrecioRefaccion.refaccion_id == models.SalidaDetalle.refaccion_id
+        )
+    )
 
-        resultado[vehiculo_id] = resultado.get(vehiculo_id, 0) + costo
+    if desde:
+        query = query.filter(models.SalidaRefaccion.fecha_salida >= desde)
+    if hasta:
+        query = query.filter(models.SalidaRefaccion.fecha_salida <= hasta)
+    if area_asignada:
+        query = query.filter(models.Vehiculo.area_asignada == area_asignada)
 
-    salida_final = []
-    for vehiculo_id, total in resultado.items():
-        veh = db.query(models.Vehiculo).filter(models.Vehiculo.id == vehiculo_id).first()
-        salida_final.append({
-            "vehiculo_id": vehiculo_id,
-            "placas": veh.placas,
-            "marca": veh.marca,
-            "modelo": veh.modelo,
-            "total_gastado": total
-        })
+    filas = query.group_by(
+        models.Vehiculo.id,
+        models.Vehiculo.placas,
+        models.Vehiculo.marca,
+        models.Vehiculo.modelo
+    ).order_by(models.Vehiculo.id.asc())
 
-    return salida_final
+    return [
+        {
+            "vehiculo_id": fila.id,
+            "placas": fila.placas,
+            "marca": fila.marca,
+            "modelo": fila.modelo,
+            "total_gastado": float(fila.total_gastado or 0)
+        }
+        for fila in filas
+    ]
 
 
-def get_alertas_compra_cara(db: Session):
-    detalles = db.query(models.OrdenCompraDetalle).all()
+def get_alertas_compra_cara(
+    db: Session,
+    porcentaje_min: float = 0,
+    porcentaje_promedio: float | None = None,
+    proveedor: str | None = None,
+    offset: int = 0,
+    limit: int | None = 100,
+):
+    """
+    Partidas de compra cuyo precio supera el mínimo histórico de la refacción
+    en más de `porcentaje_min` %, y opcionalmente el promedio acumulado en más de
+    `porcentaje_promedio` %. Usa las estadísticas de precios_refaccion, por lo que
+    no recorre todas las partidas en Python.
+    """
+    hist = models.HistorialPrecio
+    stats = models.PrecioRefaccion
+    promedio = stats.suma_precios / func.nullif(stats.num_compras, 0)
+
+    query = (
+        db.query(
+            hist.refaccion_id,
+            models.Refaccion.clave,
+            models.Refaccion.descripcion,
+            hist.proveedor,
+            hist.oc_id,
+            hist.fecha,
+            hist.precio_unitario,
+            stats.precio_min,
+            promedio.label("precio_promedio")
+        )
+        .join(stats, stats.refaccion_id == hist.refaccion_id)
+        .join(models.Refaccion, models.Refaccion.id == hist.refaccion_id)
+        .filter(hist.precio_unitario > stats.precio_min * (1 + porcentaje_min / 100))
+    )
 
-    historico = {}
-    alertas = []
+    if porcentaje_promedio is not None:
+        query = query.filter(hist.precio_unitario > promedio * (1 + porcentaje_promedio / 100))
+    if proveedor:
+        query = query.filter(hist.proveedor == proveedor)
 
-    for det in detalles:
-        ref_id = det.refaccion_id
-        precio = det.precio_unitario or 0
-        historico[ref_id] = min(historico.get(ref_id, precio), precio)
+    query = query.order_by(hist.fecha.desc(), hist.id.desc()).offset(offset)
+    if limit:
+        query = query.limit(limit)
 
-    for det in detalles:
-        ref_id = det.refaccion_id
-        precio_actual = det.precio_unitario or 0
-        precio_min = historico[ref_id]
-
-        if precio_actual > precio_min:
-            ref = db.query(models.Refaccion).filter(models.Refaccion.id == ref_id).first()
-            diferencia = precio_actual - precio_min
-            porcentaje = (diferencia / precio_min) * 100 if precio_min > 0 else 0
-
-            alertas.append({
-                "refaccion_id": ref_id,
-                "clave": ref.clave,
-                "descripcion": ref.descripcion,
-                "precio_historico_min": precio_min,
-                "precio_actual": precio_actual,
-                "diferencia": diferencia,
-                "porcentaje": round(porcentaje, 2),
-                "mensaje": "ALERTA: compra más cara que el histórico"
-            })
+    alertas = []
+    for fila in query:
+        diferencia = fila.precio_unitario - fila.precio_min
+        porcentaje = (diferencia / fila.precio_min) * 100 if fila.precio_min > 0 else 0
+
+        alertas.append({
+            "refaccion_id": fila.refaccion_id,
+            "clave": fila.clave,
+            "descripcion": fila.descripcion,
+            "proveedor": fila.proveedor,
+            "oc_id": fila.oc_id,
+            "fecha": fila.fecha,
+            "precio_historico_min": fila.precio_min,
+            "precio_promedio": round(fila.precio_promedio, 2) if fila.precio_promedio is not None else None,
+            "precio_actual": fila.precio_unitario,
+            "diferencia": diferencia,
+            "porcentaje": round(porcentaje, 2),
+            "mensaje": "ALERTA: compra más cara que el histórico"
+        })
 
     return alertas
 
 
 def get_dashboard_general(db: Session):
+    """Snapshot del dashboard general; se recalcula sólo si fue invalidado o expiró."""
+    return snapshots_dashboard.obtener("general", lambda: _calcular_dashboard_general(db))
+
+
+def _calcular_dashboard_general(db: Session):
     return {
         "ordenes_abiertas": db.query(models.OrdenServicio).filter(
             models.OrdenServicio.estado != "finalizado"
         ).count(),
-        "inventario_total": sum(i.existencia for i in db.query(models.Inventario).all()),
-        "refacciones_bajo_inventario": len(
-            [i for i in db.query(models.Inventario).all() if i.existencia <= 5]
-        ),
-        "top_refacciones_usadas": get_refacciones_mas_usadas(db)[:5],
+        "inventario_total": get_inventario_total(db),
+        "refacciones_bajo_inventario": contar_bajo_inventario(db),
+        "top_refacciones_usadas": get_refacciones_mas_usadas(db, limit=5),
         "alertas_compra_cara": get_alertas_compra_cara(db),
         "gasto_por_vehiculo": get_gasto_por_vehiculo(db)
     }
 
 
+# ============================================================
+# EXPORTACIÓN EN STREAMING
+# ============================================================
+# Generadores de dicts planos para exportar.respuesta_streaming. Usan
+# yield_per, que en PostgreSQL abre un cursor del lado del servidor; así
+# ni la base ni la API materializan la tabla completa.
+
+TAMANO_LOTE_EXPORTACION = 1000
+
+COLUMNAS_INVENTARIO = ["refaccion_id", "clave", "descripcion", "unidad_medida", "existencia"]
+COLUMNAS_VEHICULOS = [
+    "id", "numero_economico", "tipo", "placas", "marca",
+    "modelo", "anio", "numero_serie", "area_asignada"
+]
+COLUMNAS_RECEPCIONES = [
+    "recepcion_id", "oc_id", "fecha_recepcion", "recibido_por",
+    "detalle_id", "refaccion_id", "cantidad_recibida", "cantidad_oc"
+]
+COLUMNAS_SALIDAS = [
+    "salida_id", "orden_servicio_id", "fecha_salida", "entregado_por", "recibido_por",
+    "detalle_id", "refaccion_id", "cantidad"
+]
+COLUMNAS_KARDEX = ["id", "refaccion_id", "fecha", "tipo", "cantidad", "saldo", "referencia"]
+
+
+def _iterar_filas(db: Session, stmt):
+    resultado = db.execute(stmt.execution_options(yield_per=TAMANO_LOTE_EXPORTACION))
+    for fila in resultado.mappings():
+        yield dict(fila)
+
+
+def iterar_inventario_detallado(db: Session):
+    stmt = (
+        select(
+            models.Inventario.refaccion_id,
+            models.Refaccion.clave,
+            models.Refaccion.descripcion,
+            models.Refaccion.unidad_medida,
+            models.Inventario.existencia
+        )
+        .join(models.Refaccion, models.Refaccion.id == models.Inventario.refaccion_id)
+        .order_by(models.Inventario.refaccion_id)
+    )
+    return _iterar_filas(db, stmt)
+
+
+def iterar_vehiculos(
+    db: Session,
+    marca: str | None = None,
+    tipo: str | None = None,
+    area_asignada: str | None = None,
+    q: str | None = None,
+):
+    veh = models.Vehiculo
+    stmt = (
+        select(*(getattr(veh, c) for c in COLUMNAS_VEHICULOS))
+        .where(*_filtros_vehiculos(marca, tipo, area_asignada, q))
+        .order_by(veh.id)
+    )
+    return _iterar_filas(db, stmt)
+
+
+def iterar_recepciones(
+    db: Session,
+    oc_id: int | None = None,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+):
+    """Una fila por partida recibida (o una fila sin partida si la recepción está vacía)."""
+    rec = models.Recepcion
+    det = models.RecepcionDetalle
+    stmt = (
+        select(
+            rec.id.label("recepcion_id"), rec.oc_id, rec.fecha_recepcion, rec.recibido_por,
+            det.id.label("detalle_id"), det.refaccion_id, det.cantidad_recibida, det.cantidad_oc
+        )
+        .outerjoin(det, det.recepcion_id == rec.id)
+        .where(*_filtros_recepciones(oc_id, desde, hasta))
+        .order_by(rec.id, det.id)
+    )
+    return _iterar_filas(db, stmt)
+
+
+def iterar_salidas(
+    db: Session,
+    orden_servicio_id: int | None = None,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+):
+    """Una fila por partida entregada (o una fila sin partida si la salida está vacía)."""
+    sal = models.SalidaRefaccion
+    det = models.SalidaDetalle
+    stmt = (
+        select(
+            sal.id.label("salida_id"), sal.orden_servicio_id, sal.fecha_salida,
+            sal.entregado_por, sal.recibido_por,
+            det.id.label("detalle_id"), det.refaccion_id, det.cantidad
+        )
+        .outerjoin(det, det.salida_id == sal.id)
+        .where(*_filtros_salidas(orden_servicio_id, desde, hasta))
+        .order_by(sal.id, det.id)
+    )
+    return _iterar_filas(db, stmt)
+
+
+def iterar_kardex(
+    db: Session,
+    refaccion_id: int,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+):
+    mov = models.MovimientoInventario
+    saldo = _saldo_antes_de(db, refaccion_id, desde) if desde else 0
+
+    stmt = select(mov.id, mov.refaccion_id, mov.fecha, mov.tipo, mov.cantidad, mov.referencia).where(
+        mov.refaccion_id == refaccion_id
+    )
+    if desde:
+        stmt = stmt.where(mov.fecha >= desde)
+    if hasta:
+        stmt = stmt.where(mov.fecha <= hasta)
+    stmt = stmt.order_by(mov.fecha.asc(), mov.id.asc())
+
+    for fila in _iterar_filas(db, stmt):
+        if fila["tipo"] == "entrada":
+            saldo += fila["cantidad"]
+        elif fila["tipo"] == "salida":
+            saldo -= fila["cantidad"]
+        fila["saldo"] = saldo
+        yield fila
+
+
 # ============================================================
 # ENDPOINTS PARA UI
 # ============================================================
@@ -549,7 +2019,29 @@ def get_refacciones_con_inventario(db: Session):
 
 
 def get_os_detallada(db: Session, os_id: int):
-    os = db.query(models.OrdenServicio).filter(models.OrdenServicio.id == os_id).first()
+    """
+    Orden de servicio con vehículo, solicitudes y salidas (con sus partidas y
+    refacciones). Se carga en un número fijo de consultas, sin importar cuántas
+    solicitudes o salidas tenga la orden.
+    """
+    os_ = models.OrdenServicio
+    os = (
+        db.query(os_)
+        .options(
+            joinedload(os_.vehiculo),
+            selectinload(os_.solicitudes)
+            .selectinload(models.SolicitudRefaccion.detalles)
+            .joinedload(models.SolicitudDetalle.refaccion),
+            selectinload(os_.salidas)
+            .selectinload(models.SalidaRefaccion.detalles)
+            .joinedload(models.SalidaDetalle.refaccion),
+        )
+        .filter(os_.id == os_id)
+        .first()
+    )
+
+    if not os:
+        return None
 
     return {
         "orden_servicio": os,
@@ -560,7 +2052,22 @@ def get_os_detallada(db: Session, os_id: int):
 
 
 def get_oc_detallada(db: Session, oc_id: int):
-    oc = db.query(models.OrdenCompra).filter(models.OrdenCompra.id == oc_id).first()
+    """Orden de compra con partidas, recepciones y diferencias, en consultas fijas."""
+    oc_ = models.OrdenCompra
+    oc = (
+        db.query(oc_)
+        .options(
+            selectinload(oc_.detalles).joinedload(models.OrdenCompraDetalle.refaccion),
+            selectinload(oc_.recepciones)
+            .selectinload(models.Recepcion.detalles)
+            .joinedload(models.RecepcionDetalle.refaccion),
+        )
+        .filter(oc_.id == oc_id)
+        .first()
+    )
+
+    if not oc:
+        return None
 
     return {
         "orden_compra": oc,
@@ -576,12 +2083,17 @@ def buscar_refacciones(db: Session, q: str):
 
 
 def get_dashboard_ui(db: Session):
+    """Snapshot del dashboard de la UI; se recalcula sólo si fue invalidado o expiró."""
+    return snapshots_dashboard.obtener("ui", lambda: _calcular_dashboard_ui(db))
+
+
+def _calcular_dashboard_ui(db: Session):
     return {
-        "inventario_total": sum(i.existencia for i in db.query(models.Inventario).all()),
+        "inventario_total": get_inventario_total(db),
         "refacciones_bajo_inventario": get_bajo_inventario(db),
         "alertas_compra_cara": get_alertas_compra_cara(db),
         "gasto_por_vehiculo": get_gasto_por_vehiculo(db),
-        "top_refacciones_usadas": get_refacciones_mas_usadas(db)[:5]
+        "top_refacciones_usadas": get_refacciones_mas_usadas(db, limit=5)
     }
 
 # ============================================================
@@ -593,6 +2105,7 @@ def create_rol(db: Session, rol_in: schemas.RolCreate):
     db.add(db_rol)
     db.commit()
     db.refresh(db_rol)
+    principales.limpiar()
     return db_rol
 
 
@@ -611,129 +2124,256 @@ def create_usuario(db: Session, usuario_in: schemas.UsuarioCreate):
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    principales.invalidar(db_user.username)
     return db_user
 
 
-def get_usuarios(db: Session):
-    return db.query(models.Usuario).all()
+def get_usuarios(
+    db: Session,
+    pagina: ParametrosPagina | None = None,
+    rol_id: int | None = None,
+    activo: bool | None = None,
+) -> Pagina:
+    usr = models.Usuario
+    query = db.query(usr).options(selectinload(usr.rol))
+
+    if rol_id:
+        query = query.filter(usr.rol_id == rol_id)
+    if activo is not None:
+        query = query.filter(usr.activo == activo)
+
+    return paginar_keyset(query, usr.id, {
+        "username": usr.username,
+        "nombre": usr.nombre,
+    }, pagina)
 
 # ============================================================
 # IMPORTAR ORDENES DE COMPRA
 # ============================================================
 
-def importar_orden_compra_desde_json(db: Session, data: dict):
-    detalles = []
-    for item in data["detalles"]:
-        # Buscar refacción por clave o descripción
-        ref = db.query(models.Refaccion).filter(
-            models.Refaccion.descripcion == item["descripcion"]
-        ).first()
-        if not ref:
-            ref = models.Refaccion(
-                clave=item.get("clave") or item["descripcion"][:20],
-                descripcion=item["descripcion"],
-                unidad_medida=item.get("unidad", "pieza"),
-            )
-            db.add(ref)
-            db.flush()
+def _crear_ocs_importadas(db: Session, documentos: list[dict]) -> list[models.OrdenCompra]:
+    """
+    Da de alta una OC por documento parseado: resuelve todas las refacciones
+    de todos los documentos juntas y crea encabezados y partidas en un flush
+    cada uno. No hace commit.
+    """
+    partidas = [item for data in documentos for item in data["detalles"]]
+    refaccion_ids = iter(resolver_refacciones(db, partidas))
+
+    ocs = [
+        models.OrdenCompra(
+            proveedor=data["proveedor"],
+            factura=data.get("factura"),
+            estado="pendiente",
+        )
+        for data in documentos
+    ]
+    db.add_all(ocs)
+    db.flush()
 
-        detalles.append(
+    detalles_por_oc = [
+        [
             models.OrdenCompraDetalle(
-                refaccion_id=ref.id,
+                oc_id=oc.id,
+                refaccion_id=next(refaccion_ids),
                 cantidad=item["cantidad"],
                 precio_unitario=item["precio_unitario"],
             )
-        )
+            for item in data["detalles"]
+        ]
+        for oc, data in zip(ocs, documentos)
+    ]
+    db.add_all([d for detalles in detalles_por_oc for d in detalles])
+    db.flush()
+
+    for oc, detalles in zip(ocs, detalles_por_oc):
+        registrar_precios_oc(db, oc, detalles)
+        # La siguiente OC debe ver los precios_refaccion que ésta acaba de crear
+        db.flush()
+
+    return ocs
+
+
+def importar_orden_compra_desde_json(db: Session, data: dict, importacion: dict | None = None):
+    """
+    `importacion` (sin oc_id) se guarda en la cache de documentos en la misma
+    transacción que la OC; si la huella ya existe se propaga IntegrityError.
+    """
+    try:
+        oc, = _crear_ocs_importadas(db, [data])
+        if importacion is not None:
+            registrar_importaciones(db, [{**importacion, "oc_id": oc.id}])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    snapshots_dashboard.invalidar()
+    db.refresh(oc)
+    return oc
+
+
+TAMANO_BLOQUE_IMPORTACION = 500
+
+
+def importar_orden_compra_en_bloques(
+    db: Session,
+    encabezado: dict,
+    partidas: Iterable[dict],
+    tamano_bloque: int = TAMANO_BLOQUE_IMPORTACION,
+) -> models.OrdenCompra:
+    """
+    Importa una OC consumiendo `partidas` (p. ej. un generador) por bloques:
+    cada bloque resuelve sus refacciones, inserta sus partidas y actualiza
+    precios, sin acumular la OC completa en memoria. Una sola transacción.
+    """
+    try:
+        oc = _crear_oc_en_bloques(db, encabezado, partidas, tamano_bloque)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    snapshots_dashboard.invalidar()
+    db.refresh(oc)
+    return oc
 
+
+def _crear_oc_en_bloques(
+    db: Session,
+    encabezado: dict,
+    partidas: Iterable[dict],
+    tamano_bloque: int = TAMANO_BLOQUE_IMPORTACION,
+) -> models.OrdenCompra:
+    """Cuerpo de importar_orden_compra_en_bloques. No hace commit."""
     oc = models.OrdenCompra(
-        proveedor=data["proveedor"],
-        factura=data.get("factura"),
+        proveedor=encabezado["proveedor"],
+        factura=encabezado.get("factura"),
         estado="pendiente",
     )
+    partidas = iter(partidas)
+
     db.add(oc)
     db.flush()
 
-    for d in detalles:
-        d.oc_id = oc.id
-        db.add(d)
+    while bloque := list(islice(partidas, tamano_bloque)):
+        refaccion_ids = resolver_refacciones(db, bloque)
+        detalles = [
+            models.OrdenCompraDetalle(
+                oc_id=oc.id,
+                refaccion_id=refaccion_id,
+                cantidad=item["cantidad"],
+                precio_unitario=item["precio_unitario"],
+            )
+            for item, refaccion_id in zip(bloque, refaccion_ids)
+        ]
+        db.add_all(detalles)
+        db.flush()
+        registrar_precios_oc(db, oc, detalles)
+        db.flush()
 
-    db.commit()
-    db.refresh(oc)
     return oc
 
 
+def importar_ordenes_compra_en_lote(
+    db: Session,
+    documentos: list[dict],
+    importaciones: list[dict] | None = None,
+) -> list[models.OrdenCompra]:
+    """
+    Importa varios documentos ya parseados en una sola transacción (todo o
+    nada), junto con sus filas de cache de documentos. Una fila de
+    `importaciones` trae "oc_id" o "documento" (índice en `documentos`, para
+    apuntar a la OC que se crea aquí). Si una huella ya existe se propaga
+    IntegrityError y no se crea nada.
+    """
+    importaciones = importaciones or []
+    if not documentos and not importaciones:
+        return []
+
+    try:
+        ocs = _crear_ocs_importadas(db, documentos) if documentos else []
+
+        filas = []
+        for r in importaciones:
+            fila = dict(r)
+            if "documento" in fila:
+                fila["oc_id"] = ocs[fila.pop("documento")].id
+            filas.append(fila)
+        registrar_importaciones(db, filas)
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    snapshots_dashboard.invalidar()
+    return ocs
+
+
+def get_importaciones_por_huella(db: Session, huellas) -> dict[str, models.ImportacionDocumento]:
+    huellas = set(huellas)
+    if not huellas:
+        return {}
+    doc = models.ImportacionDocumento
+    return {d.sha256: d for d in db.query(doc).filter(doc.sha256.in_(huellas))}
+
+
+def get_importaciones_por_numero_oc(db: Session, numeros_oc) -> dict[str, models.ImportacionDocumento]:
+    numeros_oc = {n for n in numeros_oc if n}
+    if not numeros_oc:
+        return {}
+    doc = models.ImportacionDocumento
+    encontrados = {}
+    for d in db.query(doc).filter(doc.numero_oc.in_(numeros_oc)).order_by(doc.id):
+        encontrados.setdefault(d.numero_oc, d)
+    return encontrados
+
+
+def registrar_importaciones(db: Session, registros: list[dict]):
+    """
+    Agrega a la cache de documentos importados {sha256, tipo, nombre_archivo,
+    numero_oc, oc_id, resultado}. No hace commit: va en la transacción que
+    crea la OC. Si otro proceso ya registró la huella, el INSERT (o el
+    commit) lanza IntegrityError y el llamador usa la importación existente.
+    """
+    nuevos = {}
+    for r in registros:
+        nuevos.setdefault(r["sha256"], {
+            **r,
+            "resultado": json.dumps(r.get("resultado"), default=str, ensure_ascii=False),
+        })
+    if nuevos:
+        db.execute(insert(models.ImportacionDocumento), list(nuevos.values()))
+
+
 def parsear_oc_desde_texto(texto: str) -> dict:
     """
     Parser para órdenes de compra del Municipio de Saltillo.
     Convierte el texto del PDF en un diccionario listo para importar.
+    La implementación vive en app/parsers/texto_oc.py; el resultado incluye
+    "advertencias" con lo que no se pudo leer.
     """
-
-    # Normalizar texto
-    t = texto.replace("\n", " ").replace("\r", " ")
-    t = re.sub(r"\s+", " ", t)
-
-    # ============================
-    # PROVEEDOR
-    # ============================
-    proveedor = None
-    m = re.search(r"PROVEEDOR\s*:\s*([A-Z0-9\s\.]+)", t)
-    if m:
-        proveedor = m.group(1).strip()
-
-    # ============================
-    # NÚMERO DE OC
-    # ============================
-    numero_oc = None
-    m = re.search(r"NUMERO\s+(\d+)", t)
-    if m:
-        numero_oc = m.group(1)
-
-    # ============================
-    # FECHA
-    # ============================
-    fecha = None
-    m = re.search(r"FECHA DE ELABORACIÓN:\s*([0-9\/\:\samp\.]+)", t, re.IGNORECASE)
-    if m:
-        try:
-            fecha = datetime.strptime(m.group(1).strip(), "%d/%m/%Y %I:%M:%S%p")
-        except:
-            fecha = None
-
-    # ============================
-    # PARTIDAS
-    # ============================
-    partidas = []
-    regex_partida = r"(\d+\.\d+)\s+([A-Z]+)\s+(\d+[\w\s\-]+)\s+\$\s*([\d,]+\.\d+)\s+\$\s*([\d,]+\.\d+)"
-    for cant, unidad, desc, precio, importe in re.findall(regex_partida, t):
-        partidas.append({
-            "cantidad": float(cant),
-            "unidad": unidad,
-            "descripcion": desc.strip(),
-            "precio_unitario": float(precio.replace(",", "")),
-        })
-
-    # ============================
-    # RESULTADO
-    # ============================
-    return {
-        "proveedor": proveedor or "DESCONOCIDO",
-        "factura": None,
-        "detalles": partidas,
-        "numero_oc": numero_oc,
-        "fecha": fecha.isoformat() if fecha else None
-    }
+    return texto_oc.parsear_oc(texto)
 
 
 # ============================================================
 # PDF BINARIO → TEXTO
 # ============================================================
 
-def extraer_texto_de_pdf(pdf_bytes: bytes) -> str:
-    texto = ""
+def contar_paginas_pdf(pdf_bytes: bytes) -> int:
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        return len(pdf.pages)
+
+
+def extraer_paginas_pdf(pdf_bytes: bytes, inicio: int = 0, fin: int | None = None) -> list[str]:
+    """Texto de las páginas [inicio, fin) del PDF, una cadena por página."""
     with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-        for page in pdf.pages:
-            texto += page.extract_text() + "\n"
-    return texto
+        return [page.extract_text() or "" for page in pdf.pages[inicio:fin]]
+
+
+def extraer_texto_de_pdf(pdf_bytes: bytes) -> str:
+    return "".join(pagina + "\n" for pagina in extraer_paginas_pdf(pdf_bytes))
 
 
 # ============================================================
@@ -741,40 +2381,59 @@ def extraer_texto_de_pdf(pdf_bytes: bytes) -> str:
 # ============================================================
 
 def parsear_oc_desde_excel(excel_bytes: bytes) -> dict:
-    wb = openpyxl.load_workbook(io.BytesIO(excel_bytes))
-    ws = wb.active
+    """OC completa en un dict (vista previa / importación en lote). Ver parsers/excel.py."""
+    with HojaOC(excel_bytes) as hoja:
+        detalles = list(hoja.partidas())
+        return {**hoja.encabezado, "detalles": detalles, "advertencias": hoja.advertencias}
 
-    proveedor = None
-    partidas = []
 
-    for row in ws.iter_rows(values_only=True):
-        if not row:
-            continue
+PARTIDAS_VISTA_PREVIA = 20
 
-        # Detectar proveedor
-        if "PROVEEDOR" in str(row[0]).upper():
-            proveedor = row[1]
 
-        # Detectar partidas (cantidad, unidad, descripción, precio)
-        try:
-            cantidad = float(row[0])
-            unidad = str(row[1])
-            descripcion = str(row[2])
-            precio = float(str(row[3]).replace("$", "").replace(",", ""))
-            partidas.append({
-                "cantidad": cantidad,
-                "unidad": unidad,
-                "descripcion": descripcion,
-                "precio_unitario": precio
-            })
-        except:
-            continue
+def importar_oc_desde_excel(
+    db: Session,
+    excel_bytes: bytes,
+    importacion: dict | None = None,
+) -> tuple[models.OrdenCompra, dict]:
+    """
+    Importa un Excel sin materializar sus partidas: el lector en streaming
+    alimenta a importar_orden_compra_en_bloques. Devuelve la OC y un resumen
+    con las primeras partidas, el total y las advertencias del lector.
+    `importacion` (sin oc_id ni resultado) se guarda con el resumen en la
+    misma transacción que la OC.
+    """
+    primeras = []
+    total = 0
+
+    with HojaOC(excel_bytes) as hoja:
+        def partidas():
+            nonlocal total
+            for partida in hoja.partidas():
+                if total < PARTIDAS_VISTA_PREVIA:
+                    primeras.append(partida)
+                total += 1
+                yield partida
 
-    return {
-        "proveedor": proveedor or "DESCONOCIDO",
-        "factura": None,
-        "detalles": partidas
-    }
+        try:
+            oc = _crear_oc_en_bloques(db, hoja.encabezado, partidas())
+            resumen = {
+                **hoja.encabezado,
+                "detalles": primeras,
+                "total_partidas": total,
+                "advertencias": hoja.advertencias,
+            }
+            if importacion is not None:
+                registrar_importaciones(db, [{
+                    **importacion, "oc_id": oc.id, "resultado": resumen,
+                }])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+    snapshots_dashboard.invalidar()
+    db.refresh(oc)
+    return oc, resumen
 
 # ============================================================
 # PROVEEDORES
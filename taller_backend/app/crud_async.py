@@ -0,0 +1,208 @@
+# ============================================================
+# CRUD ASÍNCRONO (ASYNC_DB=1)
+# ============================================================
+# Versiones para AsyncSession de las rutas más cargadas. Las lecturas
+# (listados, kardex) se escriben con select() y se esperan directamente.
+# Los cálculos de reportes y las escrituras reutilizan la lógica de
+# crud.py con AsyncSession.run_sync: el código síncrono corre dentro del
+# mismo event loop y cada consulta cede el control mientras la base
+# responde, sin ocupar un hilo del threadpool.
+#
+# Ninguna función debe devolver objetos con relaciones sin cargar: fuera
+# de run_sync no hay lazy load.
+# ============================================================
+
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from . import crud, models, schemas
+from .cache import snapshots_dashboard
+from .paginacion import Pagina, ParametrosPagina, paginar_keyset_async
+
+
+# ============================================================
+# TRANSACCIONES CON REINTENTO
+# ============================================================
+
+async def _en_transaccion(db: AsyncSession, escribir):
+    """
+    crud._en_transaccion para AsyncSession: `escribir(sesion)` recibe la
+    Session síncrona de run_sync. Cada intento corre con run_sync; la
+    espera entre reintentos es asyncio.sleep para no detener el event loop.
+    """
+    for intento in range(crud.DB_REINTENTOS + 1):
+        hecho, resultado = await db.run_sync(
+            lambda sesion: crud._intentar_transaccion(sesion, lambda: escribir(sesion), intento)
+        )
+        if hecho:
+            return resultado
+        await asyncio.sleep(crud._espera_reintento(intento))
+
+
+# ============================================================
+# KARDEX
+# ============================================================
+
+async def _ultimo_checkpoint(db: AsyncSession, refaccion_id: int, antes_de: datetime | None = None):
+    stmt = select(models.SaldoKardex).where(models.SaldoKardex.refaccion_id == refaccion_id)
+    if antes_de is not None:
+        stmt = stmt.where(models.SaldoKardex.fecha < antes_de)
+    stmt = stmt.order_by(
+        models.SaldoKardex.fecha.desc(),
+        models.SaldoKardex.movimiento_id.desc()
+    ).limit(1)
+    return await db.scalar(stmt)
+
+
+async def _saldo_antes_de(db: AsyncSession, refaccion_id: int, fecha: datetime) -> int:
+    mov = models.MovimientoInventario
+    checkpoint = await _ultimo_checkpoint(db, refaccion_id, antes_de=fecha)
+
+    stmt = select(func.coalesce(func.sum(crud._delta_movimiento()), 0)).where(
+        mov.refaccion_id == refaccion_id,
+        mov.fecha < fecha
+    )
+    if checkpoint:
+        stmt = stmt.where(crud._movimiento_posterior_a(checkpoint.fecha, checkpoint.movimiento_id))
+
+    return (checkpoint.saldo if checkpoint else 0) + await db.scalar(stmt)
+
+
+async def get_kardex(
+    db: AsyncSession,
+    refaccion_id: int,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+    cursor: str | None = None,
+    limit: int | None = None,
+) -> Pagina:
+    mov = models.MovimientoInventario
+    stmt = select(mov).where(mov.refaccion_id == refaccion_id)
+
+    if cursor:
+        fecha_cursor, id_cursor, saldo = crud._leer_cursor_kardex(cursor)
+        stmt = stmt.where(crud._movimiento_posterior_a(fecha_cursor, id_cursor))
+    elif desde:
+        saldo = await _saldo_antes_de(db, refaccion_id, desde)
+    else:
+        saldo = 0
+
+    if desde:
+        stmt = stmt.where(mov.fecha >= desde)
+    if hasta:
+        stmt = stmt.where(mov.fecha <= hasta)
+
+    stmt = stmt.order_by(mov.fecha.asc(), mov.id.asc())
+    if limit:
+        stmt = stmt.limit(limit + 1)
+
+    movimientos = (await db.scalars(stmt)).all()
+    filas, siguiente = crud._saldo_corrido(list(movimientos), saldo, limit)
+    return Pagina(crud._filas_kardex(filas), siguiente)
+
+
+# ============================================================
+# RECEPCIONES
+# ============================================================
+
+async def _recargar_con_detalles(db: AsyncSession, modelo, id_: int):
+    stmt = (
+        select(modelo)
+        .options(selectinload(modelo.detalles))
+        .where(modelo.id == id_)
+        .execution_options(populate_existing=True)
+    )
+    return await db.scalar(stmt)
+
+
+async def create_recepcion(db: AsyncSession, recepcion_in: schemas.RecepcionCreate):
+    recepcion = await db.run_sync(crud.create_recepcion, recepcion_in)
+    return await _recargar_con_detalles(db, models.Recepcion, recepcion.id)
+
+
+async def get_recepciones(
+    db: AsyncSession,
+    pagina: ParametrosPagina | None = None,
+    oc_id: int | None = None,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+) -> Pagina:
+    rec = models.Recepcion
+    stmt = (
+        select(rec)
+        .options(selectinload(rec.detalles))
+        .where(*crud._filtros_recepciones(oc_id, desde, hasta))
+    )
+
+    return await paginar_keyset_async(db, stmt, rec.id, {
+        "fecha_recepcion": rec.fecha_recepcion,
+    }, pagina)
+
+
+# ============================================================
+# SALIDAS DE REFACCIONES
+# ============================================================
+
+async def create_salida_refaccion(db: AsyncSession, salida_in: schemas.SalidaRefaccionCreate):
+    crud._validar_cantidades_salida(salida_in)
+    salida_id = await _en_transaccion(
+        db, lambda sesion: crud._escribir_salida(sesion, salida_in).id
+    )
+    snapshots_dashboard.invalidar()
+    return await _recargar_con_detalles(db, models.SalidaRefaccion, salida_id)
+
+
+async def get_salidas(
+    db: AsyncSession,
+    pagina: ParametrosPagina | None = None,
+    orden_servicio_id: int | None = None,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+) -> Pagina:
+    sal = models.SalidaRefaccion
+    stmt = (
+        select(sal)
+        .options(selectinload(sal.detalles))
+        .where(*crud._filtros_salidas(orden_servicio_id, desde, hasta))
+    )
+
+    return await paginar_keyset_async(db, stmt, sal.id, {
+        "fecha_salida": sal.fecha_salida,
+    }, pagina)
+
+
+# ============================================================
+# DASHBOARD
+# ============================================================
+
+async def get_gasto_por_vehiculo(
+    db: AsyncSession,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+    area_asignada: str | None = None,
+):
+    return await db.run_sync(crud.get_gasto_por_vehiculo, desde, hasta, area_asignada)
+
+
+async def get_alertas_compra_cara(
+    db: AsyncSession,
+    porcentaje_min: float = 0,
+    porcentaje_promedio: float | None = None,
+    proveedor: str | None = None,
+    offset: int = 0,
+    limit: int | None = 100,
+):
+    return await db.run_sync(
+        crud.get_alertas_compra_cara, porcentaje_min, porcentaje_promedio, proveedor, offset, limit
+    )
+
+
+async def get_dashboard_general(db: AsyncSession):
+    """Mismo snapshot que crud.get_dashboard_general, recalculado sin bloquear el loop."""
+    return await snapshots_dashboard.obtener_async(
+        "general", lambda: db.run_sync(crud._calcular_dashboard_general)
+    )
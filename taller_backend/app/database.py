@@ -1,6 +1,11 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 
 # -------------------------------------------------------------------
 # LEER LA URL DE LA BASE DE DATOS DESDE .env
@@ -11,6 +16,46 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL no está definida. Revisa tu archivo .env")
 
+
+def _bandera(nombre: str, defecto: str) -> bool:
+    return os.getenv(nombre, defecto).strip().lower() in ("1", "true", "si", "sí")
+
+
+# -------------------------------------------------------------------
+# POOL DE CONEXIONES
+# -------------------------------------------------------------------
+# Cada worker abre como máximo DB_POOL_SIZE + DB_MAX_OVERFLOW conexiones;
+# multiplicado por el número de workers debe quedar bajo max_connections
+# de PostgreSQL. Un request que no consigue conexión en DB_POOL_TIMEOUT
+# segundos falla en lugar de esperar indefinidamente. pre_ping descarta
+# conexiones que la base cerró (reinicios, firewalls) y pool_recycle las
+# renueva antes de que caduquen del lado del servidor.
+# -------------------------------------------------------------------
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = _bandera("DB_POOL_PRE_PING", "1")
+
+
+def _sqlite_en_memoria(url) -> bool:
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def opciones_pool(url) -> dict:
+    opciones = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    # SQLite en memoria usa un pool de una conexión por hilo: no acepta tamaños
+    if not _sqlite_en_memoria(url):
+        opciones.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+    return opciones
+
+
 # -------------------------------------------------------------------
 # MOTOR DE BASE DE DATOS (PostgreSQL o SQLite según DATABASE_URL)
 # -------------------------------------------------------------------
@@ -24,7 +69,8 @@ if DATABASE_URL.startswith("sqlite"):
 engine = create_engine(
     DATABASE_URL,
     connect_args=connect_args,
-    future=True
+    future=True,
+    **opciones_pool(DATABASE_URL)
 )
 
 # -------------------------------------------------------------------
@@ -38,18 +84,242 @@ SessionLocal = sessionmaker(
 )
 
 # -------------------------------------------------------------------
-# BASE PARA MODELOS ORM
+# RÉPLICA DE LECTURA OPCIONAL (DATABASE_READ_URL)
+# -------------------------------------------------------------------
+# Reportes y dashboards leen de la réplica con deps.get_read_db para no
+# competir con las escrituras de almacén. Si la réplica se atrasa más de
+# REPLICA_LAG_MAXIMO segundos se vuelve a la primaria (ver replica.py).
+# Sin DATABASE_READ_URL todo usa la primaria.
 # -------------------------------------------------------------------
 
-Base = declarative_base()
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL") or None
+
+read_engine = None
+ReadSessionLocal = None
 
+if DATABASE_READ_URL:
+    read_engine = create_engine(
+        DATABASE_READ_URL,
+        connect_args={"check_same_thread": False} if DATABASE_READ_URL.startswith("sqlite") else {},
+        future=True,
+        **opciones_pool(DATABASE_READ_URL)
+    )
+    ReadSessionLocal = sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        bind=read_engine
+    )
+
+# -------------------------------------------------------------------
+# MOTOR ASÍNCRONO OPCIONAL (ASYNC_DB=1)
 # -------------------------------------------------------------------
-# DEPENDENCIA get_db PARA FASTAPI
+# Con ASYNC_DB=1 las rutas más cargadas (listados de salidas y recepciones,
+# kardex, dashboard) usan una AsyncSession (ver deps.get_async_db y
+# crud_async.py); el resto sigue con el motor síncrono de arriba. El driver
+# se deriva de DATABASE_URL: asyncpg para PostgreSQL y aiosqlite para
+# SQLite, o se fija con ASYNC_DATABASE_URL. Los drivers sólo se importan
+# si el modo está activo.
 # -------------------------------------------------------------------
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+ASYNC_DB = _bandera("ASYNC_DB", "0")
+
+DRIVERS_ASYNC = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+# rol ("primaria" | "lectura") -> (motor, fábrica de sesiones)
+_motores_async: dict[str, tuple] = {}
+
+
+def url_async(url: str) -> str:
+    esquema, resto = url.split("://", 1)
+    base = esquema.split("+", 1)[0]
+    if base not in DRIVERS_ASYNC:
+        raise ValueError(f"ASYNC_DB no soporta la base '{base}'")
+    return f"{DRIVERS_ASYNC[base]}://{resto}"
+
+
+def _url_async_de(rol: str) -> str:
+    if rol == "lectura":
+        return os.getenv("ASYNC_DATABASE_READ_URL") or url_async(DATABASE_READ_URL)
+    return os.getenv("ASYNC_DATABASE_URL") or url_async(DATABASE_URL)
+
+
+def get_async_engine(rol: str = "primaria"):
+    """Crea el motor asíncrono de `rol` la primera vez que se pide."""
+    if rol not in _motores_async:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        url = _url_async_de(rol)
+        try:
+            motor = create_async_engine(url, **opciones_pool(url))
+        except ImportError as exc:
+            raise RuntimeError(
+                f"ASYNC_DB=1 requiere el driver de {url.split('://', 1)[0]} "
+                "(pip install asyncpg / aiosqlite)"
+            ) from exc
+        _instalar_limites(motor.sync_engine)
+
+        # Sin expirar al hacer commit: tras el commit no hay lazy load posible
+        fabrica = async_sessionmaker(motor, autoflush=False, expire_on_commit=False)
+        _motores_async[rol] = (motor, fabrica)
+
+    return _motores_async[rol][0]
+
+
+def AsyncSessionLocal():
+    get_async_engine()
+    return _motores_async["primaria"][1]()
+
+
+def AsyncReadSessionLocal():
+    get_async_engine("lectura")
+    return _motores_async["lectura"][1]()
+
+
+async def cerrar_async_engine():
+    for motor, _ in list(_motores_async.values()):
+        await motor.dispose()
+    _motores_async.clear()
+
+# -------------------------------------------------------------------
+# TIEMPO LÍMITE POR SENTENCIA
+# -------------------------------------------------------------------
+# deps.get_db / get_async_db ponen en session.info["statement_timeout_ms"]
+# el límite que corresponde a la ruta del request (timeout_para_ruta). Al
+# iniciar cada transacción de la sesión:
+#   - PostgreSQL: SET LOCAL statement_timeout, que dura lo que la transacción.
+#   - SQLite: un progress handler que interrumpe la sentencia al vencer el
+#     plazo (sólo con el driver síncrono sqlite3).
+# Una sentencia cancelada llega como OperationalError; main.py la responde
+# con 504. 0 desactiva el límite.
+# -------------------------------------------------------------------
+
+STATEMENT_TIMEOUT_MS = int(os.getenv("STATEMENT_TIMEOUT_MS", "30000"))
+STATEMENT_TIMEOUT_UI_MS = int(os.getenv("STATEMENT_TIMEOUT_UI_MS", "5000"))
+STATEMENT_TIMEOUT_REPORTES_MS = int(os.getenv("STATEMENT_TIMEOUT_REPORTES_MS", "120000"))
+
+TIMEOUTS_POR_PREFIJO = (
+    ("/ui", STATEMENT_TIMEOUT_UI_MS),
+    ("/reportes", STATEMENT_TIMEOUT_REPORTES_MS),
+)
+
+# Cada cuántas instrucciones de la VM de SQLite se revisa el plazo
+PASOS_PROGRESO_SQLITE = 10_000
+
+CLAVE_TIMEOUT = "statement_timeout_ms"
+
+
+def timeout_para_ruta(ruta: str) -> int | None:
+    """Límite en ms para las sentencias de un request a `ruta` (None = sin límite)."""
+    for prefijo, ms in TIMEOUTS_POR_PREFIJO:
+        if ruta == prefijo or ruta.startswith(prefijo + "/"):
+            return ms or None
+    return STATEMENT_TIMEOUT_MS or None
+
+
+def es_timeout_de_sentencia(exc: OperationalError) -> bool:
+    if getattr(exc.orig, "pgcode", None) == "57014":     # query_canceled
+        return True
+    return "interrupted" in str(exc.orig).lower()
+
+
+@event.listens_for(Session, "after_begin")
+def _aplicar_timeout(session, transaction, connection):
+    ms = session.info.get(CLAVE_TIMEOUT)
+    if not ms:
+        return
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(ms)}")
+    elif connection.dialect.name == "sqlite":
+        connection.info[CLAVE_TIMEOUT] = int(ms)
+
+
+def _limitar_sentencia_sqlite(conn, cursor, statement, parameters, context, executemany):
+    ms = conn.info.get(CLAVE_TIMEOUT)
+    dbapi_conn = conn.connection.dbapi_connection
+    if not ms or not hasattr(dbapi_conn, "set_progress_handler"):
+        return
+    limite = time.monotonic() + ms / 1000
+    dbapi_conn.set_progress_handler(lambda: time.monotonic() > limite, PASOS_PROGRESO_SQLITE)
+
+
+# -------------------------------------------------------------------
+# ESTADÍSTICAS DEL POOL
+# -------------------------------------------------------------------
+
+_contadores_pool = {"conexiones_creadas": 0, "prestamos": 0, "invalidadas": 0, "timeouts_sentencia": 0}
+_lock_contadores = threading.Lock()
+
+
+def contar_evento_pool(nombre: str):
+    with _lock_contadores:
+        _contadores_pool[nombre] += 1
+
+
+def _estado_pool(motor) -> dict:
+    pool = motor.pool
+    estado = {"clase": type(pool).__name__}
+    for nombre in ("size", "checkedin", "checkedout", "overflow", "timeout"):
+        metodo = getattr(pool, nombre, None)
+        if callable(metodo):
+            estado[nombre] = metodo()
+    return estado
+
+
+def estadisticas_pool() -> dict:
+    with _lock_contadores:
+        contadores = dict(_contadores_pool)
+    return {
+        "sync": _estado_pool(engine),
+        "lectura": _estado_pool(read_engine) if read_engine is not None else None,
+        "async": {rol: _estado_pool(motor.sync_engine) for rol, (motor, _) in _motores_async.items()},
+        "contadores": contadores,
+        "configuracion": {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_pre_ping": DB_POOL_PRE_PING,
+            "statement_timeout_ms": {
+                "defecto": STATEMENT_TIMEOUT_MS,
+                **{prefijo: ms for prefijo, ms in TIMEOUTS_POR_PREFIJO},
+            },
+        },
+    }
+
+
+def _instalar_limites(motor):
+    """Eventos de timeout (SQLite) y contadores sobre un motor síncrono."""
+    event.listen(motor, "before_cursor_execute", _limitar_sentencia_sqlite)
+
+    @event.listens_for(motor, "connect")
+    def _al_conectar(dbapi_conn, registro):
+        contar_evento_pool("conexiones_creadas")
+
+    @event.listens_for(motor, "checkout")
+    def _al_prestar(dbapi_conn, registro, proxy):
+        contar_evento_pool("prestamos")
+
+    @event.listens_for(motor, "invalidate")
+    def _al_invalidar(dbapi_conn, registro, exc):
+        contar_evento_pool("invalidadas")
+
+    @event.listens_for(motor, "checkin")
+    def _al_devolver(dbapi_conn, registro):
+        # El límite es de la sesión que usó la conexión, no de la siguiente
+        registro.info.pop(CLAVE_TIMEOUT, None)
+        if dbapi_conn is not None and hasattr(dbapi_conn, "set_progress_handler"):
+            dbapi_conn.set_progress_handler(None, 0)
+
+
+_instalar_limites(engine)
+if read_engine is not None:
+    _instalar_limites(read_engine)
+
+# -------------------------------------------------------------------
+# BASE PARA MODELOS ORM
+# -------------------------------------------------------------------
+
+Base = declarative_base()
@@ -1,16 +1,99 @@
-from .database import SessionLocal
+from functools import partial
+from typing import Callable, Iterator
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from .database import (
+    CLAVE_TIMEOUT,
+    AsyncReadSessionLocal,
+    AsyncSessionLocal,
+    ReadSessionLocal,
+    SessionLocal,
+    timeout_para_ruta,
+)
+from .replica import monitor_replica
 
 # -------------------------------------------------------------------
 # DEPENDENCIA DE BASE DE DATOS PARA FASTAPI
 # -------------------------------------------------------------------
 
-def get_db():
+def get_db(request: Request):
     """
     Crea una sesión de base de datos por request.
     Garantiza que la conexión se cierre correctamente.
+    Las sentencias quedan limitadas según la ruta (ver database.timeout_para_ruta).
+    """
+    db = SessionLocal()
+    db.info[CLAVE_TIMEOUT] = timeout_para_ruta(request.url.path)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_fabrica_sesion(request: Request) -> Callable[[], Session]:
+    """
+    Para dependencias async que sólo a veces consultan la base (p. ej. la
+    autenticación, que casi siempre sale de la cache): en lugar de abrir
+    una sesión por request, reciben la fábrica y la abren al necesitarla,
+    con el mismo límite por ruta que get_db. Al ser async, resolverla no
+    pasa por el threadpool.
+    """
+    return partial(SessionLocal, info={CLAVE_TIMEOUT: timeout_para_ruta(request.url.path)})
+
+
+async def get_async_db(request: Request):
+    """
+    Versión asíncrona de get_db (sólo con ASYNC_DB=1).
+    """
+    async with AsyncSessionLocal() as db:
+        db.info[CLAVE_TIMEOUT] = timeout_para_ruta(request.url.path)
+        yield db
+
+
+def iterar_en_sesion(
+    request: Request, iterar: Callable[..., Iterator[dict]], *args
+) -> Iterator[dict]:
+    """
+    Exportaciones desde rutas asíncronas: respuesta_streaming recorre un
+    generador síncrono, así que `iterar(db, *args)` necesita una sesión
+    síncrona. Se abre sólo al empezar a recorrer (en el threadpool) y se
+    cierra al terminar o si el cliente corta la descarga; las consultas
+    JSON de la ruta no la piden.
     """
     db = SessionLocal()
+    db.info[CLAVE_TIMEOUT] = timeout_para_ruta(request.url.path)
+    try:
+        yield from iterar(db, *args)
+    finally:
+        db.close()
+
+
+# -------------------------------------------------------------------
+# SESIÓN DE SÓLO LECTURA (RÉPLICA SI ESTÁ AL DÍA)
+# -------------------------------------------------------------------
+# Para rutas que no escriben. Sin DATABASE_READ_URL, o con la réplica
+# atrasada más de REPLICA_LAG_MAXIMO, la sesión es de la primaria.
+# -------------------------------------------------------------------
+
+def get_read_db(request: Request):
+    usar_replica = monitor_replica is not None and monitor_replica.disponible()
+    db = ReadSessionLocal() if usar_replica else SessionLocal()
+    db.info[CLAVE_TIMEOUT] = timeout_para_ruta(request.url.path)
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_read_db(request: Request):
+    """
+    Versión asíncrona de get_read_db (sólo con ASYNC_DB=1).
+    """
+    # disponible() puede consultar la réplica: fuera del event loop
+    usar_replica = monitor_replica is not None and await run_in_threadpool(monitor_replica.disponible)
+    async with (AsyncReadSessionLocal() if usar_replica else AsyncSessionLocal()) as db:
+        db.info[CLAVE_TIMEOUT] = timeout_para_ruta(request.url.path)
+        yield db
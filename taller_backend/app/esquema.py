@@ -0,0 +1,101 @@
+import logging
+
+from sqlalchemy import Table, inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------------
+# ACTUALIZACIÓN DEL ESQUEMA AL ARRANCAR
+# -------------------------------------------------------------------
+# El proyecto no usa migraciones: create_all crea las tablas nuevas, pero
+# no toca las que ya existen. Aquí se agregan, de forma idempotente, las
+# columnas e índices que se añadieron a tablas existentes. Corre en el
+# startup justo después de create_all y antes de los rellenos de datos.
+# -------------------------------------------------------------------
+
+# Columnas nuevas (todas nullable) por tabla existente
+COLUMNAS_AGREGADAS: dict[Table, tuple[str, ...]] = {
+    models.Refaccion.__table__: ("descripcion_normalizada",),
+    models.Inventario.__table__: ("stock_minimo", "stock_maximo"),
+}
+
+# Tablas existentes que sólo ganaron índices (llaves foráneas, fechas)
+INDICES_AGREGADOS: tuple[Table, ...] = (
+    models.OrdenServicio.__table__,
+    models.OrdenCompraDetalle.__table__,
+    models.Recepcion.__table__,
+    models.RecepcionDetalle.__table__,
+    models.SalidaRefaccion.__table__,
+    models.SalidaDetalle.__table__,
+    models.MovimientoInventario.__table__,
+)
+
+
+def _agregar_columnas(conn: Connection, tabla: Table, columnas: tuple[str, ...]):
+    existentes = {c["name"] for c in inspect(conn).get_columns(tabla.name)}
+    for nombre in columnas:
+        if nombre in existentes:
+            continue
+        tipo = tabla.c[nombre].type.compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE {tabla.name} ADD COLUMN {nombre} {tipo}"))
+        logger.info("Columna agregada: %s.%s", tabla.name, nombre)
+
+
+def _fusionar_inventario_duplicado(conn: Connection):
+    """
+    Deja una sola fila de inventario por refacción (la de menor id) con la
+    suma de existencias, para poder crear el índice único de refaccion_id.
+    """
+    duplicadas = conn.execute(text("""
+        SELECT COUNT(*) FROM (
+            SELECT refaccion_id FROM inventario
+            GROUP BY refaccion_id HAVING COUNT(*) > 1
+        ) d
+    """)).scalar()
+    if not duplicadas:
+        return
+
+    conn.execute(text("""
+        UPDATE inventario SET
+            existencia = (
+                SELECT COALESCE(SUM(i2.existencia), 0) FROM inventario i2
+                WHERE i2.refaccion_id = inventario.refaccion_id
+            ),
+            stock_minimo = (
+                SELECT MAX(i2.stock_minimo) FROM inventario i2
+                WHERE i2.refaccion_id = inventario.refaccion_id
+            ),
+            stock_maximo = (
+                SELECT MAX(i2.stock_maximo) FROM inventario i2
+                WHERE i2.refaccion_id = inventario.refaccion_id
+            )
+        WHERE id IN (
+            SELECT MIN(id) FROM inventario
+            GROUP BY refaccion_id HAVING COUNT(*) > 1
+        )
+    """))
+    conn.execute(text("""
+        DELETE FROM inventario
+        WHERE id NOT IN (SELECT MIN(id) FROM inventario GROUP BY refaccion_id)
+    """))
+    logger.warning("Inventario: %s refacciones con filas duplicadas fusionadas", duplicadas)
+
+
+def _crear_indices(conn: Connection, tabla: Table):
+    for indice in tabla.indexes:
+        indice.create(conn, checkfirst=True)
+
+
+def actualizar_esquema(engine: Engine):
+    """Agrega columnas e índices faltantes en tablas creadas por versiones anteriores."""
+    with engine.begin() as conn:
+        for tabla, columnas in COLUMNAS_AGREGADAS.items():
+            _agregar_columnas(conn, tabla, columnas)
+
+        _fusionar_inventario_duplicado(conn)
+
+        for tabla in (*COLUMNAS_AGREGADAS, *INDICES_AGREGADOS):
+            _crear_indices(conn, tabla)
@@ -0,0 +1,88 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Iterable, Iterator
+
+from fastapi import Query
+from fastapi.responses import StreamingResponse
+
+# -------------------------------------------------------------------
+# EXPORTACIÓN EN STREAMING (NDJSON / CSV)
+# -------------------------------------------------------------------
+# Los endpoints de listado y reportes aceptan ?format=ndjson|csv. En esos
+# modos las filas se escriben conforme llegan del cursor de la base de
+# datos (yield_per), agrupadas en bloques de ~64 KB, en lugar de armar una
+# lista completa en memoria.
+# -------------------------------------------------------------------
+
+TAMANO_BLOQUE = 64 * 1024
+
+TIPOS_CONTENIDO = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def parametro_formato():
+    """Query param ?format=json|ndjson|csv (json = respuesta normal)."""
+    return Query("json", alias="format", pattern="^(json|ndjson|csv)$")
+
+
+def _valor_json(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return str(valor)
+
+
+def _en_bloques(partes: Iterable[str]) -> Iterator[str]:
+    bloque = []
+    tamano = 0
+    for parte in partes:
+        bloque.append(parte)
+        tamano += len(parte)
+        if tamano >= TAMANO_BLOQUE:
+            yield "".join(bloque)
+            bloque = []
+            tamano = 0
+    if bloque:
+        yield "".join(bloque)
+
+
+def _lineas_ndjson(filas: Iterable[dict]) -> Iterator[str]:
+    for fila in filas:
+        yield json.dumps(fila, default=_valor_json, ensure_ascii=False) + "\n"
+
+
+def _lineas_csv(filas: Iterable[dict], columnas: list[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columnas, extrasaction="ignore")
+
+    writer.writeheader()
+    for fila in filas:
+        writer.writerow({
+            k: v.isoformat() if isinstance(v, (datetime, date)) else v
+            for k, v in fila.items()
+        })
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+
+def respuesta_streaming(
+    filas: Iterable[dict],
+    formato: str,
+    columnas: list[str],
+    nombre: str,
+) -> StreamingResponse:
+    """Convierte un iterable de dicts en una respuesta NDJSON o CSV en streaming."""
+    if formato == "csv":
+        partes = _lineas_csv(filas, columnas)
+    else:
+        partes = _lineas_ndjson(filas)
+
+    return StreamingResponse(
+        _en_bloques(partes),
+        media_type=TIPOS_CONTENIDO[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}.{formato}"'},
+    )
@@ -0,0 +1,506 @@
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+
+# -------------------------------------------------------------------
+# TRABAJOS DE IMPORTACIÓN DE ÓRDENES DE COMPRA
+# -------------------------------------------------------------------
+# Extraer texto de un PDF (pdfplumber) es trabajo de CPU que puede tardar
+# segundos. Los endpoints de importación sólo encolan el archivo y
+# responden con un job_id; los PDF se parsean en un pool de procesos
+# acotado y el alta de la OC corre en un hilo con su propia sesión. Los
+# Excel se leen en streaming (parsers/excel.py) directo al importador por
+# bloques, en el mismo hilo. GET /ordenes_compra/importaciones/{job_id}
+# consulta el avance.
+#
+# El registro vive en memoria del proceso: con varios workers de uvicorn
+# el cliente debe consultar al mismo worker (o usar un solo worker).
+#
+# Cada archivo importado queda en importaciones_documentos con el SHA-256
+# de su contenido (y el numero_oc parseado). Subir de nuevo el mismo
+# archivo, o la misma OC escaneada otra vez, devuelve la OC ya creada.
+# -------------------------------------------------------------------
+
+IMPORTACION_WORKERS = int(os.getenv("IMPORTACION_WORKERS", "2"))
+IMPORTACION_MAX_PENDIENTES = int(os.getenv("IMPORTACION_MAX_PENDIENTES", "20"))
+IMPORTACION_TTL = float(os.getenv("IMPORTACION_TTL", "3600"))
+IMPORTACION_PAGINAS_POR_TAREA = int(os.getenv("IMPORTACION_PAGINAS_POR_TAREA", "8"))
+
+# Límites de /importar_lote (también aplican al contenido de los zip)
+MAX_ARCHIVOS_LOTE = 100
+MAX_BYTES_LOTE = 200 * 1024 * 1024
+
+EN_COLA = "en_cola"
+PROCESANDO = "procesando"
+IMPORTANDO = "importando"
+COMPLETADO = "completado"
+ERROR = "error"
+
+TERMINADOS = {COMPLETADO, ERROR}
+
+
+# -------------------------------------------------------------------
+# Funciones que corren en el proceso hijo (deben ser importables)
+# -------------------------------------------------------------------
+
+def _parsear_pdf(contenido: bytes) -> dict:
+    from . import crud
+    return crud.parsear_oc_desde_texto(crud.extraer_texto_de_pdf(contenido))
+
+
+def _parsear_excel(contenido: bytes) -> dict:
+    from . import crud
+    return crud.parsear_oc_desde_excel(contenido)
+
+
+def _contar_paginas_pdf(contenido: bytes) -> int:
+    from . import crud
+    return crud.contar_paginas_pdf(contenido)
+
+
+def _extraer_paginas_pdf(contenido: bytes, inicio: int, fin: int) -> list[str]:
+    from . import crud
+    return crud.extraer_paginas_pdf(contenido, inicio, fin)
+
+
+PARSERS = {
+    "pdf": _parsear_pdf,
+    "excel": _parsear_excel,
+}
+
+
+# -------------------------------------------------------------------
+# Archivos de un lote
+# -------------------------------------------------------------------
+
+def huella(contenido: bytes) -> str:
+    return hashlib.sha256(contenido).hexdigest()
+
+
+def tipo_de_archivo(nombre: str | None) -> str | None:
+    nombre = (nombre or "").lower()
+    if nombre.endswith(".pdf"):
+        return "pdf"
+    if nombre.endswith(".xlsx"):
+        return "excel"
+    if nombre.endswith(".zip"):
+        return "zip"
+    return None
+
+
+def expandir_archivos(archivos: list[tuple[str, bytes]]) -> list[tuple[str, bytes]]:
+    """
+    Sustituye cada .zip por los archivos que contiene (nombre "lote.zip/oc.pdf").
+    Valida el número de archivos y el tamaño total descomprimido antes de leer.
+    """
+    expandidos = []
+    total = 0
+
+    for nombre, contenido in archivos:
+        if tipo_de_archivo(nombre) != "zip":
+            expandidos.append((nombre, contenido))
+            total += len(contenido)
+            continue
+
+        try:
+            zf = zipfile.ZipFile(io.BytesIO(contenido))
+        except zipfile.BadZipFile:
+            expandidos.append((nombre, contenido))
+            continue
+
+        with zf:
+            entradas = [
+                info for info in zf.infolist()
+                if not info.is_dir() and not os.path.basename(info.filename).startswith(".")
+            ]
+            total += sum(info.file_size for info in entradas)
+            if len(expandidos) + len(entradas) > MAX_ARCHIVOS_LOTE or total > MAX_BYTES_LOTE:
+                raise _lote_excedido()
+            for info in entradas:
+                expandidos.append((f"{nombre}/{info.filename}", zf.read(info)))
+
+    if len(expandidos) > MAX_ARCHIVOS_LOTE or total > MAX_BYTES_LOTE:
+        raise _lote_excedido()
+    return expandidos
+
+
+def _lote_excedido() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"El lote excede {MAX_ARCHIVOS_LOTE} archivos o {MAX_BYTES_LOTE // (1024 * 1024)} MB"
+    )
+
+
+# -------------------------------------------------------------------
+# Registro de trabajos
+# -------------------------------------------------------------------
+
+class Trabajo:
+    def __init__(self, tipo: str, nombre_archivo: str | None):
+        self.job_id = uuid.uuid4().hex
+        self.tipo = tipo
+        self.nombre_archivo = nombre_archivo
+        self.estado = EN_COLA
+        self.progreso = 0
+        self.vista_previa = None
+        self.oc_id = None
+        self.reutilizado = False
+        self.error = None
+        self.creado = datetime.utcnow()
+        self.actualizado = self.creado
+        self._terminado_en = None
+
+    def actualizar(self, estado: str, progreso: int, **campos):
+        self.estado = estado
+        self.progreso = progreso
+        for nombre, valor in campos.items():
+            setattr(self, nombre, valor)
+        self.actualizado = datetime.utcnow()
+        if estado in TERMINADOS:
+            self._terminado_en = time.monotonic()
+
+
+class GestorImportaciones:
+    def __init__(self, workers: int, max_pendientes: int, ttl_segundos: float):
+        self.workers = workers
+        self.max_pendientes = max_pendientes
+        self.ttl_segundos = ttl_segundos
+        self._trabajos: dict[str, Trabajo] = {}
+        self._en_curso: dict[str, Trabajo] = {}  # huella -> trabajo sin terminar
+        self._lock = threading.Lock()
+        self._procesos = None
+        self._hilos = None
+
+    def _ejecutores(self):
+        with self._lock:
+            if self._procesos is None:
+                # spawn: el servidor ya tiene hilos y fork no es seguro con ellos
+                self._procesos = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                self._hilos = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="importacion"
+                )
+            return self._procesos, self._hilos
+
+    def _purgar(self):
+        limite = time.monotonic() - self.ttl_segundos
+        for job_id in [
+            t.job_id for t in self._trabajos.values()
+            if t._terminado_en is not None and t._terminado_en < limite
+        ]:
+            del self._trabajos[job_id]
+
+    def pendientes(self) -> int:
+        return sum(1 for t in self._trabajos.values() if t.estado not in TERMINADOS)
+
+    def encolar(self, tipo: str, nombre_archivo: str | None, contenido: bytes, crear_sesion) -> Trabajo:
+        """
+        Registra el trabajo y lo manda al pool. `crear_sesion` abre la sesión de
+        base de datos con la que se da de alta la OC al terminar el parseo.
+        Un archivo ya importado (o que se está importando) no se procesa de nuevo.
+        """
+        from . import crud
+
+        if tipo not in PARSERS:
+            raise HTTPException(status_code=400, detail="Tipo no soportado")
+
+        clave = huella(contenido)
+
+        with self._lock:
+            en_curso = self._en_curso.get(clave)
+            if en_curso is not None:
+                return en_curso
+
+        db = crear_sesion()
+        try:
+            previo = crud.get_importaciones_por_huella(db, [clave]).get(clave)
+        finally:
+            db.close()
+
+        if previo is not None:
+            trabajo = Trabajo(tipo, nombre_archivo)
+            trabajo.actualizar(
+                COMPLETADO, 100,
+                oc_id=previo.oc_id,
+                reutilizado=True,
+                vista_previa=json.loads(previo.resultado) if previo.resultado else None,
+            )
+            with self._lock:
+                self._trabajos[trabajo.job_id] = trabajo
+            return trabajo
+
+        with self._lock:
+            self._purgar()
+            if clave in self._en_curso:
+                return self._en_curso[clave]
+            if self.pendientes() >= self.max_pendientes:
+                raise HTTPException(
+                    status_code=429,
+                    detail="Hay demasiadas importaciones en curso, intente más tarde"
+                )
+            trabajo = Trabajo(tipo, nombre_archivo)
+            self._trabajos[trabajo.job_id] = trabajo
+            self._en_curso[clave] = trabajo
+
+        _, hilos = self._ejecutores()
+        hilos.submit(self._ejecutar, trabajo, clave, contenido, crear_sesion)
+        return trabajo
+
+    def _ejecutar(self, trabajo: Trabajo, clave: str, contenido: bytes, crear_sesion):
+        from . import crud
+
+        importacion = {
+            "sha256": clave,
+            "tipo": trabajo.tipo,
+            "nombre_archivo": trabajo.nombre_archivo,
+        }
+        try:
+            db = crear_sesion()
+            try:
+                reutilizado = False
+                try:
+                    if trabajo.tipo == "excel":
+                        # Lectura read-only en streaming directo al importador por
+                        # bloques: memoria constante, sin copiar partidas entre procesos
+                        trabajo.actualizar(IMPORTANDO, 10)
+                        oc, vista_previa = crud.importar_oc_desde_excel(
+                            db, contenido, {**importacion, "numero_oc": None}
+                        )
+                        oc_id = oc.id
+                    else:
+                        procesos, _ = self._ejecutores()
+                        trabajo.actualizar(PROCESANDO, 10)
+                        vista_previa = procesos.submit(PARSERS[trabajo.tipo], contenido).result()
+                        importacion.update(
+                            numero_oc=vista_previa.get("numero_oc"), resultado=vista_previa
+                        )
+
+                        # Otro archivo con la misma OC (p. ej. escaneada de nuevo)
+                        numero_oc = importacion["numero_oc"]
+                        previo = crud.get_importaciones_por_numero_oc(db, [numero_oc]).get(numero_oc)
+                        if previo is not None:
+                            oc_id, reutilizado = previo.oc_id, True
+                            crud.registrar_importaciones(db, [{**importacion, "oc_id": oc_id}])
+                            db.commit()
+                        else:
+                            trabajo.actualizar(IMPORTANDO, 70, vista_previa=vista_previa)
+                            oc_id = crud.importar_orden_compra_desde_json(
+                                db, vista_previa, importacion
+                            ).id
+                except IntegrityError:
+                    # Otro proceso importó el mismo archivo primero: su OC es la buena
+                    db.rollback()
+                    previo = crud.get_importaciones_por_huella(db, [clave]).get(clave)
+                    if previo is None:
+                        raise
+                    oc_id, reutilizado = previo.oc_id, True
+                    vista_previa = json.loads(previo.resultado) if previo.resultado else None
+            finally:
+                db.close()
+
+            trabajo.actualizar(
+                COMPLETADO, 100, oc_id=oc_id, vista_previa=vista_previa, reutilizado=reutilizado
+            )
+        except HTTPException as e:
+            trabajo.actualizar(ERROR, 100, error=str(e.detail))
+        except Exception as e:
+            trabajo.actualizar(ERROR, 100, error=str(e) or e.__class__.__name__)
+        finally:
+            with self._lock:
+                self._en_curso.pop(clave, None)
+
+    def parsear_lote(self, archivos: list[tuple[str, bytes]]) -> list[dict]:
+        """
+        Parsea varios archivos en el pool de procesos. Las páginas de cada PDF
+        se reparten en tareas de IMPORTACION_PAGINAS_POR_TAREA páginas, así un
+        PDF grande usa todos los procesos. Devuelve, en el mismo orden,
+        {"archivo", "tipo", "data"} o {"archivo", "tipo", "error"}.
+        """
+        from . import crud
+
+        procesos, _ = self._ejecutores()
+        tipos = [tipo_de_archivo(nombre) for nombre, _ in archivos]
+
+        conteos, excels = {}, {}
+        for i, ((_, contenido), tipo) in enumerate(zip(archivos, tipos)):
+            if tipo == "pdf":
+                conteos[i] = procesos.submit(_contar_paginas_pdf, contenido)
+            elif tipo == "excel":
+                excels[i] = procesos.submit(_parsear_excel, contenido)
+
+        bloques, errores = {}, {}
+        for i, futuro in conteos.items():
+            try:
+                paginas = futuro.result()
+            except Exception as e:
+                errores[i] = f"PDF ilegible: {e}"
+                continue
+            contenido = archivos[i][1]
+            bloques[i] = [
+                procesos.submit(
+                    _extraer_paginas_pdf, contenido, inicio,
+                    min(inicio + IMPORTACION_PAGINAS_POR_TAREA, paginas)
+                )
+                for inicio in range(0, paginas, IMPORTACION_PAGINAS_POR_TAREA)
+            ]
+
+        resultados = []
+        for i, (nombre, _) in enumerate(archivos):
+            resultado = {"archivo": nombre, "tipo": tipos[i]}
+            try:
+                if tipos[i] == "zip":
+                    raise ValueError("Archivo .zip inválido")
+                if tipos[i] not in PARSERS:
+                    raise ValueError("Tipo de archivo no soportado (use .pdf, .xlsx o .zip)")
+                if i in errores:
+                    raise ValueError(errores[i])
+                if tipos[i] == "excel":
+                    resultado["data"] = excels[i].result()
+                else:
+                    paginas = [p for futuro in bloques[i] for p in futuro.result()]
+                    resultado["data"] = crud.parsear_oc_desde_texto(
+                        "".join(p + "\n" for p in paginas)
+                    )
+            except Exception as e:
+                resultado["error"] = str(e) or e.__class__.__name__
+            resultados.append(resultado)
+
+        return resultados
+
+    def importar_lote(
+        self, db, archivos: list[tuple[str, bytes]], reintentar: bool = True
+    ) -> list[dict]:
+        """
+        Parsea e importa un lote (ver parsear_lote) en una transacción. Los
+        archivos ya importados, repetidos dentro del lote o con un numero_oc
+        ya registrado no se vuelven a crear: se responde con la OC existente
+        y reutilizada=True. Devuelve un resumen por archivo. Las OC y sus filas
+        de cache se guardan en la misma transacción.
+        """
+        from . import crud
+
+        huellas = [huella(contenido) for _, contenido in archivos]
+        previos = crud.get_importaciones_por_huella(db, huellas)
+
+        primera = {}
+        for i, h in enumerate(huellas):
+            primera.setdefault(h, i)
+        por_parsear = [i for i, h in enumerate(huellas) if h not in previos and primera[h] == i]
+        parseados = dict(zip(por_parsear, self.parsear_lote([archivos[i] for i in por_parsear])))
+
+        por_numero = crud.get_importaciones_por_numero_oc(
+            db, [p["data"].get("numero_oc") for p in parseados.values() if "data" in p]
+        )
+
+        resumen = {}
+        nuevos = {}              # índice -> documento a importar
+        mismo_numero = {}        # índice -> índice del lote con la misma OC
+        numeros_en_lote = {}
+        for i in por_parsear:
+            data = parseados[i].get("data") or {}
+            numero = data.get("numero_oc")
+            r = {
+                "archivo": archivos[i][0],
+                "numero_oc": numero,
+                "proveedor": data.get("proveedor"),
+                "partidas": len(data.get("detalles", [])),
+            }
+            if "error" in parseados[i]:
+                r["error"] = parseados[i]["error"]
+            elif not data["detalles"]:
+                r["error"] = "No se encontraron partidas"
+            elif numero in por_numero:
+                r.update(oc_id=por_numero[numero].oc_id, reutilizada=True)
+            elif numero in numeros_en_lote:
+                mismo_numero[i] = numeros_en_lote[numero]
+                r["reutilizada"] = True
+            else:
+                nuevos[i] = data
+                if numero:
+                    numeros_en_lote[numero] = i
+            resumen[i] = r
+
+        # Filas de cache en la misma transacción que las OC: las nuevas y las
+        # que repiten un numero_oc del lote apuntan a su documento
+        posicion = {i: k for k, i in enumerate(nuevos)}
+        importaciones = []
+        for i, r in resumen.items():
+            if "error" in r:
+                continue
+            fila = {
+                "sha256": huellas[i],
+                "tipo": parseados[i]["tipo"],
+                "nombre_archivo": r["archivo"],
+                "numero_oc": r["numero_oc"],
+                "resultado": parseados[i]["data"],
+            }
+            if i in posicion:
+                fila["documento"] = posicion[i]
+            elif i in mismo_numero:
+                fila["documento"] = posicion[mismo_numero[i]]
+            else:
+                fila["oc_id"] = r["oc_id"]
+            importaciones.append(fila)
+
+        try:
+            ocs = crud.importar_ordenes_compra_en_lote(db, list(nuevos.values()), importaciones)
+        except IntegrityError:
+            # Otro proceso registró alguno de estos archivos mientras se
+            # parseaban: se repite una vez, ahora como reutilizados
+            if reintentar and crud.get_importaciones_por_huella(db, huellas).keys() - previos.keys():
+                return self.importar_lote(db, archivos, reintentar=False)
+            raise
+
+        for i, oc in zip(nuevos, ocs):
+            resumen[i]["oc_id"] = oc.id
+        for i, j in mismo_numero.items():
+            resumen[i]["oc_id"] = resumen[j]["oc_id"]
+
+        resultados = []
+        for i, (nombre, _) in enumerate(archivos):
+            h = huellas[i]
+            if h in previos:
+                r = {"numero_oc": previos[h].numero_oc, "oc_id": previos[h].oc_id, "reutilizada": True}
+            elif primera[h] != i:
+                r = {**resumen[primera[h]], "reutilizada": "error" not in resumen[primera[h]]}
+            else:
+                r = resumen[i]
+            resultados.append({
+                "oc_id": None, "numero_oc": None, "proveedor": None, "partidas": 0,
+                "reutilizada": False, "error": None,
+                **r,
+                "archivo": nombre,
+                "ok": "error" not in r,
+            })
+        return resultados
+
+    def obtener(self, job_id: str) -> Trabajo | None:
+        with self._lock:
+            return self._trabajos.get(job_id)
+
+    def cerrar(self):
+        with self._lock:
+            procesos, hilos = self._procesos, self._hilos
+            self._procesos = self._hilos = None
+        if hilos is not None:
+            hilos.shutdown(wait=False, cancel_futures=True)
+        if procesos is not None:
+            procesos.shutdown(wait=False, cancel_futures=True)
+
+
+importaciones_oc = GestorImportaciones(
+    IMPORTACION_WORKERS, IMPORTACION_MAX_PENDIENTES, IMPORTACION_TTL
+)
@@ -1,10 +1,25 @@
 import os
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-
-from .database import Base, engine, SessionLocal
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import OperationalError
+
+from .database import (
+    ASYNC_DB,
+    DATABASE_READ_URL,
+    Base,
+    SessionLocal,
+    cerrar_async_engine,
+    contar_evento_pool,
+    engine,
+    es_timeout_de_sentencia,
+    get_async_engine,
+)
 from .auth_utils import hash_password
-from . import models
+from . import models, crud
+from .esquema import actualizar_esquema
+from .importaciones import importaciones_oc
+from .replica import latido_primaria
 
 
 # ============================================================
@@ -50,6 +65,34 @@ def crear_admin_inicial():
         db.close()
 
 
+# ============================================================
+# PRECIOS DE COMPRA (BASES ANTERIORES A precios_refaccion)
+# ============================================================
+
+def inicializar_precios_refaccion():
+    db = SessionLocal()
+    try:
+        sin_historial = db.query(models.HistorialPrecio.id).first() is None
+        hay_partidas = db.query(models.OrdenCompraDetalle.id).first() is not None
+
+        if sin_historial and hay_partidas:
+            crud.recalcular_precios_refaccion(db)
+    finally:
+        db.close()
+
+
+# ============================================================
+# DESCRIPCIONES NORMALIZADAS (REFACCIONES ANTERIORES A LA COLUMNA)
+# ============================================================
+
+def inicializar_descripciones_normalizadas():
+    db = SessionLocal()
+    try:
+        crud.normalizar_descripciones_refaccion(db)
+    finally:
+        db.close()
+
+
 # ============================================================
 # CONFIGURACIÓN DE LA APLICACIÓN
 # ============================================================
@@ -90,7 +133,7 @@ def create_app() -> FastAPI:
         allow_credentials=allow_credentials,
         allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
         allow_headers=["Authorization", "Content-Type", "Accept", "Origin", "X-Requested-With"],
-        expose_headers=["Content-Disposition"],
+        expose_headers=["Content-Disposition", "X-Next-Cursor"],
     )
 
     # -------------------------
@@ -111,6 +154,7 @@ def create_app() -> FastAPI:
         dashboard,
         ui,
         proveedores,
+        sistema,
     )
 
     app.include_router(vehiculos.router)
@@ -127,6 +171,20 @@ def create_app() -> FastAPI:
     app.include_router(dashboard.router)
     app.include_router(ui.router)
     app.include_router(proveedores.router)
+    app.include_router(sistema.router)
+
+    # -------------------------
+    # Sentencias canceladas por tiempo límite (ver database.py)
+    # -------------------------
+    @app.exception_handler(OperationalError)
+    async def sentencia_cancelada(request: Request, exc: OperationalError):
+        if not es_timeout_de_sentencia(exc):
+            raise exc
+        contar_evento_pool("timeouts_sentencia")
+        return JSONResponse(
+            status_code=504,
+            content={"detail": "La consulta excedió el tiempo límite"},
+        )
 
     # -------------------------
     # Endpoints base
@@ -157,5 +215,25 @@ app = create_app()
 @app.on_event("startup")
 def on_startup():
     Base.metadata.create_all(bind=engine)
+    actualizar_esquema(engine)
     crear_admin_inicial()
-    
\ No newline at end of file
+    inicializar_precios_refaccion()
+    inicializar_descripciones_normalizadas()
+    if ASYNC_DB:
+        get_async_engine()      # falla al arrancar si falta el driver
+        if DATABASE_READ_URL:
+            get_async_engine("lectura")
+    if latido_primaria is not None:
+        latido_primaria.iniciar()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    importaciones_oc.cerrar()
+    if latido_primaria is not None:
+        latido_primaria.detener()
+
+
+@app.on_event("shutdown")
+async def on_shutdown_async():
+    await cerrar_async_engine()
@@ -1,10 +1,22 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float
-from sqlalchemy.orm import relationship
+import re
+import unicodedata
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float, Index
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy import Boolean
 from datetime import datetime
 from .database import Base
 
 
+def normalizar_descripcion(texto: str | None) -> str | None:
+    """Mayúsculas, sin acentos y con espacios colapsados (para comparar descripciones)."""
+    if texto is None:
+        return None
+    sin_acentos = "".join(
+        c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c)
+    )
+    return re.sub(r"\s+", " ", sin_acentos).strip().upper()
+
+
 # ============================================================
 # VEHICULOS
 # ============================================================
@@ -34,7 +46,7 @@ class OrdenServicio(Base):
     __tablename__ = "ordenes_servicio"
 
     id = Column(Integer, primary_key=True, index=True)
-    vehiculo_id = Column(Integer, ForeignKey("vehiculos.id"), nullable=False)
+    vehiculo_id = Column(Integer, ForeignKey("vehiculos.id"), nullable=False, index=True)
     fecha_creacion = Column(DateTime, default=datetime.utcnow)
     diagnostico = Column(Text, nullable=True)
     estado = Column(String, default="pendiente")
@@ -55,11 +67,18 @@ class Refaccion(Base):
     id = Column(Integer, primary_key=True, index=True)
     clave = Column(String, unique=True, index=True, nullable=False)
     descripcion = Column(String, nullable=False)
+    # Se llena sola al asignar `descripcion`; los INSERT en lote deben enviarla
+    descripcion_normalizada = Column(String, index=True, nullable=True)
     unidad_medida = Column(String, default="pieza")
 
     # Relaciones útiles para reportes
     inventario = relationship("Inventario", uselist=False, back_populates="refaccion")
 
+    @validates("descripcion")
+    def _normalizar_descripcion(self, key, descripcion):
+        self.descripcion_normalizada = normalizar_descripcion(descripcion)
+        return descripcion
+
 
 # ============================================================
 # SOLICITUDES DE REFACCIONES
@@ -112,7 +131,7 @@ class OrdenCompraDetalle(Base):
     __tablename__ = "ordenes_compra_detalle"
 
     id = Column(Integer, primary_key=True, index=True)
-    oc_id = Column(Integer, ForeignKey("ordenes_compra.id"), nullable=False)
+    oc_id = Column(Integer, ForeignKey("ordenes_compra.id"), nullable=False, index=True)
     refaccion_id = Column(Integer, ForeignKey("refacciones.id"), nullable=False)
     cantidad = Column(Integer, nullable=False)
     precio_unitario = Column(Float, nullable=True)
@@ -121,6 +140,77 @@ class OrdenCompraDetalle(Base):
     refaccion = relationship("Refaccion")
 
 
+# ============================================================
+# PRECIOS DE COMPRA (MANTENIDOS AL CREAR / IMPORTAR OC)
+# ============================================================
+
+class PrecioRefaccion(Base):
+    """
+    Último precio de compra y estadísticas acumuladas por refacción
+    (una fila por refacción). Se actualiza de forma incremental.
+    """
+    __tablename__ = "precios_refaccion"
+
+    refaccion_id = Column(Integer, ForeignKey("refacciones.id"), primary_key=True)
+    ultimo_precio = Column(Float, nullable=False)
+    ultimo_oc_id = Column(Integer, ForeignKey("ordenes_compra.id"), nullable=True)
+    ultimo_detalle_id = Column(Integer, nullable=True)
+    fecha_actualizacion = Column(DateTime, default=datetime.utcnow)
+
+    precio_min = Column(Float, nullable=True)
+    precio_max = Column(Float, nullable=True)
+    suma_precios = Column(Float, default=0)
+    num_compras = Column(Integer, default=0)
+
+    refaccion = relationship("Refaccion")
+
+    @property
+    def precio_promedio(self):
+        return self.suma_precios / self.num_compras if self.num_compras else None
+
+
+class HistorialPrecio(Base):
+    """Una fila por partida de OC con precio, para consultas por refacción y fecha."""
+    __tablename__ = "historial_precios"
+
+    id = Column(Integer, primary_key=True, index=True)
+    refaccion_id = Column(Integer, ForeignKey("refacciones.id"), nullable=False)
+    oc_id = Column(Integer, ForeignKey("ordenes_compra.id"), nullable=False)
+    oc_detalle_id = Column(Integer, ForeignKey("ordenes_compra_detalle.id"), nullable=False)
+    proveedor = Column(String, nullable=True)
+    precio_unitario = Column(Float, nullable=False)
+    fecha = Column(DateTime, default=datetime.utcnow)
+
+    refaccion = relationship("Refaccion")
+
+    __table_args__ = (
+        Index("ix_historial_precios_refaccion_fecha", "refaccion_id", "fecha"),
+        Index("ix_historial_precios_refaccion_precio", "refaccion_id", "precio_unitario"),
+        Index("ix_historial_precios_proveedor_fecha", "proveedor", "fecha"),
+    )
+
+
+# ============================================================
+# DOCUMENTOS DE OC IMPORTADOS (CACHE POR CONTENIDO)
+# ============================================================
+
+class ImportacionDocumento(Base):
+    """
+    Un archivo (PDF/Excel) ya importado, identificado por el SHA-256 de su
+    contenido. Volver a subirlo devuelve la OC creada sin reprocesar.
+    """
+    __tablename__ = "importaciones_documentos"
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), unique=True, index=True, nullable=False)
+    tipo = Column(String, nullable=False)
+    nombre_archivo = Column(String, nullable=True)
+    numero_oc = Column(String, index=True, nullable=True)
+    oc_id = Column(Integer, ForeignKey("ordenes_compra.id"), nullable=False)
+    resultado = Column(Text, nullable=True)  # JSON del parseo (vista previa)
+    fecha = Column(DateTime, default=datetime.utcnow)
+
+
 # ============================================================
 # RECEPCIONES
 # ============================================================
@@ -129,7 +219,7 @@ class Recepcion(Base):
     __tablename__ = "recepciones"
 
     id = Column(Integer, primary_key=True, index=True)
-    oc_id = Column(Integer, ForeignKey("ordenes_compra.id"), nullable=False)
+    oc_id = Column(Integer, ForeignKey("ordenes_compra.id"), nullable=False, index=True)
     fecha_recepcion = Column(DateTime, default=datetime.utcnow)
     recibido_por = Column(String, nullable=False)
 
@@ -141,7 +231,7 @@ class RecepcionDetalle(Base):
     __tablename__ = "recepciones_detalle"
 
     id = Column(Integer, primary_key=True, index=True)
-    recepcion_id = Column(Integer, ForeignKey("recepciones.id"), nullable=False)
+    recepcion_id = Column(Integer, ForeignKey("recepciones.id"), nullable=False, index=True)
     refaccion_id = Column(Integer, ForeignKey("refacciones.id"), nullable=False)
     cantidad_recibida = Column(Integer, nullable=False)
     cantidad_oc = Column(Integer, nullable=True)
@@ -158,8 +248,8 @@ class SalidaRefaccion(Base):
     __tablename__ = "salidas_refacciones"
 
     id = Column(Integer, primary_key=True, index=True)
-    orden_servicio_id = Column(Integer, ForeignKey("ordenes_servicio.id"), nullable=False)
-    fecha_salida = Column(DateTime, default=datetime.utcnow)
+    orden_servicio_id = Column(Integer, ForeignKey("ordenes_servicio.id"), nullable=False, index=True)
+    fecha_salida = Column(DateTime, default=datetime.utcnow, index=True)
     entregado_por = Column(String, nullable=False)
     recibido_por = Column(String, nullable=False)
 
@@ -171,8 +261,8 @@ class SalidaDetalle(Base):
     __tablename__ = "salidas_detalle"
 
     id = Column(Integer, primary_key=True, index=True)
-    salida_id = Column(Integer, ForeignKey("salidas_refacciones.id"), nullable=False)
-    refaccion_id = Column(Integer, ForeignKey("refacciones.id"), nullable=False)
+    salida_id = Column(Integer, ForeignKey("salidas_refacciones.id"), nullable=False, index=True)
+    refaccion_id = Column(Integer, ForeignKey("refacciones.id"), nullable=False, index=True)
     cantidad = Column(Integer, nullable=False)
 
     salida = relationship("SalidaRefaccion", back_populates="detalles")
@@ -187,8 +277,12 @@ class Inventario(Base):
     __tablename__ = "inventario"
 
     id = Column(Integer, primary_key=True, index=True)
-    refaccion_id = Column(Integer, ForeignKey("refacciones.id"), nullable=False)
-    existencia = Column(Integer, default=0)
+    refaccion_id = Column(Integer, ForeignKey("refacciones.id"), nullable=False, unique=True, index=True)
+    existencia = Column(Integer, default=0, index=True)
+
+    # Umbrales de reorden por refacción (NULL = usar el mínimo global del reporte)
+    stock_minimo = Column(Integer, nullable=True)
+    stock_maximo = Column(Integer, nullable=True)
 
     refaccion = relationship("Refaccion", back_populates="inventario")
 
@@ -209,6 +303,28 @@ class MovimientoInventario(Base):
 
     refaccion = relationship("Refaccion")
 
+    __table_args__ = (
+        Index("ix_movimientos_refaccion_fecha_id", "refaccion_id", "fecha", "id"),
+    )
+
+
+class SaldoKardex(Base):
+    """
+    Checkpoint del saldo de una refacción: saldo acumulado hasta (e incluyendo)
+    el movimiento `movimiento_id`. Se genera cada KARDEX_CHECKPOINT_CADA movimientos.
+    """
+    __tablename__ = "saldos_kardex"
+
+    id = Column(Integer, primary_key=True, index=True)
+    refaccion_id = Column(Integer, ForeignKey("refacciones.id"), nullable=False)
+    movimiento_id = Column(Integer, ForeignKey("movimientos_inventario.id"), nullable=False)
+    fecha = Column(DateTime, nullable=False)
+    saldo = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_saldos_kardex_refaccion_fecha", "refaccion_id", "fecha", "movimiento_id"),
+    )
+
 
 # ============================================================
 # USUARIOS Y ROLES
@@ -251,3 +367,20 @@ class Proveedor(Base):
     email = Column(String, nullable=True)
     direccion = Column(String, nullable=True)
     activo = Column(Boolean, default=True)
+
+
+# ============================================================
+# LATIDO DE REPLICACIÓN
+# ============================================================
+
+class LatidoReplica(Base):
+    """
+    Una sola fila que la primaria actualiza cada pocos segundos. En la
+    réplica, su antigüedad es el retraso de replicación (ver replica.py);
+    se usa con réplicas que no son PostgreSQL y, en PostgreSQL, si la réplica
+    todavía no tiene marca de tiempo de reproducción.
+    """
+    __tablename__ = "latido_replica"
+
+    id = Column(Integer, primary_key=True)
+    fecha = Column(DateTime, nullable=False)
@@ -0,0 +1,190 @@
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, NamedTuple
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import and_, or_
+
+# -------------------------------------------------------------------
+# CURSORES OPACOS
+# -------------------------------------------------------------------
+# Un cursor es un JSON compacto en base64 url-safe. El cliente sólo lo
+# reenvía tal cual en ?cursor=...; el siguiente cursor viaja en el header
+# X-Next-Cursor para no cambiar la forma (lista) de las respuestas.
+# -------------------------------------------------------------------
+
+HEADER_SIGUIENTE_CURSOR = "X-Next-Cursor"
+
+LIMITE_DEFECTO = 100
+LIMITE_MAXIMO = 1000
+
+
+class Pagina(NamedTuple):
+    items: list
+    siguiente_cursor: str | None = None
+
+
+def codificar_cursor(datos: dict[str, Any]) -> str:
+    crudo = json.dumps(datos, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> dict[str, Any]:
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+    if not isinstance(datos, dict):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    return datos
+
+
+def responder_pagina(response: Response, pagina: Pagina) -> list:
+    """Pone el siguiente cursor en el header y devuelve los items."""
+    if pagina.siguiente_cursor:
+        response.headers[HEADER_SIGUIENTE_CURSOR] = pagina.siguiente_cursor
+    return pagina.items
+
+
+# -------------------------------------------------------------------
+# PAGINACIÓN KEYSET PARA LISTADOS
+# -------------------------------------------------------------------
+# El orden es siempre (campo, id), así que el cursor sólo necesita el valor
+# del campo y el id de la última fila. Cada página es una consulta por
+# rango sobre el índice, sin OFFSET: el costo no crece con la página.
+# Los NULL del campo de orden van al final en ambos sentidos.
+# -------------------------------------------------------------------
+
+class ParametrosPagina:
+    """Dependencia común: ?cursor=...&limit=...&orden=campo|-campo"""
+
+    def __init__(
+        self,
+        cursor: str | None = None,
+        limit: int = Query(LIMITE_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+        orden: str | None = None,
+    ):
+        self.cursor = cursor
+        self.limit = limit
+        self.orden = orden
+
+
+def _serializar_valor(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return valor
+
+
+def _deserializar_valor(columna, valor):
+    if valor is None:
+        return None
+    try:
+        tipo = columna.type.python_type
+    except NotImplementedError:
+        return valor
+    if tipo is datetime:
+        return datetime.fromisoformat(valor)
+    if tipo is date:
+        return date.fromisoformat(valor)
+    return tipo(valor)
+
+
+def _aplicar_keyset(query, columna_id, campos_orden: dict, parametros: ParametrosPagina, orden_defecto: str):
+    """Filtro del cursor, orden y límite. Sirve igual para Query que para select()."""
+    orden = parametros.orden or orden_defecto
+    descendente = orden.startswith("-")
+    nombre = orden.lstrip("-")
+
+    if nombre != "id" and nombre not in campos_orden:
+        permitidos = ", ".join(sorted(["id", *campos_orden]))
+        raise HTTPException(status_code=400, detail=f"Orden no permitido: {nombre}. Use: {permitidos}")
+
+    columna = columna_id if nombre == "id" else campos_orden[nombre]
+    admite_nulos = nombre != "id" and columna.expression.nullable
+
+    if parametros.cursor:
+        datos = decodificar_cursor(parametros.cursor)
+        if datos.get("o") != orden or "id" not in datos:
+            raise HTTPException(status_code=400, detail="El cursor no corresponde al orden solicitado")
+        try:
+            ultimo_id = int(datos["id"])
+            ultimo_valor = _deserializar_valor(columna, datos.get("v"))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+
+        if nombre == "id":
+            query = query.filter(columna < ultimo_id if descendente else columna > ultimo_id)
+        elif ultimo_valor is None:
+            query = query.filter(
+                columna.is_(None),
+                columna_id < ultimo_id if descendente else columna_id > ultimo_id
+            )
+        else:
+            siguiente = columna < ultimo_valor if descendente else columna > ultimo_valor
+            empate = and_(
+                columna == ultimo_valor,
+                columna_id < ultimo_id if descendente else columna_id > ultimo_id
+            )
+            condiciones = [siguiente, empate]
+            if admite_nulos:
+                condiciones.append(columna.is_(None))
+            query = query.filter(or_(*condiciones))
+
+    criterios = []
+    if admite_nulos:
+        criterios.append(columna.is_(None))
+    if nombre != "id":
+        criterios.append(columna.desc() if descendente else columna.asc())
+    criterios.append(columna_id.desc() if descendente else columna_id.asc())
+
+    query = query.order_by(*criterios).limit(parametros.limit + 1)
+    return query, orden, None if nombre == "id" else columna.key
+
+
+def _cerrar_pagina(filas: list, parametros: ParametrosPagina, orden: str, atributo: str | None) -> Pagina:
+    siguiente_cursor = None
+    if len(filas) > parametros.limit:
+        filas = filas[:parametros.limit]
+        ultima = filas[-1]
+        valor = ultima.id if atributo is None else getattr(ultima, atributo)
+        siguiente_cursor = codificar_cursor({
+            "o": orden,
+            "v": _serializar_valor(valor),
+            "id": ultima.id,
+        })
+
+    return Pagina(filas, siguiente_cursor)
+
+
+def paginar_keyset(
+    query,
+    columna_id,
+    campos_orden: dict,
+    parametros: ParametrosPagina | None = None,
+    orden_defecto: str = "id",
+) -> Pagina:
+    """
+    Aplica orden, cursor y límite a `query` (que debe devolver entidades con `id`).
+    `campos_orden` es la lista blanca {nombre: columna} de campos ordenables.
+    """
+    parametros = parametros or ParametrosPagina(limit=LIMITE_DEFECTO)
+    query, orden, atributo = _aplicar_keyset(query, columna_id, campos_orden, parametros, orden_defecto)
+    return _cerrar_pagina(query.all(), parametros, orden, atributo)
+
+
+async def paginar_keyset_async(
+    db,
+    stmt,
+    columna_id,
+    campos_orden: dict,
+    parametros: ParametrosPagina | None = None,
+    orden_defecto: str = "id",
+) -> Pagina:
+    """Igual que paginar_keyset, para un select() de entidades sobre una AsyncSession."""
+    parametros = parametros or ParametrosPagina(limit=LIMITE_DEFECTO)
+    stmt, orden, atributo = _aplicar_keyset(stmt, columna_id, campos_orden, parametros, orden_defecto)
+    filas = (await db.scalars(stmt)).all()
+    return _cerrar_pagina(list(filas), parametros, orden, atributo)
@@ -0,0 +1,218 @@
+import io
+import unicodedata
+from itertools import chain
+from typing import BinaryIO, Iterator
+
+import openpyxl
+import pandas as pd
+
+# -------------------------------------------------------------------
+# LECTURA EN STREAMING DE OC EN EXCEL
+# -------------------------------------------------------------------
+# openpyxl en modo read_only/values_only recorre la hoja fila por fila sin
+# cargar estilos ni el libro completo, así la memoria no depende del tamaño
+# de la hoja. Las primeras filas se examinan para encontrar el renglón de
+# encabezados (CANTIDAD, DESCRIPCIÓN, PRECIO...) y mapear columnas; si no
+# hay encabezados se usa el formato posicional de siempre:
+#     cantidad | unidad | descripción | precio
+# -------------------------------------------------------------------
+
+FILAS_BUSQUEDA_ENCABEZADO = 50
+MAX_ADVERTENCIAS = 100
+
+# Nombre de campo -> textos de encabezado aceptados (ya normalizados)
+ENCABEZADOS = {
+    "cantidad": {"CANTIDAD", "CANT", "CANT.", "CANTIDAD SOLICITADA"},
+    "unidad": {"UNIDAD", "UNIDAD DE MEDIDA", "U.M.", "UM", "UDM"},
+    "descripcion": {"DESCRIPCION", "CONCEPTO", "DESCRIPCION DEL ARTICULO", "ARTICULO"},
+    "precio_unitario": {"PRECIO", "PRECIO UNITARIO", "P.U.", "P. UNITARIO", "COSTO UNITARIO", "COSTO"},
+    "clave": {"CLAVE", "CODIGO", "NO. PARTE", "NUM. PARTE", "NUMERO DE PARTE"},
+}
+CAMPOS_REQUERIDOS = {"cantidad", "descripcion", "precio_unitario"}
+
+COLUMNAS_POSICIONALES = {"cantidad": 0, "unidad": 1, "descripcion": 2, "precio_unitario": 3}
+
+
+def _normalizar(valor) -> str:
+    texto = unicodedata.normalize("NFKD", str(valor or ""))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(texto.upper().split())
+
+
+def _numero(valor) -> float | None:
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    if valor is None:
+        return None
+    try:
+        return float(str(valor).replace("$", "").replace(",", "").strip())
+    except ValueError:
+        return None
+
+
+def _celda(fila: tuple, indice: int | None):
+    if indice is None or indice >= len(fila):
+        return None
+    return fila[indice]
+
+
+def detectar_columnas(fila: tuple) -> dict[str, int] | None:
+    """Mapa campo -> índice si `fila` es un renglón de encabezados; si no, None."""
+    columnas = {}
+    for indice, valor in enumerate(fila):
+        texto = _normalizar(valor)
+        for campo, aceptados in ENCABEZADOS.items():
+            if campo not in columnas and texto in aceptados:
+                columnas[campo] = indice
+    return columnas if CAMPOS_REQUERIDOS <= columnas.keys() else None
+
+
+class HojaOC:
+    """
+    Lector de una OC en Excel. Uso:
+
+        with HojaOC(contenido) as hoja:
+            hoja.encabezado        # {"proveedor", "factura"}
+            for partida in hoja.partidas():
+                ...
+
+    `partidas()` es un generador: sólo se puede recorrer una vez.
+    """
+
+    def __init__(self, origen: bytes | BinaryIO):
+        if isinstance(origen, (bytes, bytearray)):
+            origen = io.BytesIO(origen)
+
+        self._libro = openpyxl.load_workbook(origen, read_only=True, data_only=True)
+        self._filas = self._libro.active.iter_rows(values_only=True)
+
+        self.proveedor = None
+        self.columnas = None
+        self.fila_encabezado = None
+        self.advertencias: list[dict] = []   # {"codigo", "mensaje"}, como parsers/texto_oc.py
+        self.filas_omitidas = 0
+
+        self._pendientes = self._buscar_encabezado()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def cerrar(self):
+        self._libro.close()
+
+    @property
+    def encabezado(self) -> dict:
+        return {"proveedor": self.proveedor or "DESCONOCIDO", "factura": None}
+
+    def _detectar_proveedor(self, fila: tuple):
+        if self.proveedor is None and fila and "PROVEEDOR" in _normalizar(fila[0]):
+            valor = _celda(fila, 1)
+            if valor is not None and str(valor).strip():
+                self.proveedor = str(valor).strip()
+
+    def _buscar_encabezado(self) -> list[tuple[int, tuple]]:
+        """
+        Lee hasta FILAS_BUSQUEDA_ENCABEZADO filas. Si encuentra encabezados
+        descarta lo anterior; si no, esas filas se procesan como datos.
+        """
+        leidas = []
+        for numero, fila in enumerate(self._filas, start=1):
+            self._detectar_proveedor(fila)
+            columnas = detectar_columnas(fila)
+            if columnas:
+                self.columnas = columnas
+                self.fila_encabezado = numero
+                return []
+            leidas.append((numero, fila))
+            if numero >= FILAS_BUSQUEDA_ENCABEZADO:
+                break
+
+        self.columnas = dict(COLUMNAS_POSICIONALES)
+        return leidas
+
+    def _advertir(self, numero: int, codigo: str, motivo: str):
+        self.filas_omitidas += 1
+        if len(self.advertencias) < MAX_ADVERTENCIAS:
+            self.advertencias.append({"codigo": codigo, "mensaje": f"Fila {numero}: {motivo}"})
+
+    def partidas(self) -> Iterator[dict]:
+        inicio = (self.fila_encabezado or len(self._pendientes)) + 1
+        filas = chain(self._pendientes, enumerate(self._filas, start=inicio))
+        self._pendientes = []
+        posicional = self.fila_encabezado is None
+        col = self.columnas
+
+        for numero, fila in filas:
+            if not fila or all(v is None or str(v).strip() == "" for v in fila):
+                continue
+            self._detectar_proveedor(fila)
+
+            cantidad = _numero(_celda(fila, col["cantidad"]))
+            precio = _numero(_celda(fila, col["precio_unitario"]))
+            descripcion = _celda(fila, col["descripcion"])
+            descripcion = str(descripcion).strip() if descripcion is not None else ""
+
+            if cantidad is None or precio is None or not descripcion:
+                # En formato posicional los renglones de texto (títulos,
+                # proveedor, totales) son normales: no se reportan.
+                if not posicional:
+                    self._advertir(numero, "partida_invalida", "cantidad, descripción o precio inválido")
+                continue
+
+            partida = {
+                "cantidad": cantidad,
+                "unidad": str(_celda(fila, col.get("unidad")) or "pieza").strip(),
+                "descripcion": descripcion,
+                "precio_unitario": precio,
+            }
+            clave = _celda(fila, col.get("clave"))
+            if clave is not None and str(clave).strip():
+                partida["clave"] = str(clave).strip()
+            yield partida
+
+
+# -------------------------------------------------------------------
+# CATÁLOGOS TABULARES (encabezados en la fila 1)
+# -------------------------------------------------------------------
+# Misma lectura read_only/values_only, para catálogos que se validan en
+# bloque con pandas (p. ej. vehículos). Sólo se conservan las columnas
+# pedidas, y las filas vacías del final (rango usado por formato) se
+# descartan; las vacías intermedias se conservan para no mover los números
+# de fila que se reportan.
+# -------------------------------------------------------------------
+
+def _vacia(fila: tuple) -> bool:
+    return all(v is None or str(v).strip() == "" for v in fila)
+
+
+def tabla_excel(origen: bytes | BinaryIO, columnas: list[str]) -> pd.DataFrame:
+    """
+    DataFrame con las `columnas` presentes en el encabezado de la hoja
+    activa (las que falten simplemente no aparecen).
+    """
+    if isinstance(origen, (bytes, bytearray)):
+        origen = io.BytesIO(origen)
+
+    libro = openpyxl.load_workbook(origen, read_only=True, data_only=True)
+    try:
+        filas = libro.active.iter_rows(values_only=True)
+        encabezado = [str(v).strip() if v is not None else "" for v in next(filas, ())]
+        indices = {c: encabezado.index(c) for c in columnas if c in encabezado}
+
+        registros = []
+        vacias = []
+        for fila in filas:
+            proyectada = tuple(_celda(fila, i) for i in indices.values())
+            if _vacia(proyectada):
+                vacias.append(proyectada)
+                continue
+            registros.extend(vacias)
+            vacias = []
+            registros.append(proyectada)
+    finally:
+        libro.close()
+
+    return pd.DataFrame.from_records(registros, columns=list(indices))
@@ -0,0 +1,128 @@
+import re
+from datetime import datetime
+
+# -------------------------------------------------------------------
+# PARSER DE OC (TEXTO) — FORMATO MUNICIPIO DE SALTILLO
+# -------------------------------------------------------------------
+# Entrada: el texto que pdfplumber extrae del PDF (o texto pegado).
+# Salida: el dict que consume crud.importar_orden_compra_desde_json, más
+# una lista de advertencias {"codigo", "mensaje"} para lo que no se pudo
+# leer o no cuadra.
+#
+# Los patrones se compilan una sola vez al importar el módulo. El texto se
+# normaliza una vez (espacios colapsados) y las partidas salen de un solo
+# recorrido con finditer, sin listas intermedias.
+# -------------------------------------------------------------------
+
+# Lo que suele seguir al nombre del proveedor: una etiqueta "RFC:" etc.
+# como palabra completa (SUPERFECHA o "AUTOPARTES CANTIDAD" son nombre), el
+# título "ORDEN DE COMPRA" o el encabezado de la tabla de partidas
+_ETIQUETAS = (
+    r"(?<![A-Z0-9])(?:"
+    r"(?:RFC|FECHA|NUMERO|DOMICILIO|TELEFONO|ORDEN|CANTIDAD)\s*:"
+    r"|ORDEN\s+DE\s+COMPRA\b|CANTIDAD\s+UNIDAD\b"
+    r")"
+)
+RE_PROVEEDOR = re.compile(rf"PROVEEDOR\s*:\s*((?:(?!{_ETIQUETAS})[A-Z0-9\s\.])+)")
+RE_NUMERO_OC = re.compile(r"NUMERO\s+(\d+)")
+RE_FECHA = re.compile(
+    r"FECHA DE ELABORACI[OÓ]N:\s*"
+    r"(\d{1,2}/\d{1,2}/\d{4})\s*(\d{1,2}:\d{2}:\d{2})\s*([ap])\.?\s*m\.?",
+    re.IGNORECASE,
+)
+RE_PARTIDA = re.compile(
+    r"(?P<cantidad>\d+\.\d+)\s+"
+    r"(?P<unidad>[A-Z]+)\s+"
+    r"(?P<descripcion>\d[\w\s\-]*?)\s+"
+    r"\$\s*(?P<precio>[\d,]+\.\d+)\s+"
+    r"\$\s*(?P<importe>[\d,]+\.\d+)"
+)
+
+# Diferencia tolerada entre cantidad * precio e importe (redondeos del PDF)
+TOLERANCIA_IMPORTE = 0.05
+
+
+def _normalizar(texto: str) -> str:
+    return " ".join(texto.split())
+
+
+def _monto(valor: str) -> float:
+    return float(valor.replace(",", ""))
+
+
+def _advertencia(codigo: str, mensaje: str) -> dict:
+    return {"codigo": codigo, "mensaje": mensaje}
+
+
+def _proveedor(t: str) -> str | None:
+    m = RE_PROVEEDOR.search(t)
+    if not m:
+        return None
+    proveedor = m.group(1).strip()
+    # Etiqueta no listada en _ETIQUETAS ("OTRA:"): esa palabra no es del nombre
+    if t[m.end():m.end() + 1] == ":" and " " in proveedor:
+        proveedor = proveedor.rsplit(" ", 1)[0]
+    return proveedor or None
+
+
+def _fecha(t: str, advertencias: list) -> datetime | None:
+    m = RE_FECHA.search(t)
+    if not m:
+        advertencias.append(_advertencia("sin_fecha", "No se encontró la fecha de elaboración"))
+        return None
+    dia, hora, meridiano = m.groups()
+    try:
+        return datetime.strptime(f"{dia} {hora}{meridiano.upper()}M", "%d/%m/%Y %I:%M:%S%p")
+    except ValueError:
+        advertencias.append(_advertencia("fecha_invalida", f"Fecha de elaboración inválida: {m.group(0)}"))
+        return None
+
+
+def iterar_partidas(t: str, advertencias: list):
+    """Partidas del texto ya normalizado, en orden de aparición."""
+    for numero, m in enumerate(RE_PARTIDA.finditer(t), start=1):
+        cantidad = float(m["cantidad"])
+        precio = _monto(m["precio"])
+        importe = _monto(m["importe"])
+
+        if abs(cantidad * precio - importe) > TOLERANCIA_IMPORTE:
+            advertencias.append(_advertencia(
+                "importe_no_coincide",
+                f"Partida {numero}: {cantidad:g} x {precio:.2f} no coincide con el importe {importe:.2f}"
+            ))
+
+        yield {
+            "cantidad": cantidad,
+            "unidad": m["unidad"],
+            "descripcion": m["descripcion"].strip(),
+            "precio_unitario": precio,
+        }
+
+
+def parsear_oc(texto: str) -> dict:
+    t = _normalizar(texto)
+    advertencias = []
+
+    proveedor = _proveedor(t)
+    if not proveedor:
+        advertencias.append(_advertencia("sin_proveedor", "No se encontró el proveedor"))
+
+    m = RE_NUMERO_OC.search(t)
+    numero_oc = m.group(1) if m else None
+    if not numero_oc:
+        advertencias.append(_advertencia("sin_numero_oc", "No se encontró el número de OC"))
+
+    fecha = _fecha(t, advertencias)
+
+    partidas = list(iterar_partidas(t, advertencias))
+    if not partidas:
+        advertencias.append(_advertencia("sin_partidas", "No se encontraron partidas"))
+
+    return {
+        "proveedor": proveedor or "DESCONOCIDO",
+        "factura": None,
+        "detalles": partidas,
+        "numero_oc": numero_oc,
+        "fecha": fecha.isoformat() if fecha else None,
+        "advertencias": advertencias,
+    }
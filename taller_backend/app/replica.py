@@ -0,0 +1,157 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import select, text, update
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import SessionLocal, read_engine
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------------
+# RETRASO DE LA RÉPLICA DE LECTURA
+# -------------------------------------------------------------------
+# deps.get_read_db pregunta a monitor_replica si la réplica está al día.
+# El retraso se mide:
+#   - PostgreSQL: con las funciones de recuperación de la réplica. Es 0
+#     sólo si el receptor de WAL está conectado (pg_stat_wal_receiver en
+#     'streaming') y ya reprodujo todo lo recibido, para no confundir
+#     inactividad con retraso; con el receptor caído "todo lo recibido"
+#     puede ser viejo, así que se usa la antigüedad de la última
+#     transacción reproducida. Leer pg_stat_wal_receiver requiere el rol
+#     pg_monitor (sin él, status es NULL y se usa siempre la antigüedad).
+#     Si la réplica aún no reprodujo nada se recurre al latido.
+#   - Otras bases (p. ej. dos archivos SQLite en pruebas): con la fila de
+#     latido_replica que LatidoPrimaria actualiza en la primaria cada
+#     REPLICA_LATIDO_CADA segundos; retraso = ahora - latido leído en la
+#     réplica.
+# La medición se reutiliza REPLICA_LAG_REVISION segundos para no agregar
+# una consulta a cada request. Si no se puede medir se usa la primaria.
+# -------------------------------------------------------------------
+
+REPLICA_LAG_MAXIMO = float(os.getenv("REPLICA_LAG_MAXIMO", "10"))
+REPLICA_LAG_REVISION = float(os.getenv("REPLICA_LAG_REVISION", "5"))
+REPLICA_LATIDO_CADA = float(os.getenv("REPLICA_LATIDO_CADA", "2"))
+
+CONSULTA_LAG_POSTGRES = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming')
+             AND pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+""")
+
+
+def registrar_latido(db: Session):
+    """Actualiza (o crea) el latido en la primaria y hace commit."""
+    ahora = datetime.utcnow()
+    actualizadas = db.execute(
+        update(models.LatidoReplica).where(models.LatidoReplica.id == 1).values(fecha=ahora)
+    ).rowcount
+    if not actualizadas:
+        db.add(models.LatidoReplica(id=1, fecha=ahora))
+    db.commit()
+
+
+def medir_lag(motor) -> float | None:
+    """Segundos de retraso de la réplica detrás de `motor`; None si no se pudo medir."""
+    try:
+        with motor.connect() as conn:
+            if conn.dialect.name == "postgresql":
+                lag = conn.execute(CONSULTA_LAG_POSTGRES).scalar()
+                if lag is not None:
+                    return float(lag)
+
+            latido = conn.execute(
+                select(models.LatidoReplica.fecha).where(models.LatidoReplica.id == 1)
+            ).scalar()
+    except Exception:
+        logger.warning("No se pudo medir el retraso de la réplica", exc_info=True)
+        return None
+
+    if latido is None:
+        return None
+    return max(0.0, (datetime.utcnow() - latido).total_seconds())
+
+
+class MonitorReplica:
+    def __init__(self, motor, lag_maximo: float = REPLICA_LAG_MAXIMO, revision: float = REPLICA_LAG_REVISION):
+        self.motor = motor
+        self.lag_maximo = lag_maximo
+        self.revision = revision
+        self._lock = threading.Lock()
+        self._revisado_en = None
+        self.lag = None
+        self.lecturas_replica = 0
+        self.lecturas_primaria = 0
+
+    def _vigente(self) -> bool:
+        return self._revisado_en is not None and time.monotonic() - self._revisado_en < self.revision
+
+    def disponible(self) -> bool:
+        """True si la réplica está dentro de lag_maximo (según la última medición)."""
+        if not self._vigente():
+            with self._lock:
+                if not self._vigente():
+                    self.lag = medir_lag(self.motor)
+                    self._revisado_en = time.monotonic()
+
+        usar = self.lag is not None and self.lag <= self.lag_maximo
+        with self._lock:
+            if usar:
+                self.lecturas_replica += 1
+            else:
+                self.lecturas_primaria += 1
+        return usar
+
+    def estadisticas(self) -> dict:
+        return {
+            "lag_segundos": self.lag,
+            "lag_maximo": self.lag_maximo,
+            "lecturas_replica": self.lecturas_replica,
+            "lecturas_primaria": self.lecturas_primaria,
+        }
+
+
+class LatidoPrimaria:
+    """Hilo que mantiene al día latido_replica en la primaria."""
+
+    def __init__(self, crear_sesion=SessionLocal, cada: float = REPLICA_LATIDO_CADA):
+        self.crear_sesion = crear_sesion
+        self.cada = cada
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def _latir(self):
+        while not self._detener.is_set():
+            db = self.crear_sesion()
+            try:
+                registrar_latido(db)
+            except Exception:
+                logger.warning("No se pudo registrar el latido de replicación", exc_info=True)
+            finally:
+                db.close()
+            self._detener.wait(self.cada)
+
+    def iniciar(self):
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._latir, name="latido-replica", daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=self.cada + 1)
+            self._hilo = None
+
+
+monitor_replica = MonitorReplica(read_engine) if read_engine is not None else None
+
+# También con PostgreSQL: es la medición de respaldo cuando la réplica no
+# tiene marca de tiempo de reproducción
+latido_primaria = LatidoPrimaria() if read_engine is not None else None
@@ -1,19 +1,22 @@
 from fastapi import Depends, HTTPException, status
-from .auth_utils import get_current_active_user
-from . import models
+from .auth_utils import Principal, get_current_active_principal
 
 def require_role(*roles_permitidos: str):
     """
     Devuelve una dependencia que valida que el usuario tenga uno de los roles permitidos.
     Ejemplo:
         @app.get("/admin", dependencies=[Depends(require_role("admin"))])
+
+    El usuario sale de la cache de principales (ver auth_utils), sin cargar
+    el modelo completo ni su rol en cada request. Es async: con un acierto
+    en cache la validación completa corre en el event loop, sin threadpool.
     """
-    def role_checker(
-        usuario: models.Usuario = Depends(get_current_active_user)
-    ):
-        rol_usuario = usuario.rol.nombre.lower()
+    permitidos = frozenset(r.lower() for r in roles_permitidos)
 
-        if rol_usuario not in [r.lower() for r in roles_permitidos]:
+    async def role_checker(
+        usuario: Principal = Depends(get_current_active_principal)
+    ):
+        if usuario.rol not in permitidos:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Acceso denegado. Se requiere rol: {roles_permitidos}"
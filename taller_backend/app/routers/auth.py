@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 
 from app.deps import get_db
 from app import schemas, crud
 from app.auth_utils import autenticar_usuario, crear_token_acceso, get_current_active_user
+from app.cache import principales
 from app.roles import require_role
+from app.paginacion import ParametrosPagina, responder_pagina
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
@@ -62,5 +64,21 @@ def crear_usuario(usuario_in: schemas.UsuarioCreate, db: Session = Depends(get_d
 
 
 @router.get("/usuarios/", response_model=list[schemas.Usuario], dependencies=[Depends(require_role("admin"))])
-def listar_usuarios(db: Session = Depends(get_db)):
-    return crud.get_usuarios(db)
+def listar_usuarios(
+    response: Response,
+    pagina: ParametrosPagina = Depends(),
+    rol_id: int | None = None,
+    activo: bool | None = None,
+    db: Session = Depends(get_db),
+):
+    resultado = crud.get_usuarios(db, pagina, rol_id, activo)
+    return responder_pagina(response, resultado)
+
+
+# ============================================================
+# CACHE DE PRINCIPALES
+# ============================================================
+
+@router.get("/cache", dependencies=[Depends(require_role("admin"))])
+def estadisticas_cache_principales():
+    return principales.estadisticas()
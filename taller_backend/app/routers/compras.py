@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Response, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from datetime import datetime
 import json
 
+from app.database import SessionLocal
 from app.deps import get_db
+from app.importaciones import expandir_archivos, importaciones_oc
 from app.roles import require_role
+from app.paginacion import ParametrosPagina, responder_pagina
 from app import crud, schemas
 
 router = APIRouter(
@@ -33,8 +38,17 @@ def crear_orden_compra(
     response_model=list[schemas.OrdenCompra],
     dependencies=[Depends(require_role("compras", "admin"))],
 )
-def listar_ordenes_compra(db: Session = Depends(get_db)):
-    return crud.get_ordenes_compra(db)
+def listar_ordenes_compra(
+    response: Response,
+    pagina: ParametrosPagina = Depends(),
+    proveedor: str | None = None,
+    estado: str | None = None,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+    db: Session = Depends(get_db),
+):
+    resultado = crud.get_ordenes_compra(db, pagina, proveedor, estado, desde, hasta)
+    return responder_pagina(response, resultado)
 
 
 # ============================================================
@@ -61,28 +75,66 @@ def importar_oc(
         raise HTTPException(status_code=400, detail="Tipo no soportado")
 
 
+# Excel y PDF se procesan en segundo plano (ver app/importaciones.py):
+# responden 202 con el trabajo y el cliente consulta /importaciones/{job_id}.
+# Un archivo ya importado responde de inmediato con la OC existente.
+
 @router.post(
     "/importar_excel",
+    status_code=202,
+    response_model=schemas.TrabajoImportacion,
     dependencies=[Depends(require_role("compras", "admin"))],
 )
 async def importar_oc_excel(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
 ):
     contenido = await file.read()
-    data = crud.parsear_oc_desde_excel(contenido)
-    return crud.importar_orden_compra_desde_json(db, data)
+    return await run_in_threadpool(
+        importaciones_oc.encolar, "excel", file.filename, contenido, SessionLocal
+    )
 
 
 @router.post(
     "/importar_pdf",
+    status_code=202,
+    response_model=schemas.TrabajoImportacion,
     dependencies=[Depends(require_role("compras", "admin"))],
 )
 async def importar_oc_pdf(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
 ):
     contenido = await file.read()
-    texto = crud.extraer_texto_de_pdf(contenido)
-    data = crud.parsear_oc_desde_texto(texto)
-    return crud.importar_orden_compra_desde_json(db, data)
+    return await run_in_threadpool(
+        importaciones_oc.encolar, "pdf", file.filename, contenido, SessionLocal
+    )
+
+
+@router.post(
+    "/importar_lote",
+    response_model=list[schemas.ResultadoImportacionArchivo],
+    dependencies=[Depends(require_role("compras", "admin"))],
+)
+def importar_oc_lote(
+    files: list[UploadFile] = File(...),
+    db: Session = Depends(get_db),
+):
+    """
+    Varios PDF/Excel (o .zip con ellos) en una sola petición. Los archivos se
+    parsean en paralelo y todas las OC válidas se guardan en una transacción;
+    la respuesta trae un resultado por archivo. Los archivos ya importados
+    no se reprocesan (reutilizada=True).
+    """
+    archivos = expandir_archivos([(f.filename, f.file.read()) for f in files])
+    return importaciones_oc.importar_lote(db, archivos)
+
+
+@router.get(
+    "/importaciones/{job_id}",
+    response_model=schemas.TrabajoImportacion,
+    dependencies=[Depends(require_role("compras", "admin"))],
+)
+def consultar_importacion(job_id: str):
+    trabajo = importaciones_oc.obtener(job_id)
+    if not trabajo:
+        raise HTTPException(status_code=404, detail="Importación no encontrada")
+    return trabajo
@@ -1,35 +1,98 @@
-from fastapi import APIRouter, Depends
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.deps import get_db
+from app.database import ASYNC_DB
+from app.deps import get_async_db, get_async_read_db, get_db, get_read_db
 from app.roles import require_role
-from app import crud
+from app import crud, crud_async
 
 router = APIRouter(
     prefix="/dashboard",
     tags=["Dashboard"]
 )
 
+# Con ASYNC_DB=1 se registra la versión asíncrona de cada ruta
+PERMISOS = [Depends(require_role("auditor", "admin"))]
+
+
+def dashboard_gasto_por_vehiculo(
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+    area_asignada: str | None = None,
+    db: Session = Depends(get_read_db),
+):
+    return crud.get_gasto_por_vehiculo(db, desde, hasta, area_asignada)
+
+
+async def dashboard_gasto_por_vehiculo_async(
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+    area_asignada: str | None = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    return await crud_async.get_gasto_por_vehiculo(db, desde, hasta, area_asignada)
 
-@router.get(
+
+router.add_api_route(
     "/gasto_por_vehiculo",
-    dependencies=[Depends(require_role("auditor", "admin"))],
+    dashboard_gasto_por_vehiculo_async if ASYNC_DB else dashboard_gasto_por_vehiculo,
+    methods=["GET"],
+    dependencies=PERMISOS,
 )
-def dashboard_gasto_por_vehiculo(db: Session = Depends(get_db)):
-    return crud.get_gasto_por_vehiculo(db)
 
 
-@router.get(
+def dashboard_alertas_compra_cara(
+    porcentaje_min: float = Query(0, ge=0),
+    porcentaje_promedio: float | None = Query(None, ge=0),
+    proveedor: str | None = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+):
+    return crud.get_alertas_compra_cara(
+        db, porcentaje_min, porcentaje_promedio, proveedor, offset, limit
+    )
+
+
+async def dashboard_alertas_compra_cara_async(
+    porcentaje_min: float = Query(0, ge=0),
+    porcentaje_promedio: float | None = Query(None, ge=0),
+    proveedor: str | None = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    return await crud_async.get_alertas_compra_cara(
+        db, porcentaje_min, porcentaje_promedio, proveedor, offset, limit
+    )
+
+
+router.add_api_route(
     "/alertas_compra_cara",
-    dependencies=[Depends(require_role("auditor", "admin"))],
+    dashboard_alertas_compra_cara_async if ASYNC_DB else dashboard_alertas_compra_cara,
+    methods=["GET"],
+    dependencies=PERMISOS,
 )
-def dashboard_alertas_compra_cara(db: Session = Depends(get_db)):
-    return crud.get_alertas_compra_cara(db)
 
 
-@router.get(
-    "/general",
-    dependencies=[Depends(require_role("auditor", "admin"))],
-)
+# El snapshot se guarda hasta que una escritura lo invalida: si se
+# calculara en la réplica podría no incluir esa escritura y quedar en cache
+# todo el DASHBOARD_CACHE_TTL. Se calcula en la primaria; con un acierto
+# en cache la sesión nunca pide conexión.
 def dashboard_general(db: Session = Depends(get_db)):
     return crud.get_dashboard_general(db)
+
+
+async def dashboard_general_async(db: AsyncSession = Depends(get_async_db)):
+    return await crud_async.get_dashboard_general(db)
+
+
+router.add_api_route(
+    "/general",
+    dashboard_general_async if ASYNC_DB else dashboard_general,
+    methods=["GET"],
+    dependencies=PERMISOS,
+)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from app.deps import get_db
@@ -18,3 +18,19 @@ router = APIRouter(
 )
 def listar_inventario(db: Session = Depends(get_db)):
     return crud.get_inventario(db)
+
+
+@router.put(
+    "/{refaccion_id}/umbrales",
+    response_model=schemas.Inventario,
+    dependencies=[Depends(require_role("almacen", "admin"))],
+)
+def actualizar_umbrales(
+    refaccion_id: int,
+    umbrales: schemas.InventarioUmbrales,
+    db: Session = Depends(get_db),
+):
+    inv = crud.actualizar_umbrales_inventario(db, refaccion_id, umbrales)
+    if not inv:
+        raise HTTPException(status_code=404, detail="Refacción no encontrada")
+    return inv
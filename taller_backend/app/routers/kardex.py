@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.deps import get_db
+from app.database import ASYNC_DB
+from app.deps import get_async_db, get_db, iterar_en_sesion
 from app.roles import require_role
-from app import crud, schemas
+from app.paginacion import responder_pagina
+from app.exportar import parametro_formato, respuesta_streaming
+from app import crud, crud_async, schemas
 
 router = APIRouter(
     prefix="/kardex",
@@ -11,13 +17,50 @@ router = APIRouter(
 )
 
 
-@router.get(
-    "/{refaccion_id}",
-    response_model=list[schemas.MovimientoInventarioKardex],
-    dependencies=[Depends(require_role("almacen", "admin"))],
-)
 def kardex_refaccion(
     refaccion_id: int,
+    response: Response,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=5000),
+    formato: str = parametro_formato(),
     db: Session = Depends(get_db),
 ):
-    return crud.get_kardex(db, refaccion_id)
+    if formato != "json":
+        return respuesta_streaming(
+            crud.iterar_kardex(db, refaccion_id, desde, hasta),
+            formato, crud.COLUMNAS_KARDEX, f"kardex_{refaccion_id}"
+        )
+    pagina = crud.get_kardex(db, refaccion_id, desde, hasta, cursor, limit)
+    return responder_pagina(response, pagina)
+
+
+async def kardex_refaccion_async(
+    refaccion_id: int,
+    request: Request,
+    response: Response,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=5000),
+    formato: str = parametro_formato(),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if formato != "json":
+        return respuesta_streaming(
+            iterar_en_sesion(request, crud.iterar_kardex, refaccion_id, desde, hasta),
+            formato, crud.COLUMNAS_KARDEX, f"kardex_{refaccion_id}"
+        )
+    pagina = await crud_async.get_kardex(db, refaccion_id, desde, hasta, cursor, limit)
+    return responder_pagina(response, pagina)
+
+
+# Con ASYNC_DB=1 se registra la versión asíncrona de cada ruta
+router.add_api_route(
+    "/{refaccion_id}",
+    kardex_refaccion_async if ASYNC_DB else kardex_refaccion,
+    methods=["GET"],
+    response_model=list[schemas.MovimientoInventarioKardex],
+    dependencies=[Depends(require_role("almacen", "admin"))],
+)
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Response
 from sqlalchemy.orm import Session
 
 from app.deps import get_db
+from app.paginacion import ParametrosPagina, responder_pagina
 from app import crud, schemas
 
 router = APIRouter(
@@ -18,6 +21,23 @@ def crear_orden_servicio(
     return crud.create_orden_servicio(db, os_in)
 
 
+@router.post("/bulk", response_model=list[schemas.ResultadoLote])
+def crear_ordenes_servicio_bulk(
+    ordenes_in: list[schemas.OrdenServicioCreate],
+    db: Session = Depends(get_db),
+):
+    return crud.create_ordenes_servicio_bulk(db, ordenes_in)
+
+
 @router.get("/", response_model=list[schemas.OrdenServicio])
-def listar_ordenes_servicio(db: Session = Depends(get_db)):
-    return crud.get_ordenes_servicio(db)
+def listar_ordenes_servicio(
+    response: Response,
+    pagina: ParametrosPagina = Depends(),
+    vehiculo_id: int | None = None,
+    estado: str | None = None,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+    db: Session = Depends(get_db),
+):
+    resultado = crud.get_ordenes_servicio(db, pagina, vehiculo_id, estado, desde, hasta)
+    return responder_pagina(response, resultado)
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
-from ..database import get_db
+from ..deps import get_db
 from .. import crud, schemas
 
 router = APIRouter(prefix="/proveedores", tags=["Proveedores"])
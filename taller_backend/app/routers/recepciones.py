@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.deps import get_db
+from app.database import ASYNC_DB
+from app.deps import get_async_db, get_db, iterar_en_sesion
 from app.roles import require_role
-from app import crud, schemas
+from app.exportar import parametro_formato, respuesta_streaming
+from app.paginacion import ParametrosPagina, responder_pagina
+from app import crud, crud_async, schemas
 
 router = APIRouter(
     prefix="/recepciones",
@@ -11,22 +17,71 @@ router = APIRouter(
 )
 
 
-@router.post(
+def crear_recepcion(
+    rec_in: schemas.RecepcionCreate,
+    db: Session = Depends(get_db),
+):
+    return crud.create_recepcion(db, rec_in)
+
+
+async def crear_recepcion_async(
+    rec_in: schemas.RecepcionCreate,
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await crud_async.create_recepcion(db, rec_in)
+
+
+# Con ASYNC_DB=1 se registra la versión asíncrona de cada ruta
+router.add_api_route(
     "/",
+    crear_recepcion_async if ASYNC_DB else crear_recepcion,
+    methods=["POST"],
     response_model=schemas.Recepcion,
     dependencies=[Depends(require_role("almacen", "admin"))],
 )
-def crear_recepcion(
-    rec_in: schemas.RecepcionCreate,
+
+
+def listar_recepciones(
+    response: Response,
+    pagina: ParametrosPagina = Depends(),
+    oc_id: int | None = None,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+    formato: str = parametro_formato(),
     db: Session = Depends(get_db),
 ):
-    return crud.create_recepcion(db, rec_in)
+    if formato != "json":
+        return respuesta_streaming(
+            crud.iterar_recepciones(db, oc_id, desde, hasta),
+            formato, crud.COLUMNAS_RECEPCIONES, "recepciones"
+        )
+    resultado = crud.get_recepciones(db, pagina, oc_id, desde, hasta)
+    return responder_pagina(response, resultado)
+
+
+async def listar_recepciones_async(
+    request: Request,
+    response: Response,
+    pagina: ParametrosPagina = Depends(),
+    oc_id: int | None = None,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+    formato: str = parametro_formato(),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if formato != "json":
+        return respuesta_streaming(
+            iterar_en_sesion(request, crud.iterar_recepciones, oc_id, desde, hasta),
+            formato, crud.COLUMNAS_RECEPCIONES, "recepciones"
+        )
+    resultado = await crud_async.get_recepciones(db, pagina, oc_id, desde, hasta)
+    return responder_pagina(response, resultado)
 
 
-@router.get(
+router.add_api_route(
     "/",
+    listar_recepciones_async if ASYNC_DB else listar_recepciones,
+    methods=["GET"],
     response_model=list[schemas.Recepcion],
     dependencies=[Depends(require_role("almacen", "admin"))],
 )
-def listar_recepciones(db: Session = Depends(get_db)):
-    return crud.get_recepciones(db)
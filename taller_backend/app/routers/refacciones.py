@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 from sqlalchemy.orm import Session
 
 from app.deps import get_db
+from app.paginacion import ParametrosPagina, responder_pagina
 from app import crud, schemas
 
 router = APIRouter(
@@ -19,5 +20,11 @@ def crear_refaccion(
 
 
 @router.get("/", response_model=list[schemas.Refaccion])
-def listar_refacciones(db: Session = Depends(get_db)):
-    return crud.get_refacciones(db)
+def listar_refacciones(
+    response: Response,
+    pagina: ParametrosPagina = Depends(),
+    q: str | None = None,
+    db: Session = Depends(get_db),
+):
+    resultado = crud.get_refacciones(db, pagina, q)
+    return responder_pagina(response, resultado)
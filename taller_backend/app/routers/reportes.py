@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Query, Response
 from sqlalchemy.orm import Session
 
-from app.deps import get_db
+from app.deps import get_read_db
 from app.roles import require_role
+from app.paginacion import responder_pagina
+from app.exportar import parametro_formato, respuesta_streaming
 from app import crud, schemas
 
 router = APIRouter(
@@ -15,7 +19,14 @@ router = APIRouter(
     "/inventario",
     dependencies=[Depends(require_role("auditor", "admin"))],
 )
-def reporte_inventario(db: Session = Depends(get_db)):
+def reporte_inventario(
+    formato: str = parametro_formato(),
+    db: Session = Depends(get_read_db),
+):
+    if formato != "json":
+        return respuesta_streaming(
+            crud.iterar_inventario_detallado(db), formato, crud.COLUMNAS_INVENTARIO, "inventario"
+        )
     return crud.get_inventario_detallado(db)
 
 
@@ -25,9 +36,21 @@ def reporte_inventario(db: Session = Depends(get_db)):
 )
 def reporte_kardex(
     refaccion_id: int,
-    db: Session = Depends(get_db),
+    response: Response,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=5000),
+    formato: str = parametro_formato(),
+    db: Session = Depends(get_read_db),
 ):
-    return crud.get_kardex_detallado(db, refaccion_id)
+    if formato != "json":
+        return respuesta_streaming(
+            crud.iterar_kardex(db, refaccion_id, desde, hasta),
+            formato, crud.COLUMNAS_KARDEX, f"kardex_{refaccion_id}"
+        )
+    pagina = crud.get_kardex_detallado(db, refaccion_id, desde, hasta, cursor, limit)
+    return responder_pagina(response, pagina)
 
 
 @router.get(
@@ -36,7 +59,7 @@ def reporte_kardex(
 )
 def reporte_consumo_os(
     os_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     return crud.get_consumo_por_os(db, os_id)
 
@@ -47,18 +70,29 @@ def reporte_consumo_os(
 )
 def reporte_diferencias_oc(
     oc_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     return crud.get_diferencias_oc(db, oc_id)
 
 
+@router.get(
+    "/pendientes_oc",
+    dependencies=[Depends(require_role("compras", "auditor", "admin"))],
+)
+def reporte_pendientes_oc(
+    oc_id: list[int] | None = Query(None),
+    db: Session = Depends(get_read_db),
+):
+    return crud.get_pendientes_oc(db, oc_id)
+
+
 @router.get(
     "/compras/{proveedor}",
     dependencies=[Depends(require_role("auditor", "admin"))],
 )
 def reporte_compras_proveedor(
     proveedor: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     return crud.get_compras_por_proveedor(db, proveedor)
 
@@ -67,8 +101,17 @@ def reporte_compras_proveedor(
     "/refacciones_mas_usadas",
     dependencies=[Depends(require_role("auditor", "admin"))],
 )
-def reporte_refacciones_mas_usadas(db: Session = Depends(get_db)):
-    return crud.get_refacciones_mas_usadas(db)
+def reporte_refacciones_mas_usadas(
+    limit: int | None = Query(None, ge=1, le=1000),
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+    vehiculo_id: int | None = None,
+    area_asignada: str | None = None,
+    db: Session = Depends(get_read_db),
+):
+    return crud.get_refacciones_mas_usadas(
+        db, limit, desde, hasta, vehiculo_id, area_asignada
+    )
 
 
 @router.get(
@@ -77,6 +120,6 @@ def reporte_refacciones_mas_usadas(db: Session = Depends(get_db)):
 )
 def reporte_bajo_inventario(
     minimo: int = 5,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     return crud.get_bajo_inventario(db, minimo)
@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.deps import get_db
+from app.database import ASYNC_DB
+from app.deps import get_async_db, get_db, iterar_en_sesion
 from app.roles import require_role
-from app import crud, schemas
+from app.exportar import parametro_formato, respuesta_streaming
+from app.paginacion import ParametrosPagina, responder_pagina
+from app import crud, crud_async, schemas
 
 router = APIRouter(
     prefix="/salidas",
@@ -11,22 +17,83 @@ router = APIRouter(
 )
 
 
-@router.post(
+def crear_salida(
+    salida_in: schemas.SalidaRefaccionCreate,
+    db: Session = Depends(get_db),
+):
+    return crud.create_salida_refaccion(db, salida_in)
+
+
+async def crear_salida_async(
+    salida_in: schemas.SalidaRefaccionCreate,
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await crud_async.create_salida_refaccion(db, salida_in)
+
+
+# Con ASYNC_DB=1 se registra la versión asíncrona de cada ruta
+router.add_api_route(
     "/",
+    crear_salida_async if ASYNC_DB else crear_salida,
+    methods=["POST"],
     response_model=schemas.SalidaRefaccion,
     dependencies=[Depends(require_role("almacen", "admin"))],
 )
-def crear_salida(
-    salida_in: schemas.SalidaRefaccionCreate,
+
+
+@router.post(
+    "/bulk",
+    response_model=list[schemas.ResultadoLote],
+    dependencies=[Depends(require_role("almacen", "admin"))],
+)
+def crear_salidas_bulk(
+    salidas_in: list[schemas.SalidaRefaccionCreate],
     db: Session = Depends(get_db),
 ):
-    return crud.create_salida_refaccion(db, salida_in)
+    return crud.create_salidas_bulk(db, salidas_in)
+
+
+def listar_salidas(
+    response: Response,
+    pagina: ParametrosPagina = Depends(),
+    orden_servicio_id: int | None = None,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+    formato: str = parametro_formato(),
+    db: Session = Depends(get_db),
+):
+    if formato != "json":
+        return respuesta_streaming(
+            crud.iterar_salidas(db, orden_servicio_id, desde, hasta),
+            formato, crud.COLUMNAS_SALIDAS, "salidas"
+        )
+    resultado = crud.get_salidas(db, pagina, orden_servicio_id, desde, hasta)
+    return responder_pagina(response, resultado)
+
+
+async def listar_salidas_async(
+    request: Request,
+    response: Response,
+    pagina: ParametrosPagina = Depends(),
+    orden_servicio_id: int | None = None,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+    formato: str = parametro_formato(),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if formato != "json":
+        return respuesta_streaming(
+            iterar_en_sesion(request, crud.iterar_salidas, orden_servicio_id, desde, hasta),
+            formato, crud.COLUMNAS_SALIDAS, "salidas"
+        )
+    resultado = await crud_async.get_salidas(db, pagina, orden_servicio_id, desde, hasta)
+    return responder_pagina(response, resultado)
 
 
-@router.get(
+router.add_api_route(
     "/",
+    listar_salidas_async if ASYNC_DB else listar_salidas,
+    methods=["GET"],
     response_model=list[schemas.SalidaRefaccion],
     dependencies=[Depends(require_role("almacen", "admin"))],
 )
-def listar_salidas(db: Session = Depends(get_db)):
-    return crud.get_salidas(db)
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends
+
+from app.database import estadisticas_pool
+from app.replica import monitor_replica
+from app.roles import require_role
+
+router = APIRouter(
+    prefix="/sistema",
+    tags=["Sistema"]
+)
+
+
+@router.get("/pool", dependencies=[Depends(require_role("admin"))])
+def estado_pool():
+    """Uso del pool de conexiones y límites de tiempo configurados."""
+    return estadisticas_pool()
+
+
+@router.get("/replica", dependencies=[Depends(require_role("admin"))])
+def estado_replica():
+    """Retraso de la réplica de lectura y cuántas lecturas fueron a cada base."""
+    if monitor_replica is None:
+        return {"configurada": False}
+    return {"configurada": True, **monitor_replica.estadisticas()}
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 from sqlalchemy.orm import Session
 
 from app.deps import get_db
 from app.roles import require_role
+from app.paginacion import ParametrosPagina, responder_pagina
 from app import crud, schemas
 
 router = APIRouter(
@@ -23,9 +24,28 @@ def crear_solicitud(
     return crud.create_solicitud_refaccion(db, solicitud_in)
 
 
+@router.post(
+    "/bulk",
+    response_model=list[schemas.ResultadoLote],
+    dependencies=[Depends(require_role("mecanico", "admin"))],
+)
+def crear_solicitudes_bulk(
+    solicitudes_in: list[schemas.SolicitudRefaccionCreate],
+    db: Session = Depends(get_db),
+):
+    return crud.create_solicitudes_bulk(db, solicitudes_in)
+
+
 @router.get(
     "/",
     response_model=list[schemas.SolicitudRefaccion],
 )
-def listar_solicitudes(db: Session = Depends(get_db)):
-    return crud.get_solicitudes(db)
+def listar_solicitudes(
+    response: Response,
+    pagina: ParametrosPagina = Depends(),
+    orden_servicio_id: int | None = None,
+    estado: str | None = None,
+    db: Session = Depends(get_db),
+):
+    resultado = crud.get_solicitudes(db, pagina, orden_servicio_id, estado)
+    return responder_pagina(response, resultado)
@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from app.deps import get_db
-from app import crud
+from app import crud, schemas
 
 router = APIRouter(
     prefix="/ui",
@@ -20,20 +20,26 @@ def ui_refacciones_inventario(db: Session = Depends(get_db)):
     return crud.get_refacciones_con_inventario(db)
 
 
-@router.get("/os/{os_id}")
+@router.get("/os/{os_id}", response_model=schemas.OrdenServicioDetallada)
 def ui_os_detallada(
     os_id: int,
     db: Session = Depends(get_db),
 ):
-    return crud.get_os_detallada(db, os_id)
+    detalle = crud.get_os_detallada(db, os_id)
+    if not detalle:
+        raise HTTPException(status_code=404, detail="Orden de servicio no encontrada")
+    return detalle
 
 
-@router.get("/oc/{oc_id}")
+@router.get("/oc/{oc_id}", response_model=schemas.OrdenCompraDetallada)
 def ui_oc_detallada(
     oc_id: int,
     db: Session = Depends(get_db),
 ):
-    return crud.get_oc_detallada(db, oc_id)
+    detalle = crud.get_oc_detallada(db, oc_id)
+    if not detalle:
+        raise HTTPException(status_code=404, detail="Orden de compra no encontrada")
+    return detalle
 
 
 @router.get("/buscar_refacciones")
@@ -44,6 +50,7 @@ def ui_buscar_refacciones(
     return crud.buscar_refacciones(db, q)
 
 
+# En la primaria, como /dashboard/general (ver dashboard.py)
 @router.get("/dashboard")
 def ui_dashboard(db: Session = Depends(get_db)):
     return crud.get_dashboard_ui(db)
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Response, UploadFile, File
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
-from app.database import get_db
+from app.deps import get_db
 from app import crud, schemas
 from app.roles import require_role
-import pandas as pd
+from app.exportar import parametro_formato, respuesta_streaming
+from app.paginacion import ParametrosPagina, responder_pagina
+from app.parsers.excel import tabla_excel
 
 router = APIRouter(
     prefix="/vehiculos",
@@ -17,8 +18,23 @@ def crear_vehiculo(vehiculo_in: schemas.VehiculoCreate, db: Session = Depends(ge
     return crud.create_vehiculo(db, vehiculo_in)
 
 @router.get("/", response_model=list[schemas.Vehiculo])
-def listar_vehiculos(db: Session = Depends(get_db)):
-    return crud.get_vehiculos(db)
+def listar_vehiculos(
+    response: Response,
+    pagina: ParametrosPagina = Depends(),
+    marca: str | None = None,
+    tipo: str | None = None,
+    area_asignada: str | None = None,
+    q: str | None = None,
+    formato: str = parametro_formato(),
+    db: Session = Depends(get_db),
+):
+    if formato != "json":
+        return respuesta_streaming(
+            crud.iterar_vehiculos(db, marca, tipo, area_asignada, q),
+            formato, crud.COLUMNAS_VEHICULOS, "vehiculos"
+        )
+    resultado = crud.get_vehiculos(db, pagina, marca, tipo, area_asignada, q)
+    return responder_pagina(response, resultado)
 
 @router.post("/importar-excel")
 def importar_excel_vehiculos(
@@ -29,88 +45,8 @@ def importar_excel_vehiculos(
         raise HTTPException(status_code=400, detail="El archivo debe ser .xlsx")
 
     try:
-        df = pd.read_excel(archivo.file)
+        df = tabla_excel(archivo.file, crud.COLUMNAS_IMPORTACION_VEHICULOS)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error leyendo Excel: {e}")
 
-    columnas_requeridas = [
-        "numero_economico",
-        "tipo",
-        "placas",
-        "marca",
-        "modelo",
-        "anio",
-        "numero_serie",
-        "area_asignada",
-    ]
-
-    for col in columnas_requeridas:
-        if col not in df.columns:
-            raise HTTPException(status_code=400, detail=f"Falta la columna requerida: {col}")
-
-    # Normaliza NaN a None
-    df = df.where(pd.notnull(df), None)
-
-    registros = df.to_dict(orient="records")
-    creados = 0
-    duplicados = 0
-    errores = []
-
-    def clean(v):
-        # Convierte None/NaN/"nan" a string vacío, si no, devuelve string limpio
-        if v is None:
-            return ""
-        try:
-            if pd.isna(v):
-                return ""
-        except Exception:
-            pass
-        s = str(v).strip()
-        return "" if s.lower() == "nan" else s
-
-    def empty_to_none(s: str):
-        # Convierte "" a None (útil si tienes unique index y quieres NULL en vez de "")
-        return s if s else None
-
-
-    for idx, item in enumerate(registros, start=2):  # fila 1 es header
-        try:
-            anio_raw = item.get("anio")
-
-            # Convierte anio robusto (soporta 2020, 2020.0)
-            try:
-                anio = int(float(anio_raw))
-            except Exception:
-                raise ValueError(f"anio inválido: {anio_raw}")
-
-            data = schemas.VehiculoCreate(
-                numero_economico=clean(item.get("numero_economico")),
-                tipo=clean(item.get("tipo")),
-                placas=empty_to_none(clean(item.get("placas"))),
-                marca=clean(item.get("marca")),
-                modelo=clean(item.get("modelo")),
-                anio=anio,
-                numero_serie=clean(item.get("numero_serie")),
-                area_asignada=clean(item.get("area_asignada")),
-            )
-
-            crud.create_vehiculo(db, data)
-            creados += 1
-
-        except IntegrityError as e:
-            db.rollback()
-            duplicados += 1
-            errores.append({"fila_excel": idx, "tipo": "duplicado", "error": str(e.orig)})
-            continue
-
-        except Exception as e:
-            db.rollback()
-            errores.append({"fila_excel": idx, "tipo": "error", "error": str(e)})
-            continue
-
-    return {
-        "mensaje": f"Importación completada. Creados={creados}, Duplicados={duplicados}, Errores={len(errores)}",
-        "creados": creados,
-        "duplicados": duplicados,
-        "errores": errores[:30],
-    }
\ No newline at end of file
+    return crud.importar_vehiculos_desde_dataframe(db, df)
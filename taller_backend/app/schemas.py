@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 from datetime import datetime
 
 # ============================================================
@@ -150,6 +150,31 @@ class OrdenCompraImportar(BaseSchema):
     contenido: str | None = None # Para JSON o texto pegado
 
 
+class ResultadoImportacionArchivo(BaseSchema):
+    archivo: str
+    ok: bool
+    oc_id: int | None = None
+    numero_oc: str | None = None
+    proveedor: str | None = None
+    partidas: int = 0
+    reutilizada: bool = False
+    error: str | None = None
+
+
+class TrabajoImportacion(BaseSchema):
+    job_id: str
+    tipo: str
+    nombre_archivo: str | None = None
+    estado: str  # en_cola | procesando | importando | completado | error
+    progreso: int
+    vista_previa: dict | None = None
+    oc_id: int | None = None
+    reutilizado: bool = False
+    error: str | None = None
+    creado: datetime
+    actualizado: datetime
+
+
 # ============================================================
 # RECEPCIONES
 # ============================================================
@@ -191,6 +216,23 @@ class Inventario(BaseSchema):
     id: int
     refaccion_id: int
     existencia: int
+    stock_minimo: int | None = None
+    stock_maximo: int | None = None
+
+
+class InventarioUmbrales(BaseSchema):
+    stock_minimo: int | None = Field(None, ge=0)
+    stock_maximo: int | None = Field(None, ge=0)
+
+    @model_validator(mode="after")
+    def validar_rango(self):
+        if (
+            self.stock_minimo is not None
+            and self.stock_maximo is not None
+            and self.stock_maximo < self.stock_minimo
+        ):
+            raise ValueError("stock_maximo debe ser mayor o igual a stock_minimo")
+        return self
 
 
 # ============================================================
@@ -334,3 +376,80 @@ class ProveedorUpdate(ProveedorBase):
 class ProveedorOut(ProveedorBase):
     id: int
     activo: bool
+
+
+# ============================================================
+# VISTAS DETALLADAS PARA UI (OS / OC)
+# ============================================================
+
+class SolicitudDetalleDetallado(SolicitudDetalle):
+    refaccion: Refaccion
+
+
+class SolicitudRefaccionDetallada(SolicitudRefaccionBase):
+    id: int
+    fecha_solicitud: datetime
+    detalles: list[SolicitudDetalleDetallado]
+
+
+class SalidaDetalleDetallado(SalidaDetalle):
+    refaccion: Refaccion
+
+
+class SalidaRefaccionDetallada(SalidaRefaccionBase):
+    id: int
+    fecha_salida: datetime
+    detalles: list[SalidaDetalleDetallado]
+
+
+class OrdenServicioDetallada(BaseSchema):
+    orden_servicio: OrdenServicio
+    vehiculo: Vehiculo
+    solicitudes: list[SolicitudRefaccionDetallada]
+    salidas: list[SalidaRefaccionDetallada]
+
+
+class OrdenCompraDetalleDetallado(OrdenCompraDetalle):
+    refaccion: Refaccion
+
+
+class OrdenCompraConDetalles(OrdenCompraBase):
+    id: int
+    fecha_oc: datetime
+    detalles: list[OrdenCompraDetalleDetallado]
+
+
+class RecepcionDetalleDetallado(RecepcionDetalle):
+    refaccion: Refaccion
+
+
+class RecepcionDetallada(RecepcionBase):
+    id: int
+    fecha_recepcion: datetime
+    detalles: list[RecepcionDetalleDetallado]
+
+
+class DiferenciaOC(BaseSchema):
+    refaccion_id: int
+    clave: str
+    descripcion: str
+    cantidad_oc: int
+    recibido: int
+    diferencia: int
+
+
+class OrdenCompraDetallada(BaseSchema):
+    orden_compra: OrdenCompraConDetalles
+    recepciones: list[RecepcionDetallada]
+    diferencias: list[DiferenciaOC]
+
+
+# ============================================================
+# OPERACIONES EN LOTE
+# ============================================================
+
+class ResultadoLote(BaseSchema):
+    indice: int
+    ok: bool
+    id: int | None = None
+    error: str | None = None
@@ -0,0 +1,137 @@
+"""
+Latencia de requests autenticados bajo carga concurrente.
+
+Levanta la app en proceso (httpx + ASGITransport, sin red) contra una base
+SQLite temporal y golpea GET /auth/cache, que sólo pasa por require_role:
+todo el costo es la validación del usuario. La cache de principales se
+desactiva para que cada request consulte la base, y cada consulta se
+retrasa --latencia-db ms para simular una base remota.
+
+Se comparan dos modos:
+  threadpool  la consulta corre en el threadpool (auth_utils actual)
+  bloqueante  la consulta corre directo en el event loop (como antes)
+
+Uso, desde taller_backend/:
+
+    python -m benchmarks.bench_auth_concurrencia [--concurrencia 1 4 8] [--requests 20] [--latencia-db 5]
+
+En modo threadpool el p99 debe mantenerse cerca de la latencia de la base
+mientras haya hilos y conexiones libres; en modo bloqueante crece con la
+concurrencia porque los requests se atienden de uno en uno.
+
+Con concurrencia mayor que el pool de conexiones del engine, el modo
+bloqueante puede además quedarse esperando una conexión con el event loop
+detenido: esos requests se cuentan como errores.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+_BASE = os.path.join(tempfile.mkdtemp(prefix="bench_auth_"), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_BASE}"
+os.environ["PRINCIPAL_CACHE_TTL"] = "0"
+
+import httpx  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app import auth_utils, models  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.main import create_app  # noqa: E402
+
+RUTA = "/auth/cache"
+
+
+def preparar_base() -> str:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        rol = models.Rol(nombre="admin")
+        db.add(rol)
+        db.flush()
+        db.add(models.Usuario(
+            username="bench", nombre="Benchmark", hashed_password="-", rol_id=rol.id, activo=True
+        ))
+        db.commit()
+    finally:
+        db.close()
+    return auth_utils.crear_token_acceso({"sub": "bench"})
+
+
+def simular_latencia(segundos: float):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _esperar(*args):
+        time.sleep(segundos)
+
+
+async def _en_el_loop(funcion, *args, **kwargs):
+    return funcion(*args, **kwargs)
+
+
+def percentil(valores: list[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+async def medir(app, token: str, concurrencia: int, por_cliente: int) -> dict:
+    transporte = httpx.ASGITransport(app=app)
+    latencias = []
+    errores = 0
+
+    async with httpx.AsyncClient(
+        transport=transporte, base_url="http://bench", headers={"Authorization": f"Bearer {token}"}
+    ) as cliente:
+        async def trabajador():
+            nonlocal errores
+            for _ in range(por_cliente):
+                inicio = time.perf_counter()
+                try:
+                    respuesta = await cliente.get(RUTA)
+                    ok = respuesta.status_code == 200
+                except Exception:
+                    ok = False
+                latencias.append(time.perf_counter() - inicio)
+                errores += not ok
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+        total = time.perf_counter() - inicio
+
+    return {
+        "req_s": len(latencias) / total,
+        "p50": statistics.median(latencias) * 1000,
+        "p99": percentil(latencias, 99) * 1000,
+        "errores": errores,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrencia", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--requests", type=int, default=20, help="requests por cliente")
+    parser.add_argument("--latencia-db", type=float, default=5.0, help="ms añadidos a cada consulta")
+    parser.add_argument("--modo", choices=["threadpool", "bloqueante", "ambos"], default="ambos")
+    args = parser.parse_args(argv)
+
+    token = preparar_base()
+    simular_latencia(args.latencia_db / 1000)
+    app = create_app()
+
+    modos = ["threadpool", "bloqueante"] if args.modo == "ambos" else [args.modo]
+    original = auth_utils.run_in_threadpool
+
+    print(f"{'modo':<12} {'concurrencia':>12} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'errores':>8}")
+    for modo in modos:
+        auth_utils.run_in_threadpool = original if modo == "threadpool" else _en_el_loop
+        for concurrencia in args.concurrencia:
+            r = asyncio.run(medir(app, token, concurrencia, args.requests))
+            print(f"{modo:<12} {concurrencia:>12} {r['req_s']:>10,.0f} {r['p50']:>10.1f} {r['p99']:>10.1f} {r['errores']:>8}")
+    auth_utils.run_in_threadpool = original
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Throughput del parser de OC en texto (app/parsers/texto_oc.py).
+
+Usa el corpus de tests/fixtures/ordenes_compra más una OC sintética de
+muchas páginas, y reporta páginas por segundo. Uso, desde taller_backend/:
+
+    python -m benchmarks.bench_parser_oc [--paginas 200] [--repeticiones 5] [--minimo 500]
+
+Con --minimo termina con código 1 si el throughput queda por debajo.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+from app.parsers.texto_oc import parsear_oc
+
+CORPUS = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "ordenes_compra"
+PARTIDAS_POR_PAGINA = 25
+SEPARADOR_PAGINA = "PÁGINA"
+
+DESCRIPCIONES = [
+    "FILTRO DE ACEITE", "BALATAS DELANTERAS", "BUJIA PLATINO", "BOMBA DE AGUA",
+    "AMORTIGUADOR TRASERO-IZQ", "BANDA DE DISTRIBUCION", "ANTICONGELANTE", "FOCO H4",
+]
+UNIDADES = ["PZA", "JGO", "LTS", "KIT"]
+
+
+def oc_sintetica(paginas: int, semilla: int = 0) -> str:
+    """OC con formato Saltillo de `paginas` páginas."""
+    azar = random.Random(semilla)
+    renglones = [
+        "MUNICIPIO DE SALTILLO",
+        "ORDEN DE COMPRA NUMERO 90001",
+        "FECHA DE ELABORACIÓN: 15/05/2024 11:20:00 a.m.",
+        "PROVEEDOR: REFACCIONARIA SINTETICA S.A. DE C.V. RFC: RSI010101AA1",
+    ]
+    for pagina in range(1, paginas + 1):
+        renglones.append("CANTIDAD UNIDAD DESCRIPCIÓN PRECIO UNITARIO IMPORTE")
+        for _ in range(PARTIDAS_POR_PAGINA):
+            cantidad = azar.randint(1, 20)
+            precio = azar.randint(50, 5000) + azar.choice([0, 0.5, 0.25])
+            renglones.append(
+                f"{cantidad:.2f} {azar.choice(UNIDADES)} {azar.randint(1, 9999)} "
+                f"{azar.choice(DESCRIPCIONES)} $ {precio:,.2f} $ {cantidad * precio:,.2f}"
+            )
+        renglones.append(f"{SEPARADOR_PAGINA} {pagina} DE {paginas}")
+    return "\n".join(renglones)
+
+
+def cargar_corpus() -> list[tuple[str, int]]:
+    """(texto, páginas) de cada OC del corpus de pruebas."""
+    documentos = []
+    for archivo in sorted(CORPUS.glob("*.txt")):
+        texto = archivo.read_text(encoding="utf-8")
+        documentos.append((texto, max(1, texto.count(SEPARADOR_PAGINA))))
+    return documentos
+
+
+def medir(documentos: list[tuple[str, int]], repeticiones: int) -> float:
+    """Mejor throughput (páginas/s) de `repeticiones` corridas."""
+    paginas = sum(n for _, n in documentos)
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        for texto, _ in documentos:
+            parsear_oc(texto)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return paginas / mejor
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paginas", type=int, default=200, help="páginas de la OC sintética")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--minimo", type=float, help="páginas/s mínimas aceptables")
+    args = parser.parse_args(argv)
+
+    corpus = cargar_corpus() * 50
+    sintetica = [(oc_sintetica(args.paginas), args.paginas)]
+
+    resultados = {
+        f"corpus ({len(corpus)} OCs)": medir(corpus, args.repeticiones),
+        f"sintética ({args.paginas} páginas)": medir(sintetica, args.repeticiones),
+    }
+    for nombre, throughput in resultados.items():
+        print(f"{nombre:<32} {throughput:>12,.0f} páginas/s")
+
+    peor = min(resultados.values())
+    if args.minimo is not None and peor < args.minimo:
+        print(f"Throughput por debajo del mínimo ({peor:,.0f} < {args.minimo:,.0f})", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,15 @@
 import os
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
 from app.main import create_app
 from app.database import Base
-from app.deps import get_db
+from app.deps import get_db, get_fabrica_sesion, get_read_db
 from app import models
 from app.auth_utils import hash_password
+from app.cache import principales, snapshots_dashboard
 
 
 # ============================================================
@@ -29,6 +30,24 @@ TestingSessionLocal = sessionmaker(
 )
 
 
+class ContadorConsultas:
+    """Cuenta las sentencias que el engine envía mientras está activo."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.total = 0
+
+    def _contar(self, *args):
+        self.total += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._contar)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._contar)
+
+
 # ============================================================
 # FIXTURE: SESIÓN DE BASE DE DATOS
 # ============================================================
@@ -36,6 +55,9 @@ TestingSessionLocal = sessionmaker(
 @pytest.fixture(scope="function")
 def db():
 
+    # Cerrar conexiones del pool para que no sigan apuntando al archivo borrado
+    engine.dispose()
+
     # Borrar archivo previo
     if os.path.exists("test_database.db"):
         os.remove("test_database.db")
@@ -43,6 +65,10 @@ def db():
     # Crear tablas
     Base.metadata.create_all(bind=engine)
 
+    # Los snapshots de dashboard viven en memoria del proceso
+    snapshots_dashboard.limpiar()
+    principales.limpiar()
+
     session = TestingSessionLocal()
     try:
         yield session
@@ -69,6 +95,8 @@ def client(db):
             pass
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_fabrica_sesion] = lambda: TestingSessionLocal
 
     # Crear rol admin
     rol_admin = models.Rol(nombre="admin", descripcion="Administrador del sistema")
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app import crud, schemas
+from app.auth_utils import crear_token_acceso, get_current_principal
+from app.cache import CacheLRU, principales
+from app.roles import require_role
+from tests.conftest import ContadorConsultas, TestingSessionLocal, engine
+
+
+def _usuario(db, username="mecanico1", rol="Almacen"):
+    rol = crud.create_rol(db, schemas.RolCreate(nombre=rol))
+    return crud.create_usuario(db, schemas.UsuarioCreate(
+        username=username, nombre="Usuario", rol_id=rol.id, password="secreto"
+    ))
+
+
+def _principal(username):
+    token = crear_token_acceso({"sub": username})
+    return asyncio.run(get_current_principal(token=token, crear_sesion=TestingSessionLocal))
+
+
+def _validar_rol(principal, *roles):
+    return asyncio.run(require_role(*roles)(principal))
+
+
+def test_principal_se_lee_una_vez_y_valida_rol_sin_consultas(db):
+    usuario = _usuario(db)
+
+    with ContadorConsultas(engine) as consultas:
+        primero = _principal("mecanico1")
+        segundo = _principal("mecanico1")
+        assert _validar_rol(segundo, "ALMACEN", "admin") is segundo
+
+    assert consultas.total == 1
+    assert primero == segundo
+    assert (segundo.id, segundo.rol, segundo.activo) == (usuario.id, "almacen", True)
+    assert principales.estadisticas()["aciertos"] == 1
+
+    with pytest.raises(HTTPException) as error:
+        _validar_rol(segundo, "admin")
+    assert error.value.status_code == 403
+
+
+def test_crear_usuario_o_rol_invalida_la_cache(db):
+    with pytest.raises(HTTPException):
+        _principal("mecanico1")          # no existe: no se guarda
+
+    _usuario(db)
+    assert _principal("mecanico1").rol == "almacen"
+    assert principales.estadisticas()["entradas"] == 1
+
+    crud.create_rol(db, schemas.RolCreate(nombre="compras"))
+    assert principales.estadisticas()["entradas"] == 0
+
+
+def test_cache_lru_vence_y_expulsa_la_menos_usada(monkeypatch):
+    cache = CacheLRU(ttl_segundos=10, max_entradas=2)
+    reloj = [100.0]
+    monkeypatch.setattr("app.cache.time.monotonic", lambda: reloj[0])
+
+    cache.guardar("a", 1)
+    cache.guardar("b", 2)
+    assert cache.obtener("a") == 1      # "b" pasa a ser la menos usada
+    cache.guardar("c", 3)
+
+    assert cache.obtener("b") is None
+    assert cache.obtener("c") == 3
+
+    reloj[0] += 11
+    assert cache.obtener("a") is None
+
+    estadisticas = cache.estadisticas()
+    assert (estadisticas["aciertos"], estadisticas["fallos"], estadisticas["expulsiones"]) == (2, 2, 1)
+    assert estadisticas["entradas"] == 1
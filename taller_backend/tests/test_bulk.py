@@ -0,0 +1,73 @@
+from app import crud, models, schemas
+
+
+def _salida(os_id, refaccion_id, cantidad):
+    return schemas.SalidaRefaccionCreate(
+        orden_servicio_id=os_id,
+        entregado_por="Almacén",
+        recibido_por="Técnico",
+        detalles=[schemas.SalidaDetalleCreate(refaccion_id=refaccion_id, cantidad=cantidad)],
+    )
+
+
+def _orden_y_refaccion(db, existencia):
+    vehiculo = models.Vehiculo(
+        numero_economico="ECO-1", tipo="Camión", placas="AAA-001",
+        marca="Marca", modelo="Modelo"
+    )
+    ref = models.Refaccion(clave="BULK-1", descripcion="Pieza")
+    db.add_all([vehiculo, ref])
+    db.flush()
+    orden = models.OrdenServicio(vehiculo_id=vehiculo.id)
+    db.add_all([orden, models.Inventario(refaccion_id=ref.id, existencia=existencia)])
+    db.commit()
+    return vehiculo, orden, ref
+
+
+def test_salidas_bulk_asigna_existencias_en_orden(db):
+    _, orden, ref = _orden_y_refaccion(db, 5)
+
+    resultados = crud.create_salidas_bulk(db, [
+        _salida(orden.id, ref.id, 3),
+        _salida(orden.id, ref.id, 3),
+        _salida(orden.id, ref.id, 2),
+        _salida(999, ref.id, 1),
+        _salida(orden.id, ref.id, 0),
+    ])
+
+    assert [r["ok"] for r in resultados] == [True, False, True, False, False]
+    assert "inventario" in resultados[1]["error"]
+    assert "999" in resultados[3]["error"]
+
+    db.expire_all()
+    assert db.query(models.Inventario).one().existencia == 0
+    assert db.query(models.SalidaRefaccion).count() == 2
+    assert db.query(models.SalidaDetalle).count() == 2
+    assert [m["cantidad"] for m in crud.get_kardex(db, ref.id).items] == [3, 2]
+
+
+def test_solicitudes_y_ordenes_bulk_reportan_por_elemento(db):
+    vehiculo, orden, ref = _orden_y_refaccion(db, 0)
+
+    resultados_os = crud.create_ordenes_servicio_bulk(db, [
+        schemas.OrdenServicioCreate(vehiculo_id=vehiculo.id),
+        schemas.OrdenServicioCreate(vehiculo_id=vehiculo.id + 100),
+    ])
+    assert [r["ok"] for r in resultados_os] == [True, False]
+    assert db.get(models.OrdenServicio, resultados_os[0]["id"]) is not None
+
+    resultados = crud.create_solicitudes_bulk(db, [
+        schemas.SolicitudRefaccionCreate(
+            orden_servicio_id=orden.id, solicitante="Mecánico",
+            detalles=[schemas.SolicitudDetalleCreate(refaccion_id=ref.id, cantidad=4)],
+        ),
+        schemas.SolicitudRefaccionCreate(
+            orden_servicio_id=orden.id, solicitante="Mecánico",
+            detalles=[schemas.SolicitudDetalleCreate(refaccion_id=ref.id + 100, cantidad=1)],
+        ),
+    ])
+    assert [r["ok"] for r in resultados] == [True, False]
+
+    solicitud = db.get(models.SolicitudRefaccion, resultados[0]["id"])
+    assert solicitud.estado == "pendiente"
+    assert [(d.refaccion_id, d.cantidad) for d in solicitud.detalles] == [(ref.id, 4)]
@@ -0,0 +1,109 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from app import crud, crud_async, models, schemas  # noqa: E402
+from app.database import url_async  # noqa: E402
+from app.paginacion import ParametrosPagina  # noqa: E402
+from tests.conftest import TEST_DB_URL  # noqa: E402
+from tests.test_bulk import _orden_y_refaccion, _salida  # noqa: E402
+from tests.test_kardex import _movimientos  # noqa: E402
+
+
+def _en_sesion_async(funcion):
+    """Corre `funcion(sesion)` con una AsyncSession sobre la base de pruebas."""
+    async def correr():
+        engine = create_async_engine(url_async(TEST_DB_URL))
+        try:
+            async with async_sessionmaker(engine, expire_on_commit=False)() as sesion:
+                return await funcion(sesion)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(correr())
+
+
+def test_url_async_por_base():
+    assert url_async("postgresql+psycopg2://u:p@db:5432/taller") == "postgresql+asyncpg://u:p@db:5432/taller"
+    assert url_async("sqlite:///./taller.db") == "sqlite+aiosqlite:///./taller.db"
+
+
+def test_kardex_y_listados_async_coinciden_con_los_sincronos(db, monkeypatch):
+    monkeypatch.setattr(crud, "KARDEX_CHECKPOINT_CADA", 3)
+    _, orden, ref = _orden_y_refaccion(db, 10)
+    _movimientos(db, ref.id, [10, -2, 5, -1, 4, -3, 6, -2])
+    for cantidad in (1, 2, 3):
+        crud.create_salida_refaccion(db, _salida(orden.id, ref.id, cantidad))
+
+    async def leer(sesion):
+        kardex = await crud_async.get_kardex(sesion, ref.id, desde=datetime(2024, 1, 5))
+        primera = await crud_async.get_salidas(sesion, ParametrosPagina(limit=2, orden="-id"))
+        segunda = await crud_async.get_salidas(
+            sesion, ParametrosPagina(cursor=primera.siguiente_cursor, limit=2, orden="-id")
+        )
+        return kardex, primera, segunda
+
+    kardex, primera, segunda = _en_sesion_async(leer)
+
+    assert kardex.items == crud.get_kardex(db, ref.id, desde=datetime(2024, 1, 5)).items
+    assert [s.id for s in primera.items + segunda.items] == [3, 2, 1]
+    assert segunda.siguiente_cursor is None
+    assert [d.cantidad for d in primera.items[0].detalles] == [3]
+
+
+def test_salida_y_dashboard_async(db):
+    _, orden, ref = _orden_y_refaccion(db, 5)
+
+    async def escribir(sesion):
+        salida = await crud_async.create_salida_refaccion(sesion, _salida(orden.id, ref.id, 2))
+        recepcion = await crud_async.create_recepcion(sesion, schemas.RecepcionCreate(
+            oc_id=1, recibido_por="Almacén",
+            detalles=[schemas.RecepcionDetalleCreate(refaccion_id=ref.id, cantidad_recibida=4)],
+        ))
+        return salida, recepcion, await crud_async.get_dashboard_general(sesion)
+
+    salida, recepcion, dashboard = _en_sesion_async(escribir)
+
+    # Relaciones ya cargadas: se pueden serializar fuera de la sesión
+    assert schemas.SalidaRefaccion.model_validate(salida).detalles[0].cantidad == 2
+    assert schemas.Recepcion.model_validate(recepcion).detalles[0].cantidad_recibida == 4
+
+    db.expire_all()
+    assert db.query(models.Inventario).one().existencia == 7
+    assert dashboard == crud.get_dashboard_general(db)
+    assert dashboard["inventario_total"] == 7
+
+
+def test_salida_async_reintenta_sin_bloquear_el_event_loop(db, monkeypatch):
+    _, orden, ref = _orden_y_refaccion(db, 5)
+    esperas = []
+    escribir_salida = crud._escribir_salida
+
+    def con_conflicto(sesion, salida_in):
+        if not esperas:
+            raise crud._ConflictoConcurrencia()
+        return escribir_salida(sesion, salida_in)
+
+    async def esperar(segundos):
+        esperas.append(segundos)
+
+    def bloquear(segundos):
+        raise AssertionError("time.sleep en el event loop")
+
+    monkeypatch.setattr(crud, "_escribir_salida", con_conflicto)
+    monkeypatch.setattr(crud_async.asyncio, "sleep", esperar)
+    monkeypatch.setattr(crud.time, "sleep", bloquear)
+
+    salida = _en_sesion_async(
+        lambda sesion: crud_async.create_salida_refaccion(sesion, _salida(orden.id, ref.id, 2))
+    )
+
+    assert len(esperas) == 1
+    assert salida.detalles[0].cantidad == 2
+    db.expire_all()
+    assert db.query(models.Inventario).one().existencia == 3
@@ -0,0 +1,123 @@
+from datetime import datetime
+
+from app import crud, models, schemas
+
+
+def _crear_base(db):
+    veh_norte = models.Vehiculo(
+        numero_economico="ECO-1", tipo="pickup", placas="AAA-001",
+        marca="Nissan", modelo="NP300", area_asignada="Norte",
+    )
+    veh_sur = models.Vehiculo(
+        numero_economico="ECO-2", tipo="sedan", placas="BBB-002",
+        marca="Nissan", modelo="Versa", area_asignada="Sur",
+    )
+    ref = models.Refaccion(clave="FIL-001", descripcion="Filtro de aceite")
+    db.add_all([veh_norte, veh_sur, ref])
+    db.flush()
+
+    os_norte = models.OrdenServicio(vehiculo_id=veh_norte.id)
+    os_sur = models.OrdenServicio(vehiculo_id=veh_sur.id)
+    db.add_all([os_norte, os_sur, models.Inventario(refaccion_id=ref.id, existencia=10)])
+    db.commit()
+    return veh_norte, veh_sur, os_norte, os_sur, ref
+
+
+def _salida(db, os_id, ref_id, cantidad):
+    return crud.create_salida_refaccion(db, schemas.SalidaRefaccionCreate(
+        orden_servicio_id=os_id,
+        entregado_por="Almacén",
+        recibido_por="Mecánico",
+        detalles=[schemas.SalidaDetalleCreate(refaccion_id=ref_id, cantidad=cantidad)],
+    ))
+
+
+def _oc(db, ref_id, precio, proveedor="Refaccionaria López"):
+    return crud.create_orden_compra(db, schemas.OrdenCompraCreate(
+        proveedor=proveedor,
+        detalles=[schemas.OrdenCompraDetalleCreate(
+            refaccion_id=ref_id, cantidad=1, precio_unitario=precio,
+        )],
+    ))
+
+
+def test_gasto_por_vehiculo_usa_ultimo_precio(db):
+    veh_norte, veh_sur, os_norte, os_sur, ref = _crear_base(db)
+
+    _oc(db, ref.id, 100)
+    _oc(db, ref.id, 150)
+    _salida(db, os_norte.id, ref.id, 2)
+    _salida(db, os_sur.id, ref.id, 1)
+
+    precio = db.get(models.PrecioRefaccion, ref.id)
+    assert precio.ultimo_precio == 150
+    assert db.query(models.HistorialPrecio).count() == 2
+
+    gasto = {g["vehiculo_id"]: g["total_gastado"] for g in crud.get_gasto_por_vehiculo(db)}
+    assert gasto == {veh_norte.id: 300, veh_sur.id: 150}
+
+    solo_sur = crud.get_gasto_por_vehiculo(db, area_asignada="Sur")
+    assert [g["vehiculo_id"] for g in solo_sur] == [veh_sur.id]
+
+    assert crud.get_gasto_por_vehiculo(db, desde=datetime(2999, 1, 1)) == []
+
+
+def test_recalcular_precios_refaccion(db):
+    _, _, _, _, ref = _crear_base(db)
+
+    _oc(db, ref.id, 80)
+    _oc(db, ref.id, 90)
+    db.query(models.PrecioRefaccion).delete()
+    db.query(models.HistorialPrecio).delete()
+    db.commit()
+
+    crud.recalcular_precios_refaccion(db)
+
+    assert db.get(models.PrecioRefaccion, ref.id).ultimo_precio == 90
+    assert db.query(models.HistorialPrecio).count() == 2
+
+
+def test_alertas_compra_cara(db):
+    _, _, _, _, ref = _crear_base(db)
+
+    _oc(db, ref.id, 100, proveedor="A")
+    _oc(db, ref.id, 110, proveedor="B")
+    _oc(db, ref.id, 150, proveedor="A")
+
+    stats = db.get(models.PrecioRefaccion, ref.id)
+    assert (stats.precio_min, stats.precio_max, stats.num_compras) == (100, 150, 3)
+    assert round(stats.precio_promedio, 2) == 120
+
+    alertas = crud.get_alertas_compra_cara(db)
+    assert [a["precio_actual"] for a in alertas] == [150, 110]
+    assert alertas[0]["porcentaje"] == 50
+
+    assert [a["precio_actual"] for a in crud.get_alertas_compra_cara(db, porcentaje_min=20)] == [150]
+    assert [a["precio_actual"] for a in crud.get_alertas_compra_cara(db, porcentaje_promedio=0)] == [150]
+    assert [a["proveedor"] for a in crud.get_alertas_compra_cara(db, proveedor="B")] == ["B"]
+    assert [a["precio_actual"] for a in crud.get_alertas_compra_cara(db, offset=1, limit=1)] == [110]
+
+
+def test_dashboard_snapshot_se_invalida_con_escrituras(db):
+    _, _, os_norte, _, ref = _crear_base(db)
+
+    primero = crud.get_dashboard_general(db)
+    assert primero["inventario_total"] == 10
+    assert crud.get_dashboard_general(db) is primero
+
+    _salida(db, os_norte.id, ref.id, 3)
+
+    segundo = crud.get_dashboard_general(db)
+    assert segundo is not primero
+    assert segundo["inventario_total"] == 7
+
+
+def test_dashboard_snapshot_se_invalida_al_crear_orden(db):
+    veh_norte, _, _, _, _ = _crear_base(db)
+
+    primero = crud.get_dashboard_general(db)
+    assert primero["ordenes_abiertas"] == 2
+
+    crud.create_orden_servicio(db, schemas.OrdenServicioCreate(vehiculo_id=veh_norte.id))
+
+    assert crud.get_dashboard_general(db)["ordenes_abiertas"] == 3
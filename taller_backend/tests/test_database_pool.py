@@ -0,0 +1,48 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app import database
+
+CONSULTA_LENTA = text(
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 100000000) "
+    "SELECT count(*) FROM c"
+)
+
+
+def test_timeout_por_ruta(monkeypatch):
+    monkeypatch.setattr(database, "TIMEOUTS_POR_PREFIJO", (("/ui", 5000), ("/reportes", 0)))
+    monkeypatch.setattr(database, "STATEMENT_TIMEOUT_MS", 30000)
+
+    assert database.timeout_para_ruta("/ui/bootstrap") == 5000
+    assert database.timeout_para_ruta("/uix") == 30000
+    assert database.timeout_para_ruta("/reportes/inventario") is None
+    assert database.timeout_para_ruta("/salidas/") == 30000
+
+
+def test_opciones_pool_segun_url():
+    assert "pool_size" not in database.opciones_pool("sqlite://")
+    opciones = database.opciones_pool("postgresql+psycopg2://u:p@db/taller")
+    assert opciones["pool_size"] == database.DB_POOL_SIZE
+    assert opciones["pool_pre_ping"] == database.DB_POOL_PRE_PING
+
+
+def test_sqlite_interrumpe_la_sentencia_y_libera_el_limite_al_devolver(tmp_path):
+    motor = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", pool_size=1, max_overflow=0)
+    database._instalar_limites(motor)
+
+    with Session(motor) as sesion:
+        sesion.info[database.CLAVE_TIMEOUT] = 50
+        with pytest.raises(OperationalError) as error:
+            sesion.execute(CONSULTA_LENTA)
+    assert database.es_timeout_de_sentencia(error.value)
+
+    # La misma conexión, devuelta al pool, ya no tiene límite
+    with Session(motor) as sesion:
+        assert sesion.execute(text("SELECT 1")).scalar() == 1
+        assert database.CLAVE_TIMEOUT not in sesion.connection().info
+
+    estado = database._estado_pool(motor)
+    assert (estado["size"], estado["checkedout"]) == (1, 0)
+    motor.dispose()
@@ -0,0 +1,87 @@
+from sqlalchemy import create_engine, inspect, text
+
+from app.database import Base
+from app.esquema import INDICES_AGREGADOS, actualizar_esquema
+
+# Tablas tal como las creaba la primera versión (sin columnas ni índices nuevos)
+ESQUEMA_ANTERIOR = [
+    """CREATE TABLE refacciones (
+        id INTEGER NOT NULL, clave VARCHAR NOT NULL, descripcion VARCHAR NOT NULL,
+        unidad_medida VARCHAR, PRIMARY KEY (id))""",
+    "CREATE UNIQUE INDEX ix_refacciones_clave ON refacciones (clave)",
+    "CREATE INDEX ix_refacciones_id ON refacciones (id)",
+    """CREATE TABLE inventario (
+        id INTEGER NOT NULL, refaccion_id INTEGER NOT NULL, existencia INTEGER,
+        PRIMARY KEY (id), FOREIGN KEY(refaccion_id) REFERENCES refacciones (id))""",
+    "CREATE INDEX ix_inventario_id ON inventario (id)",
+]
+
+
+def _motor_anterior(tmp_path):
+    motor = create_engine(f"sqlite:///{tmp_path / 'anterior.db'}")
+    with motor.begin() as conn:
+        for sentencia in ESQUEMA_ANTERIOR:
+            conn.execute(text(sentencia))
+        conn.execute(text(
+            "INSERT INTO refacciones (id, clave, descripcion) VALUES (1, 'A', 'Filtro'), (2, 'B', 'Balata')"
+        ))
+        conn.execute(text(
+            "INSERT INTO inventario (id, refaccion_id, existencia) VALUES (1, 1, 4), (2, 2, 1), (3, 1, 6)"
+        ))
+    Base.metadata.create_all(bind=motor)
+    return motor
+
+
+def test_actualizar_esquema_inventario(tmp_path):
+    motor = _motor_anterior(tmp_path)
+
+    actualizar_esquema(motor)
+    actualizar_esquema(motor)   # idempotente
+
+    inspector = inspect(motor)
+    columnas = {c["name"] for c in inspector.get_columns("inventario")}
+    assert {"stock_minimo", "stock_maximo"} <= columnas
+
+    indices = {i["name"]: i for i in inspector.get_indexes("inventario")}
+    assert indices["ix_inventario_refaccion_id"]["unique"]
+
+    with motor.connect() as conn:
+        filas = conn.execute(text(
+            "SELECT id, refaccion_id, existencia FROM inventario ORDER BY id"
+        )).all()
+    assert [tuple(f) for f in filas] == [(1, 1, 10), (2, 2, 1)]
+
+
+def test_actualizar_esquema_refacciones(tmp_path):
+    motor = _motor_anterior(tmp_path)
+
+    actualizar_esquema(motor)
+
+    inspector = inspect(motor)
+    assert "descripcion_normalizada" in {c["name"] for c in inspector.get_columns("refacciones")}
+    assert "ix_refacciones_descripcion_normalizada" in {
+        i["name"] for i in inspector.get_indexes("refacciones")
+    }
+
+
+def test_actualizar_esquema_crea_indices_en_tablas_existentes(tmp_path):
+    motor = _motor_anterior(tmp_path)
+    # Como en una base anterior: las tablas existen, los índices nuevos no
+    with motor.begin() as conn:
+        for tabla in INDICES_AGREGADOS:
+            for indice in tabla.indexes:
+                conn.execute(text(f"DROP INDEX {indice.name}"))
+
+    actualizar_esquema(motor)
+
+    inspector = inspect(motor)
+    for tabla in INDICES_AGREGADOS:
+        assert {i.name for i in tabla.indexes} <= {
+            i["name"] for i in inspector.get_indexes(tabla.name)
+        }
+    assert "ix_salidas_refacciones_fecha_salida" in {
+        i["name"] for i in inspector.get_indexes("salidas_refacciones")
+    }
+    assert "ix_movimientos_refaccion_fecha_id" in {
+        i["name"] for i in inspector.get_indexes("movimientos_inventario")
+    }
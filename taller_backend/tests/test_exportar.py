@@ -0,0 +1,123 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import crud, deps, models
+from app.auth_utils import Principal, get_current_active_principal
+from app.deps import get_db, get_read_db
+from app.main import create_app
+from tests.conftest import TestingSessionLocal, engine
+from tests.test_bulk import _orden_y_refaccion, _salida
+
+
+def _cliente(db, rol):
+    app = create_app()
+    app.router.on_startup = []
+
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_read_db] = lambda: db
+    app.dependency_overrides[get_current_active_principal] = (
+        lambda: Principal(id=1, username=rol, activo=True, rol=rol)
+    )
+    return app, TestClient(app)
+
+
+@pytest.fixture
+def cliente_auditor(db):
+    app, cliente = _cliente(db, "auditor")
+    yield cliente
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def cliente_almacen(db):
+    app, cliente = _cliente(db, "almacen")
+    yield cliente
+    app.dependency_overrides.clear()
+
+
+def _inventario(db, total):
+    refs = [models.Refaccion(clave=f"EXP-{i:03}", descripcion=f"Refacción {i}") for i in range(total)]
+    db.add_all(refs)
+    db.flush()
+    db.add_all([models.Inventario(refaccion_id=r.id, existencia=i) for i, r in enumerate(refs)])
+    db.commit()
+
+
+def test_reporte_inventario_csv(db, cliente_auditor):
+    _inventario(db, 25)
+
+    resp = cliente_auditor.get("/reportes/inventario", params={"format": "csv"})
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "text/csv; charset=utf-8"
+    assert 'filename="inventario.csv"' in resp.headers["content-disposition"]
+
+    lineas = resp.text.splitlines()
+    assert lineas[0] == "refaccion_id,clave,descripcion,unidad_medida,existencia"
+    assert len(lineas) == 1 + 25
+    assert lineas[1].split(",")[1] == "EXP-000"
+
+
+def test_reporte_inventario_ndjson(db, cliente_auditor):
+    _inventario(db, 25)
+
+    resp = cliente_auditor.get("/reportes/inventario", params={"format": "ndjson"})
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/x-ndjson"
+
+    filas = [json.loads(linea) for linea in resp.text.splitlines()]
+    assert len(filas) == 25
+    assert set(filas[0]) == {"refaccion_id", "clave", "descripcion", "unidad_medida", "existencia"}
+    assert filas[-1]["existencia"] == 24
+
+
+def test_iterar_en_sesion_abre_la_sesion_al_recorrer_y_la_cierra(db, monkeypatch):
+    monkeypatch.setattr(deps, "SessionLocal", TestingSessionLocal)
+    _inventario(db, 3)
+    peticion = SimpleNamespace(url=SimpleNamespace(path="/salidas/"))
+
+    filas = deps.iterar_en_sesion(peticion, crud.iterar_inventario_detallado)
+    assert engine.pool.checkedout() == 0
+
+    assert next(filas)["clave"] == "EXP-000"
+    assert engine.pool.checkedout() == 1
+
+    assert len(list(filas)) == 2
+    assert engine.pool.checkedout() == 0
+
+
+def test_exportacion_de_salidas_respeta_los_filtros(db, cliente_almacen):
+    vehiculo, orden, ref = _orden_y_refaccion(db, 20)
+    otra = models.OrdenServicio(vehiculo_id=vehiculo.id)
+    db.add(otra)
+    db.commit()
+    for os_id in (orden.id, otra.id, orden.id):
+        crud.create_salida_refaccion(db, _salida(os_id, ref.id, 1))
+
+    params = {"orden_servicio_id": orden.id}
+    listado = cliente_almacen.get("/salidas/", params=params).json()
+    csv = cliente_almacen.get("/salidas/", params={**params, "format": "csv"}).text.splitlines()
+    ndjson = cliente_almacen.get("/salidas/", params={**params, "format": "ndjson"}).text.splitlines()
+
+    esperadas = [s["id"] for s in listado]
+    assert len(esperadas) == 2
+    assert [int(linea.split(",")[0]) for linea in csv[1:]] == esperadas
+    assert [json.loads(linea)["salida_id"] for linea in ndjson] == esperadas
+
+
+def test_exportacion_de_vehiculos_respeta_los_filtros(db, cliente_almacen):
+    db.add_all([
+        models.Vehiculo(numero_economico=f"ECO-{i}", tipo="Camión", placas=f"PL-{i}",
+                        marca=marca, modelo="2020")
+        for i, marca in enumerate(["Nissan", "Ford", "Nissan"])
+    ])
+    db.commit()
+
+    csv = cliente_almacen.get("/vehiculos/", params={"marca": "Nissan", "format": "csv"})
+
+    assert csv.status_code == 200
+    assert [linea.split(",")[1] for linea in csv.text.splitlines()[1:]] == ["ECO-0", "ECO-2"]
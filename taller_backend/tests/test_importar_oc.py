@@ -0,0 +1,301 @@
+import io
+import time
+import zipfile
+
+import openpyxl
+
+from app import crud, importaciones, models
+from app.importaciones import GestorImportaciones, Trabajo, expandir_archivos, huella
+from app.parsers.excel import HojaOC
+from tests.conftest import ContadorConsultas, TestingSessionLocal, engine
+
+
+def _partida(descripcion, clave=None, cantidad=1, precio=10.0):
+    return {"clave": clave, "descripcion": descripcion, "cantidad": cantidad, "precio_unitario": precio}
+
+
+def test_resolver_refacciones_por_clave_y_descripcion_normalizada(db):
+    db.add_all([
+        models.Refaccion(clave="BAL-01", descripcion="Balata delantera"),
+        models.Refaccion(clave="FILTRO ACEITE", descripcion="Filtro de aceite"),
+    ])
+    db.commit()
+    balata, filtro = db.query(models.Refaccion).order_by(models.Refaccion.id)
+
+    items = [
+        _partida("Otra descripción", clave="BAL-01"),   # por clave
+        _partida("  BÁLATA   delantera "),              # por descripción normalizada
+        _partida("Bujía"),                              # nueva
+        _partida("bujia"),                              # misma nueva
+        _partida("FILTRO ACEITE"),                      # nueva; su clave generada choca
+    ]
+
+    with ContadorConsultas(engine) as consultas:
+        ids = crud.resolver_refacciones(db, items)
+
+    assert ids[0] == ids[1] == balata.id
+    assert ids[2] == ids[3] != filtro.id
+    assert ids[4] not in {balata.id, filtro.id, ids[2]}
+    assert db.get(models.Refaccion, ids[4]).clave == "FILTRO ACEITE-2"
+    # resolución + claves con sufijo (sólo por el choque) + INSERT de las nuevas
+    assert consultas.total <= 4
+
+
+def test_importar_oc_reutiliza_refacciones_de_la_misma_factura(db):
+    oc = crud.importar_orden_compra_desde_json(db, {
+        "proveedor": "Refaccionaria",
+        "detalles": [
+            _partida("Amortiguador trasero", clave="AM-1", cantidad=2, precio=500),
+            _partida("amortiguador  TRASERO", cantidad=1, precio=480),
+            _partida("Banda de distribución", cantidad=1, precio=300),
+        ],
+    })
+
+    assert db.query(models.Refaccion).count() == 2
+    assert oc.detalles[0].refaccion_id == oc.detalles[1].refaccion_id
+    nueva = db.query(models.Refaccion).filter_by(clave="AM-1").one()
+    assert nueva.descripcion_normalizada == "AMORTIGUADOR TRASERO"
+
+
+def _libro(filas):
+    wb = openpyxl.Workbook()
+    for fila in filas:
+        wb.active.append(list(fila))
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def _excel_oc(partidas):
+    return _libro([
+        ("PROVEEDOR", "Refaccionaria del Norte"),
+        ("CANTIDAD", "UNIDAD", "DESCRIPCION", "PRECIO"),
+        *partidas,
+    ])
+
+
+def test_hoja_oc_detecta_encabezados_y_reporta_filas_invalidas():
+    contenido = _libro([
+        ("MUNICIPIO DE SALTILLO",),
+        ("Proveedor:", "Llantas y Servicios"),
+        (),
+        ("Clave", "Descripción", "U.M.", "Cant.", "Precio Unitario"),
+        ("LL-1", "Llanta 11R22.5", "PZA", 4, "$5,200.00"),
+        ("", "Válvula", None, "2", 35),
+        ("X", "Renglón roto", "PZA", "dos", 10),
+        (None, "TOTAL", None, None, None),
+    ])
+
+    with HojaOC(contenido) as hoja:
+        partidas = list(hoja.partidas())
+
+        assert hoja.fila_encabezado == 4
+        assert hoja.encabezado["proveedor"] == "Llantas y Servicios"
+        assert partidas == [
+            {"cantidad": 4.0, "unidad": "PZA", "descripcion": "Llanta 11R22.5",
+             "precio_unitario": 5200.0, "clave": "LL-1"},
+            {"cantidad": 2.0, "unidad": "pieza", "descripcion": "Válvula", "precio_unitario": 35.0},
+        ]
+        assert hoja.filas_omitidas == 2
+        assert hoja.advertencias[0]["codigo"] == "partida_invalida"
+        assert hoja.advertencias[0]["mensaje"].startswith("Fila 7:")
+
+
+def test_hoja_oc_sin_encabezados_usa_formato_posicional():
+    contenido = _libro([
+        ("PROVEEDOR", "Refaccionaria Centro"),
+        (1, "PZA", "Filtro", 99.5),
+        ("Observaciones",),
+        (3, "LT", "Aceite", "$120"),
+    ])
+
+    with HojaOC(contenido) as hoja:
+        partidas = list(hoja.partidas())
+        assert hoja.fila_encabezado is None
+        assert hoja.encabezado["proveedor"] == "Refaccionaria Centro"
+        assert [(p["descripcion"], p["precio_unitario"]) for p in partidas] == [("Filtro", 99.5), ("Aceite", 120.0)]
+        assert hoja.advertencias == []
+
+
+def test_importar_oc_en_bloques_desde_generador(db):
+    partidas = (
+        {"descripcion": f"Pieza {i % 3}", "cantidad": 1, "precio_unitario": 10.0 + i}
+        for i in range(7)
+    )
+
+    oc = crud.importar_orden_compra_en_bloques(db, {"proveedor": "Prov"}, partidas, tamano_bloque=2)
+
+    assert len(oc.detalles) == 7
+    assert db.query(models.Refaccion).count() == 3
+    precio = db.get(models.PrecioRefaccion, oc.detalles[0].refaccion_id)
+    assert precio.num_compras == 3
+    assert precio.ultimo_precio == 16.0
+
+
+def _esperar(gestor, job_id, timeout=60):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        trabajo = gestor.obtener(job_id)
+        if trabajo.estado in ("completado", "error"):
+            return trabajo
+        time.sleep(0.05)
+    raise AssertionError("la importación no terminó a tiempo")
+
+
+def test_importacion_en_segundo_plano_crea_la_oc(db):
+    gestor = GestorImportaciones(workers=1, max_pendientes=5, ttl_segundos=60)
+    try:
+        contenido = _excel_oc([(2, "PZA", "Filtro de aire", "$150.00"), (1, "PZA", "Banda", "$90.50")])
+        trabajo = gestor.encolar("excel", "oc.xlsx", contenido, TestingSessionLocal)
+        assert trabajo.job_id
+
+        trabajo = _esperar(gestor, trabajo.job_id)
+
+        assert trabajo.estado == "completado", trabajo.error
+        assert trabajo.progreso == 100
+        assert trabajo.vista_previa["proveedor"] == "Refaccionaria del Norte"
+        assert len(trabajo.vista_previa["detalles"]) == 2
+
+        oc = db.get(models.OrdenCompra, trabajo.oc_id)
+        assert oc.proveedor == "Refaccionaria del Norte"
+        assert len(oc.detalles) == 2
+
+        # Re-subir el mismo archivo responde al instante con la misma OC
+        repetido = gestor.encolar("excel", "copia.xlsx", contenido, TestingSessionLocal)
+        assert repetido.estado == "completado"
+        assert repetido.reutilizado
+        assert repetido.oc_id == trabajo.oc_id
+        assert repetido.vista_previa["proveedor"] == "Refaccionaria del Norte"
+
+        fallido = _esperar(gestor, gestor.encolar("pdf", "roto.pdf", b"no es pdf", TestingSessionLocal).job_id)
+        assert fallido.estado == "error"
+        assert fallido.error
+    finally:
+        gestor.cerrar()
+
+    assert db.query(models.OrdenCompra).count() == 1
+
+
+def test_importacion_concurrente_del_mismo_archivo_devuelve_la_oc_existente(db):
+    contenido = _excel_oc([(1, "PZA", "Filtro de aire", "$150.00")])
+    clave = huella(contenido)
+
+    # Otro proceso terminó primero (después de la revisión de encolar)
+    existente = crud.importar_orden_compra_desde_json(
+        db,
+        {"proveedor": "Prov", "detalles": [_partida("Balata", precio=80.0)]},
+        {"sha256": clave, "tipo": "excel", "nombre_archivo": "otro.xlsx", "numero_oc": None},
+    )
+
+    gestor = GestorImportaciones(workers=1, max_pendientes=5, ttl_segundos=60)
+    try:
+        trabajo = Trabajo("excel", "oc.xlsx")
+        gestor._ejecutar(trabajo, clave, contenido, TestingSessionLocal)
+    finally:
+        gestor.cerrar()
+
+    assert trabajo.estado == "completado", trabajo.error
+    assert trabajo.reutilizado
+    assert trabajo.oc_id == existente.id
+
+    # La OC del segundo intento se deshizo junto con su fila de cache
+    db.expire_all()
+    assert db.query(models.OrdenCompra).count() == 1
+    assert db.query(models.ImportacionDocumento).count() == 1
+
+
+def _pdf(paginas):
+    """PDF mínimo (Helvetica, una línea de texto por renglón) para las pruebas."""
+    kids = [4 + 2 * i for i in range(len(paginas))]
+    objetos = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {len(paginas)} >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for kid, lineas in zip(kids, paginas):
+        stream = "\n".join(["BT /F1 9 Tf 12 TL 40 750 Td", *(f"({l}) Tj T*" for l in lineas), "ET"])
+        objetos.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {kid + 1} 0 R >>"
+        )
+        objetos.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+
+    salida = b"%PDF-1.4\n"
+    offsets = []
+    for n, objeto in enumerate(objetos, start=1):
+        offsets.append(len(salida))
+        salida += f"{n} 0 obj\n{objeto}\nendobj\n".encode("latin-1")
+    xref = len(salida)
+    salida += f"xref\n0 {len(objetos) + 1}\n0000000000 65535 f \n".encode()
+    salida += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    salida += f"trailer\n<< /Size {len(objetos) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return salida
+
+
+def _zip(archivos):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        for nombre, contenido in archivos:
+            zf.writestr(nombre, contenido)
+    return buffer.getvalue()
+
+
+def test_importacion_en_lote_con_zip_y_paginas_en_paralelo(db, monkeypatch):
+    monkeypatch.setattr(importaciones, "IMPORTACION_PAGINAS_POR_TAREA", 1)
+
+    oc_larga = _pdf([
+        ["ORDEN DE COMPRA NUMERO 7001", "PROVEEDOR: AUTOPARTES SALTILLO"],
+        *[[f"{i}.00 PZA 10{i} BUJIA MODELO {i} $ 50.00 $ 50.00"] for i in range(1, 5)],
+    ])
+    oc_corta = _pdf([["ORDEN DE COMPRA NUMERO 7002", "1.00 PZA 200 BALATA $ 300.00 $ 300.00"]])
+    sin_partidas = _pdf([["ORDEN DE COMPRA NUMERO 7003"]])
+
+    archivos = expandir_archivos([
+        ("lote.zip", _zip([("a.pdf", oc_larga), ("b.pdf", oc_corta)])),
+        ("vacia.pdf", sin_partidas),
+        ("notas.txt", b"hola"),
+        ("oc.xlsx", _excel_oc([(3, "PZA", "Aceite", "$120.00")])),
+    ])
+    assert [nombre for nombre, _ in archivos] == [
+        "lote.zip/a.pdf", "lote.zip/b.pdf", "vacia.pdf", "notas.txt", "oc.xlsx"
+    ]
+
+    gestor = GestorImportaciones(workers=2, max_pendientes=5, ttl_segundos=60)
+    try:
+        resultados = gestor.parsear_lote(archivos)
+    finally:
+        gestor.cerrar()
+
+    assert "error" in resultados[3]
+    assert [r["data"]["numero_oc"] for r in resultados[:3]] == ["7001", "7002", "7003"]
+    assert [len(r["data"]["detalles"]) for r in resultados[:3]] == [4, 1, 0]
+
+    documentos = [resultados[i]["data"] for i in (0, 1, 4)]
+    ocs = crud.importar_ordenes_compra_en_lote(db, documentos)
+
+    assert [len(oc.detalles) for oc in ocs] == [4, 1, 1]
+    assert db.query(models.OrdenCompra).count() == 3
+    assert db.query(models.PrecioRefaccion).count() == 6
+
+
+def test_importar_lote_es_idempotente_por_contenido_y_numero_oc(db):
+    oc_7010 = _pdf([["ORDEN DE COMPRA NUMERO 7010", "1.00 PZA 200 BALATA $ 300.00 $ 300.00"]])
+    # Mismo número de OC, otro archivo (p. ej. escaneado de nuevo)
+    oc_7010_bis = _pdf([["ORDEN DE COMPRA NUMERO 7010", "1.00 PZA 200 BALATA $ 300.00 $ 300.00", " "]])
+    oc_7011 = _pdf([["ORDEN DE COMPRA NUMERO 7011", "2.00 PZA 300 FILTRO $ 80.00 $ 160.00"]])
+
+    gestor = GestorImportaciones(workers=1, max_pendientes=5, ttl_segundos=60)
+    try:
+        primera = gestor.importar_lote(db, [("a.pdf", oc_7010), ("a-copia.pdf", oc_7010), ("b.pdf", oc_7010_bis)])
+        segunda = gestor.importar_lote(db, [("a.pdf", oc_7010), ("c.pdf", oc_7011)])
+    finally:
+        gestor.cerrar()
+
+    assert [(r["ok"], r["reutilizada"]) for r in primera] == [(True, False), (True, True), (True, True)]
+    assert len({r["oc_id"] for r in primera}) == 1
+    assert segunda[0]["oc_id"] == primera[0]["oc_id"]
+    assert segunda[0]["reutilizada"]
+    assert not segunda[1]["reutilizada"]
+
+    assert db.query(models.OrdenCompra).count() == 2
+    assert db.query(models.ImportacionDocumento).count() == 3
@@ -1,3 +1,8 @@
+import pytest
+
+from app import crud, models, schemas
+
+
 def test_inventario_inicia_vacio(client):
     # Obtener inventario
     response = client.get("/inventario/")
@@ -8,3 +13,53 @@ def test_inventario_inicia_vacio(client):
     # Validar que es una lista vacía
     assert isinstance(inventario, list)
     assert inventario == []
+
+
+def _recepcion(oc_id, detalles):
+    return schemas.RecepcionCreate(
+        oc_id=oc_id,
+        recibido_por="Almacén",
+        detalles=[
+            schemas.RecepcionDetalleCreate(refaccion_id=ref_id, cantidad_recibida=cantidad)
+            for ref_id, cantidad in detalles
+        ],
+    )
+
+
+def _refacciones_y_oc(db, n):
+    refs = [models.Refaccion(clave=f"REC-{i}", descripcion=f"Pieza {i}") for i in range(n)]
+    oc = models.OrdenCompra(proveedor="Proveedor")
+    db.add_all([*refs, oc])
+    db.commit()
+    return refs, oc
+
+
+def test_recepcion_aplica_existencias_y_kardex_en_lote(db):
+    refs, oc = _refacciones_y_oc(db, 2)
+    db.add(models.Inventario(refaccion_id=refs[0].id, existencia=4))
+    db.commit()
+
+    rec = crud.create_recepcion(db, _recepcion(oc.id, [(refs[0].id, 3), (refs[1].id, 5), (refs[0].id, 2)]))
+
+    assert len(rec.detalles) == 3
+    existencias = {
+        i.refaccion_id: i.existencia for i in db.query(models.Inventario)
+    }
+    assert existencias == {refs[0].id: 9, refs[1].id: 5}
+    assert [m["saldo"] for m in crud.get_kardex(db, refs[0].id).items] == [3, 5]
+
+
+def test_recepcion_es_todo_o_nada(db, monkeypatch):
+    refs, oc = _refacciones_y_oc(db, 1)
+
+    def fallar(*args, **kwargs):
+        raise RuntimeError("falla simulada")
+
+    monkeypatch.setattr(crud, "_registrar_movimientos", fallar)
+
+    with pytest.raises(RuntimeError):
+        crud.create_recepcion(db, _recepcion(oc.id, [(refs[0].id, 3)]))
+
+    assert db.query(models.Recepcion).count() == 0
+    assert db.query(models.RecepcionDetalle).count() == 0
+    assert db.query(models.Inventario).count() == 0
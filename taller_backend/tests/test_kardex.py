@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+
+from app import crud, models, schemas
+
+
+def _movimientos(db, ref_id, cantidades, inicio=datetime(2024, 1, 1)):
+    """Registra movimientos diarios: positivos son entradas, negativos salidas."""
+    for dia, cantidad in enumerate(cantidades):
+        db.add(models.MovimientoInventario(
+            refaccion_id=ref_id,
+            tipo="entrada" if cantidad > 0 else "salida",
+            cantidad=abs(cantidad),
+            fecha=inicio + timedelta(days=dia),
+        ))
+        db.flush()
+        crud.actualizar_checkpoint_kardex(db, ref_id)
+    db.commit()
+
+
+def test_kardex_checkpoints_y_rango(db, monkeypatch):
+    monkeypatch.setattr(crud, "KARDEX_CHECKPOINT_CADA", 3)
+    ref = models.Refaccion(clave="KAR-001", descripcion="Bujía")
+    db.add(ref)
+    db.commit()
+
+    _movimientos(db, ref.id, [10, -2, 5, -1, 4, -3, 6, -2])
+
+    checkpoints = db.query(models.SaldoKardex).order_by(models.SaldoKardex.id).all()
+    assert [c.saldo for c in checkpoints] == [13, 13]
+
+    completo = crud.get_kardex(db, ref.id).items
+    assert [m["saldo"] for m in completo] == [10, 8, 13, 12, 16, 13, 19, 17]
+
+    rango = crud.get_kardex(
+        db, ref.id, desde=datetime(2024, 1, 5), hasta=datetime(2024, 1, 7)
+    ).items
+    assert [m["saldo"] for m in rango] == [16, 13, 19]
+
+
+def test_kardex_paginacion_por_cursor(db):
+    ref = models.Refaccion(clave="KAR-002", descripcion="Filtro de aire")
+    db.add(ref)
+    db.commit()
+
+    _movimientos(db, ref.id, [5, -1, -1, 3, -2])
+
+    pagina = crud.get_kardex_detallado(db, ref.id, limit=2)
+    saldos = [m["saldo"] for m in pagina.items]
+    while pagina.siguiente_cursor:
+        pagina = crud.get_kardex_detallado(db, ref.id, cursor=pagina.siguiente_cursor, limit=2)
+        saldos += [m["saldo"] for m in pagina.items]
+
+    assert saldos == [5, 4, 3, 6, 4]
+
+
+def test_iterar_kardex_desde_fecha(db):
+    ref = models.Refaccion(clave="KAR-003", descripcion="Balata")
+    db.add(ref)
+    db.commit()
+
+    _movimientos(db, ref.id, [8, -3, 2, -4])
+
+    filas = list(crud.iterar_kardex(db, ref.id, desde=datetime(2024, 1, 3)))
+    assert [(f["tipo"], f["saldo"]) for f in filas] == [("entrada", 7), ("salida", 3)]
+
+
+def test_registrar_movimiento_bloquea_inventario_y_crea_checkpoint(db, monkeypatch):
+    monkeypatch.setattr(crud, "KARDEX_CHECKPOINT_CADA", 2)
+    ref = models.Refaccion(clave="KAR-004", descripcion="Banda")
+    db.add(ref)
+    db.commit()
+
+    for tipo, cantidad in [("entrada", 5), ("salida", 2)]:
+        crud.registrar_movimiento(db, schemas.MovimientoInventarioCreate(
+            refaccion_id=ref.id, tipo=tipo, cantidad=cantidad,
+        ))
+
+    assert db.query(models.Inventario).filter_by(refaccion_id=ref.id).count() == 1
+    assert [c.saldo for c in db.query(models.SaldoKardex).filter_by(refaccion_id=ref.id)] == [3]
@@ -0,0 +1,41 @@
+import pytest
+from fastapi import HTTPException
+
+from app import crud, models
+from app.paginacion import ParametrosPagina
+
+
+def _recorrer(db, orden, limit=2, **filtros):
+    vistos = []
+    cursor = None
+    while True:
+        pagina = crud.get_vehiculos(
+            db, ParametrosPagina(cursor=cursor, limit=limit, orden=orden), **filtros
+        )
+        vistos += [v.numero_economico for v in pagina.items]
+        cursor = pagina.siguiente_cursor
+        if not cursor:
+            return vistos
+
+
+def test_paginacion_keyset_vehiculos(db):
+    anios = [2020, None, 2018, 2020, None, 2019]
+    db.add_all([
+        models.Vehiculo(
+            numero_economico=f"ECO-{i}", tipo="pickup", placas=f"PLA-{i}",
+            marca="Ford" if i % 2 else "Nissan", modelo="X", anio=anio,
+        )
+        for i, anio in enumerate(anios)
+    ])
+    db.commit()
+
+    assert _recorrer(db, "id") == [f"ECO-{i}" for i in range(6)]
+    assert _recorrer(db, "anio") == ["ECO-2", "ECO-5", "ECO-0", "ECO-3", "ECO-1", "ECO-4"]
+    assert _recorrer(db, "-anio", limit=4) == ["ECO-3", "ECO-0", "ECO-5", "ECO-2", "ECO-4", "ECO-1"]
+    assert _recorrer(db, "-id", marca="Ford") == ["ECO-5", "ECO-3", "ECO-1"]
+
+
+def test_paginacion_rechaza_orden_no_permitido(db):
+    with pytest.raises(HTTPException) as exc:
+        crud.get_vehiculos(db, ParametrosPagina(limit=10, orden="hashed_password"))
+    assert exc.value.status_code == 400
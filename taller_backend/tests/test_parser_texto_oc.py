@@ -0,0 +1,50 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from app import crud
+from app.parsers import texto_oc
+
+CORPUS = Path(__file__).parent / "fixtures" / "ordenes_compra"
+
+
+def _codigos(resultado):
+    return [a["codigo"] for a in resultado["advertencias"]]
+
+
+@pytest.mark.parametrize("archivo", sorted(CORPUS.glob("*.txt")), ids=lambda p: p.stem)
+def test_corpus_de_ordenes_de_compra(archivo):
+    esperado = json.loads(archivo.with_suffix(".json").read_text(encoding="utf-8"))
+
+    resultado = crud.parsear_oc_desde_texto(archivo.read_text(encoding="utf-8"))
+
+    assert _codigos(resultado) == esperado.pop("advertencias")
+    del resultado["advertencias"]
+    assert resultado == esperado
+
+
+def test_proveedor_se_corta_antes_de_la_siguiente_etiqueta():
+    texto = "PROVEEDOR: LLANTAS DEL BAJIO GIRO: COMERCIO NUMERO 12"
+
+    resultado = texto_oc.parsear_oc(texto)
+
+    assert resultado["proveedor"] == "LLANTAS DEL BAJIO"
+    assert resultado["numero_oc"] == "12"
+    assert _codigos(resultado) == ["sin_fecha", "sin_partidas"]
+
+
+def test_proveedor_con_etiquetas_dentro_del_nombre():
+    casos = {
+        "PROVEEDOR: SUPERFECHA SA DE CV RFC: X": "SUPERFECHA SA DE CV",
+        "PROVEEDOR: AUTOPARTES CANTIDAD SA TELEFONO: 844": "AUTOPARTES CANTIDAD SA",
+        "PROVEEDOR: ORDENA Y RFCX SA CANTIDAD UNIDAD DESCRIPCION": "ORDENA Y RFCX SA",
+    }
+    for texto, esperado in casos.items():
+        assert texto_oc.parsear_oc(texto)["proveedor"] == esperado
+
+
+def test_fecha_acepta_variantes_del_meridiano():
+    for meridiano in ("pm", "p.m.", "P. M.", "PM"):
+        resultado = texto_oc.parsear_oc(f"FECHA DE ELABORACION: 1/12/2023 12:00:01 {meridiano}")
+        assert resultado["fecha"] == "2023-12-01T12:00:01"
@@ -0,0 +1,138 @@
+import shutil
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+from app import crud, deps, models, replica, schemas
+from app.auth_utils import Principal, get_current_active_principal
+from app.cache import snapshots_dashboard
+from app.database import Base
+from app.main import create_app
+
+
+def _bases(tmp_path):
+    """Primaria y réplica como dos archivos SQLite; "replicar" es copiar el archivo."""
+    ruta_primaria, ruta_replica = tmp_path / "primaria.db", tmp_path / "replica.db"
+    primaria = create_engine(f"sqlite:///{ruta_primaria}")
+    Base.metadata.create_all(bind=primaria)
+    lectura = create_engine(f"sqlite:///{ruta_replica}")
+
+    def replicar():
+        primaria.dispose()
+        lectura.dispose()
+        shutil.copy(ruta_primaria, ruta_replica)
+
+    return primaria, lectura, replicar
+
+
+def _request(ruta):
+    return Request({"type": "http", "path": ruta, "headers": []})
+
+
+def test_monitor_usa_la_replica_solo_si_esta_al_dia(tmp_path, monkeypatch):
+    primaria, lectura, replicar = _bases(tmp_path)
+    SesionPrimaria = sessionmaker(bind=primaria)
+    SesionLectura = sessionmaker(bind=lectura)
+
+    with SesionPrimaria() as db:
+        replica.registrar_latido(db)
+        db.add(models.Refaccion(clave="REP-1", descripcion="Replicada"))
+        db.commit()
+    replicar()
+
+    monitor = replica.MonitorReplica(lectura, lag_maximo=10, revision=0)
+    monkeypatch.setattr(deps, "monitor_replica", monitor)
+    monkeypatch.setattr(deps, "SessionLocal", SesionPrimaria)
+    monkeypatch.setattr(deps, "ReadSessionLocal", SesionLectura)
+
+    def leer_claves():
+        dependencia = deps.get_read_db(_request("/reportes/inventario"))
+        db = next(dependencia)
+        try:
+            return db.get_bind() is lectura, [r.clave for r in db.query(models.Refaccion)]
+        finally:
+            dependencia.close()
+
+    assert leer_claves() == (True, ["REP-1"])
+
+    # La primaria recibe una escritura y la réplica deja de avanzar
+    with SesionPrimaria() as db:
+        db.add(models.Refaccion(clave="REP-2", descripcion="Sólo en primaria"))
+        db.commit()
+    futuro = datetime.utcnow() + timedelta(seconds=60)
+    monkeypatch.setattr(replica, "datetime", type("Reloj", (), {"utcnow": staticmethod(lambda: futuro)}))
+
+    assert leer_claves() == (False, ["REP-1", "REP-2"])
+    assert monitor.lag > 10
+    assert (monitor.lecturas_replica, monitor.lecturas_primaria) == (1, 1)
+
+
+def test_sin_latido_no_se_usa_la_replica(tmp_path):
+    _, lectura, replicar = _bases(tmp_path)
+    replicar()
+
+    monitor = replica.MonitorReplica(lectura, lag_maximo=10, revision=60)
+
+    assert replica.medir_lag(lectura) is None
+    assert monitor.disponible() is False
+
+
+def test_latido_primaria_actualiza_la_fila(tmp_path):
+    primaria, _, _ = _bases(tmp_path)
+    SesionPrimaria = sessionmaker(bind=primaria)
+
+    latido = replica.LatidoPrimaria(SesionPrimaria, cada=0.01)
+    latido.iniciar()
+    try:
+        with SesionPrimaria() as db:
+            for _ in range(200):
+                fila = db.get(models.LatidoReplica, 1)
+                if fila is not None:
+                    break
+                latido._detener.wait(0.01)
+    finally:
+        latido.detener()
+
+    assert fila is not None
+    assert replica.medir_lag(primaria) < 5
+
+
+def test_snapshot_del_dashboard_no_se_calcula_en_la_replica(tmp_path, monkeypatch):
+    primaria, lectura, replicar = _bases(tmp_path)
+    SesionPrimaria = sessionmaker(bind=primaria)
+
+    with SesionPrimaria() as db:
+        replica.registrar_latido(db)
+        vehiculo = models.Vehiculo(numero_economico="ECO-1", tipo="Camión", placas="PL-1",
+                                   marca="Nissan", modelo="2020")
+        db.add(vehiculo)
+        db.commit()
+        vehiculo_id = vehiculo.id
+    replicar()
+
+    monkeypatch.setattr(deps, "monitor_replica", replica.MonitorReplica(lectura, lag_maximo=10, revision=0))
+    monkeypatch.setattr(deps, "SessionLocal", SesionPrimaria)
+    monkeypatch.setattr(deps, "ReadSessionLocal", sessionmaker(bind=lectura))
+    monkeypatch.setattr(snapshots_dashboard, "ttl_segundos", 30)
+    snapshots_dashboard.limpiar()
+
+    app = create_app()
+    app.router.on_startup = []
+    app.dependency_overrides[get_current_active_principal] = (
+        lambda: Principal(id=1, username="auditor", activo=True, rol="auditor")
+    )
+    cliente = TestClient(app)
+
+    try:
+        assert cliente.get("/dashboard/general").json()["ordenes_abiertas"] == 0
+
+        # Escritura en la primaria (invalida el snapshot); la réplica no la tiene
+        with SesionPrimaria() as db:
+            crud.create_orden_servicio(db, schemas.OrdenServicioCreate(vehiculo_id=vehiculo_id, estado="abierta"))
+
+        assert cliente.get("/dashboard/general").json()["ordenes_abiertas"] == 1
+    finally:
+        snapshots_dashboard.limpiar()
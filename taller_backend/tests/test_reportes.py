@@ -0,0 +1,123 @@
+from app import crud, models, schemas
+
+
+def _salida(db, os_id, detalles):
+    return crud.create_salida_refaccion(db, schemas.SalidaRefaccionCreate(
+        orden_servicio_id=os_id,
+        entregado_por="Almacén",
+        recibido_por="Mecánico",
+        detalles=[
+            schemas.SalidaDetalleCreate(refaccion_id=ref_id, cantidad=cantidad)
+            for ref_id, cantidad in detalles
+        ],
+    ))
+
+
+def test_refacciones_mas_usadas_top_n_y_filtros(db):
+    veh_a = models.Vehiculo(
+        numero_economico="ECO-1", tipo="pickup", placas="AAA-001",
+        marca="Ford", modelo="Ranger", area_asignada="Parques",
+    )
+    veh_b = models.Vehiculo(
+        numero_economico="ECO-2", tipo="pickup", placas="BBB-002",
+        marca="Ford", modelo="Ranger", area_asignada="Limpieza",
+    )
+    refs = [
+        models.Refaccion(clave=f"REF-{i}", descripcion=f"Refacción {i}")
+        for i in range(3)
+    ]
+    db.add_all([veh_a, veh_b, *refs])
+    db.flush()
+    os_a = models.OrdenServicio(vehiculo_id=veh_a.id)
+    os_b = models.OrdenServicio(vehiculo_id=veh_b.id)
+    db.add_all([os_a, os_b])
+    db.add_all([models.Inventario(refaccion_id=r.id, existencia=50) for r in refs])
+    db.commit()
+
+    _salida(db, os_a.id, [(refs[0].id, 1), (refs[1].id, 5)])
+    _salida(db, os_b.id, [(refs[0].id, 2), (refs[2].id, 4)])
+
+    todas = crud.get_refacciones_mas_usadas(db)
+    assert [(r["clave"], r["total_usado"]) for r in todas] == [
+        ("REF-1", 5), ("REF-2", 4), ("REF-0", 3),
+    ]
+
+    top = crud.get_refacciones_mas_usadas(db, limit=2)
+    assert [r["clave"] for r in top] == ["REF-1", "REF-2"]
+
+    por_vehiculo = crud.get_refacciones_mas_usadas(db, vehiculo_id=veh_b.id)
+    assert [(r["clave"], r["total_usado"]) for r in por_vehiculo] == [
+        ("REF-2", 4), ("REF-0", 2),
+    ]
+
+    por_area = crud.get_refacciones_mas_usadas(db, area_asignada="Parques")
+    assert [r["clave"] for r in por_area] == ["REF-1", "REF-0"]
+
+
+def test_diferencias_y_pendientes_oc(db):
+    refs = [models.Refaccion(clave=f"OC-{i}", descripcion=f"Partida {i}") for i in range(2)]
+    db.add_all(refs)
+    db.commit()
+
+    abierta = crud.create_orden_compra(db, schemas.OrdenCompraCreate(
+        proveedor="Refaccionaria Norte",
+        detalles=[
+            schemas.OrdenCompraDetalleCreate(refaccion_id=refs[0].id, cantidad=10),
+            schemas.OrdenCompraDetalleCreate(refaccion_id=refs[1].id, cantidad=4),
+        ],
+    ))
+    cerrada = crud.create_orden_compra(db, schemas.OrdenCompraCreate(
+        proveedor="Refaccionaria Sur",
+        estado="cerrada",
+        detalles=[schemas.OrdenCompraDetalleCreate(refaccion_id=refs[0].id, cantidad=3)],
+    ))
+
+    for cantidad in (4, 2):
+        crud.create_recepcion(db, schemas.RecepcionCreate(
+            oc_id=abierta.id,
+            recibido_por="Almacén",
+            detalles=[schemas.RecepcionDetalleCreate(refaccion_id=refs[0].id, cantidad_recibida=cantidad)],
+        ))
+    crud.create_recepcion(db, schemas.RecepcionCreate(
+        oc_id=abierta.id,
+        recibido_por="Almacén",
+        detalles=[schemas.RecepcionDetalleCreate(refaccion_id=refs[1].id, cantidad_recibida=4)],
+    ))
+
+    diferencias = crud.get_diferencias_oc(db, abierta.id)
+    assert [(d["clave"], d["recibido"], d["diferencia"]) for d in diferencias] == [
+        ("OC-0", 6, 4), ("OC-1", 4, 0),
+    ]
+
+    pendientes = crud.get_pendientes_oc(db)
+    assert [p["oc_id"] for p in pendientes] == [abierta.id]
+    assert [(p["clave"], p["pendiente"]) for p in pendientes[0]["partidas"]] == [("OC-0", 4)]
+
+    por_id = crud.get_pendientes_oc(db, [abierta.id, cerrada.id])
+    assert [p["oc_id"] for p in por_id] == [abierta.id, cerrada.id]
+
+
+def test_bajo_inventario_con_umbrales_por_refaccion(db):
+    refs = [models.Refaccion(clave=f"INV-{i}", descripcion=f"Pieza {i}") for i in range(3)]
+    db.add_all(refs)
+    db.flush()
+    db.add_all([
+        models.Inventario(refaccion_id=refs[0].id, existencia=3),
+        models.Inventario(refaccion_id=refs[1].id, existencia=8),
+        models.Inventario(refaccion_id=refs[2].id, existencia=20),
+    ])
+    db.commit()
+
+    assert [r["clave"] for r in crud.get_bajo_inventario(db)] == ["INV-0"]
+
+    crud.actualizar_umbrales_inventario(
+        db, refs[1].id, schemas.InventarioUmbrales(stock_minimo=10, stock_maximo=30)
+    )
+    crud.actualizar_umbrales_inventario(
+        db, refs[0].id, schemas.InventarioUmbrales(stock_minimo=2)
+    )
+
+    bajos = crud.get_bajo_inventario(db)
+    assert [(r["clave"], r["stock_minimo"]) for r in bajos] == [("INV-1", 10)]
+    assert crud.contar_bajo_inventario(db) == 1
+    assert crud.contar_bajo_inventario(db, minimo=25) == 2
@@ -0,0 +1,128 @@
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app import crud, models, schemas
+from tests.conftest import TestingSessionLocal
+
+
+def _salida(os_id, detalles):
+    return schemas.SalidaRefaccionCreate(
+        orden_servicio_id=os_id,
+        entregado_por="Almacén",
+        recibido_por="Técnico",
+        detalles=[
+            schemas.SalidaDetalleCreate(refaccion_id=ref_id, cantidad=cantidad)
+            for ref_id, cantidad in detalles
+        ],
+    )
+
+
+def _preparar(db, existencias):
+    vehiculo = models.Vehiculo(
+        numero_economico="ECO-1", tipo="Camión", placas="AAA-001",
+        marca="Marca", modelo="Modelo"
+    )
+    db.add(vehiculo)
+    db.flush()
+    orden = models.OrdenServicio(vehiculo_id=vehiculo.id)
+    refs = [models.Refaccion(clave=f"SAL-{i}", descripcion=f"Pieza {i}") for i in range(len(existencias))]
+    db.add_all([orden, *refs])
+    db.flush()
+    db.add_all([
+        models.Inventario(refaccion_id=ref.id, existencia=existencia)
+        for ref, existencia in zip(refs, existencias)
+    ])
+    db.commit()
+    return orden, refs
+
+
+def _lanzar_en_paralelo(salidas):
+    """Ejecuta cada salida en su propio hilo y sesión; devuelve (exitos, rechazos)."""
+    barrera = threading.Barrier(len(salidas))
+    exitos, rechazos, errores = [], [], []
+
+    def trabajar(salida_in):
+        session = TestingSessionLocal()
+        try:
+            barrera.wait()
+            crud.create_salida_refaccion(session, salida_in)
+            exitos.append(salida_in)
+        except HTTPException:
+            rechazos.append(salida_in)
+        except Exception as exc:
+            errores.append(exc)
+        finally:
+            session.close()
+
+    hilos = [threading.Thread(target=trabajar, args=(s,)) for s in salidas]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert errores == []
+    return exitos, rechazos
+
+
+def _existencias(db):
+    db.expire_all()
+    return {i.refaccion_id: i.existencia for i in db.query(models.Inventario)}
+
+
+def test_salidas_concurrentes_no_dejan_existencia_negativa(db):
+    orden, refs = _preparar(db, [10])
+
+    exitos, rechazos = _lanzar_en_paralelo([
+        _salida(orden.id, [(refs[0].id, 1)]) for _ in range(25)
+    ])
+
+    assert len(exitos) == 10
+    assert len(rechazos) == 15
+    assert _existencias(db) == {refs[0].id: 0}
+    assert db.query(models.SalidaRefaccion).count() == 10
+    assert db.query(models.MovimientoInventario).count() == 10
+
+
+def test_salidas_concurrentes_con_orden_inverso_de_partidas(db):
+    orden, refs = _preparar(db, [6, 6])
+    a, b = refs[0].id, refs[1].id
+
+    salidas = [
+        _salida(orden.id, [(a, 1), (b, 1)]) if i % 2 else _salida(orden.id, [(b, 1), (a, 1)])
+        for i in range(10)
+    ]
+    exitos, rechazos = _lanzar_en_paralelo(salidas)
+
+    assert len(exitos) == 6
+    assert _existencias(db) == {a: 0, b: 0}
+
+    salidas_kardex = db.query(models.MovimientoInventario).filter(
+        models.MovimientoInventario.tipo == "salida"
+    ).count()
+    assert salidas_kardex == 2 * len(exitos)
+
+
+def test_salida_sin_existencia_suficiente_no_escribe_nada(db):
+    orden, refs = _preparar(db, [5, 1])
+
+    with pytest.raises(HTTPException) as exc:
+        crud.create_salida_refaccion(db, _salida(orden.id, [(refs[0].id, 2), (refs[1].id, 3)]))
+
+    assert exc.value.status_code == 400
+    assert _existencias(db) == {refs[0].id: 5, refs[1].id: 1}
+    assert db.query(models.SalidaRefaccion).count() == 0
+    assert db.query(models.SalidaDetalle).count() == 0
+    assert db.query(models.MovimientoInventario).count() == 0
+
+
+def test_salida_con_cantidad_negativa_se_rechaza(db):
+    orden, refs = _preparar(db, [5])
+
+    with pytest.raises(HTTPException) as exc:
+        crud.create_salida_refaccion(db, _salida(orden.id, [(refs[0].id, -3)]))
+
+    assert exc.value.status_code == 400
+    assert _existencias(db) == {refs[0].id: 5}
+    assert db.query(models.MovimientoInventario).count() == 0
@@ -0,0 +1,54 @@
+from app import crud, models, schemas
+from tests.conftest import ContadorConsultas
+
+
+def _orden_con_movimientos(db, num_solicitudes):
+    veh = models.Vehiculo(numero_economico="ECO-9", tipo="camión", placas="CCC-9", marca="Isuzu", modelo="ELF")
+    refs = [models.Refaccion(clave=f"UI-{i}", descripcion=f"Refacción {i}") for i in range(3)]
+    db.add_all([veh, *refs])
+    db.flush()
+    orden = models.OrdenServicio(vehiculo_id=veh.id)
+    db.add(orden)
+    db.add_all([models.Inventario(refaccion_id=r.id, existencia=100) for r in refs])
+    db.commit()
+
+    _agregar_movimientos(db, orden.id, num_solicitudes)
+    return orden
+
+
+def _agregar_movimientos(db, os_id, num_solicitudes):
+    refs = db.query(models.Refaccion).all()
+    for _ in range(num_solicitudes):
+        crud.create_solicitud_refaccion(db, schemas.SolicitudRefaccionCreate(
+            orden_servicio_id=os_id,
+            solicitante="Mecánico",
+            detalles=[schemas.SolicitudDetalleCreate(refaccion_id=r.id, cantidad=1) for r in refs],
+        ))
+        crud.create_salida_refaccion(db, schemas.SalidaRefaccionCreate(
+            orden_servicio_id=os_id,
+            entregado_por="Almacén",
+            recibido_por="Mecánico",
+            detalles=[schemas.SalidaDetalleCreate(refaccion_id=r.id, cantidad=1) for r in refs],
+        ))
+
+
+def _consultas_os(db, os_id):
+    db.expire_all()
+    with ContadorConsultas(db.get_bind()) as contador:
+        detalle = crud.get_os_detallada(db, os_id)
+        schemas.OrdenServicioDetallada.model_validate(detalle)
+    return contador.total
+
+
+def test_os_detallada_en_consultas_fijas(db):
+    orden = _orden_con_movimientos(db, 1)
+    consultas_iniciales = _consultas_os(db, orden.id)
+    assert consultas_iniciales <= 5
+
+    _agregar_movimientos(db, orden.id, 7)
+
+    assert _consultas_os(db, orden.id) == consultas_iniciales
+
+
+def test_os_detallada_inexistente(db):
+    assert crud.get_os_detallada(db, 999) is None
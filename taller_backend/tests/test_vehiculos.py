@@ -1,3 +1,12 @@
+import io
+
+import openpyxl
+import pandas as pd
+
+from app import crud, models
+from app.parsers.excel import tabla_excel
+
+
 def test_listar_vehiculos(client):
     # Crear un vehículo
     data = {
@@ -21,3 +30,65 @@ def test_listar_vehiculos(client):
     # Validar contenido
     assert vehiculos[0]["placas"] == "AAA-111"
     assert vehiculos[0]["marca"] == "Nissan"
+
+
+def _fila(economico, placas, serie=None, anio=2020):
+    return {
+        "numero_economico": economico, "tipo": "Camión", "placas": placas,
+        "marca": "Nissan", "modelo": "NP300", "anio": anio,
+        "numero_serie": serie, "area_asignada": None,
+    }
+
+
+def test_importar_vehiculos_deduplica_y_reporta_todo(db):
+    db.add(models.Vehiculo(
+        numero_economico="E-1", tipo="Camión", placas="EXISTE", marca="Nissan", modelo="NP300"
+    ))
+    db.commit()
+
+    df = pd.DataFrame([
+        _fila("E-2", "P-2", "S-2"),
+        _fila("E-2", "P-3"),              # economico repetido en el archivo
+        _fila("E-4", "EXISTE"),           # placas ya en la base
+        _fila("E-5", "P-5", anio="abc"),  # anio inválido
+        _fila(" ", "P-6"),                # economico vacío
+        _fila("E-7", "P-7", "  "),        # serie vacía -> NULL
+        _fila("E-8", "P-8"),
+    ])
+
+    resultado = crud.importar_vehiculos_desde_dataframe(db, df)
+
+    assert resultado["creados"] == 3
+    assert resultado["duplicados"] == 2
+    assert [(e["fila_excel"], e["tipo"]) for e in resultado["errores"]] == [
+        (3, "duplicado"), (4, "duplicado"), (5, "error"), (6, "error"),
+    ]
+
+    series = dict(db.query(models.Vehiculo.numero_economico, models.Vehiculo.numero_serie))
+    assert series == {"E-1": None, "E-2": "S-2", "E-7": None, "E-8": None}
+    assert db.query(models.Vehiculo.anio).filter_by(numero_economico="E-8").scalar() == 2020
+
+
+def test_importar_vehiculos_desde_excel_en_streaming(db):
+    libro = openpyxl.Workbook()
+    hoja = libro.active
+    hoja.append(["placas", "numero_economico", "notas", "tipo", "marca", "modelo",
+                 "anio", "numero_serie", "area_asignada"])
+    hoja.append(["P-1", "E-1", "x", "Camión", "Nissan", "NP300", 2019, "S-1", "Norte"])
+    hoja.append([None] * 9)                                  # vacía intermedia: se reporta
+    hoja.append(["P-3", "E-3", None, "Pickup", "Ford", "Ranger", 2021, None, None])
+    hoja.append([None] * 9)                                  # vacías finales: se descartan
+    hoja.append([None, None, "sin datos del vehículo"])
+    contenido = io.BytesIO()
+    libro.save(contenido)
+
+    df = tabla_excel(contenido.getvalue(), crud.COLUMNAS_IMPORTACION_VEHICULOS)
+
+    assert list(df.columns) == [c for c in crud.COLUMNAS_IMPORTACION_VEHICULOS if c != "notas"]
+    assert len(df) == 3
+
+    resultado = crud.importar_vehiculos_desde_dataframe(db, df)
+
+    assert resultado["creados"] == 2
+    assert [(e["fila_excel"], e["tipo"]) for e in resultado["errores"]] == [(3, "error")]
+    assert db.query(models.Vehiculo.anio).filter_by(numero_economico="E-3").scalar() == 2021
@@ -32,3 +32,19 @@ api.interceptors.response.use(
 );
 
 export default api;
+
+// Recorre todas las páginas de un listado paginado por cursor (header X-Next-Cursor)
+export async function getAllPages(url, params = {}) {
+  const items = [];
+  let cursor = null;
+
+  do {
+    const res = await api.get(url, {
+      params: { ...params, limit: 1000, ...(cursor ? { cursor } : {}) },
+    });
+    items.push(...res.data);
+    cursor = res.headers["x-next-cursor"];
+  } while (cursor);
+
+  return items;
+}
@@ -1,11 +1,28 @@
-import api from "./api";
+import api, { getAllPages } from "./api";
 
 const BASE = "/ordenes_compra/";
 
+const INTERVALO_SONDEO_MS = 1000;
+
+// Excel y PDF se importan en segundo plano: el POST devuelve un job_id y
+// aquí se consulta su estado hasta que termina.
+async function esperarImportacion(jobId) {
+  for (;;) {
+    const res = await api.get(`${BASE}importaciones/${jobId}`);
+    const trabajo = res.data;
+
+    if (trabajo.estado === "completado") return trabajo;
+    if (trabajo.estado === "error") {
+      throw new Error(trabajo.error || "Error al importar la orden de compra");
+    }
+
+    await new Promise((resolve) => setTimeout(resolve, INTERVALO_SONDEO_MS));
+  }
+}
+
 const ordenesCompraService = {
   getAll: async () => {
-    const res = await api.get(BASE);
-    return res.data;
+    return getAllPages(BASE);
   },
 
   create: async (data) => {
@@ -28,7 +45,7 @@ const ordenesCompraService = {
       headers: { "Content-Type": "multipart/form-data" },
     });
 
-    return res.data;
+    return esperarImportacion(res.data.job_id);
   },
 
   // Importar desde PDF real (binario)
@@ -40,6 +57,24 @@ const ordenesCompraService = {
       headers: { "Content-Type": "multipart/form-data" },
     });
 
+    return esperarImportacion(res.data.job_id);
+  },
+
+  // Importar varios PDF/Excel (o .zip) en una sola petición
+  importarLote: async (files) => {
+    const formData = new FormData();
+    for (const file of files) formData.append("files", file);
+
+    const res = await api.post(`${BASE}importar_lote/`, formData, {
+      headers: { "Content-Type": "multipart/form-data" },
+    });
+
+    return res.data;
+  },
+
+  // Estado de una importación en segundo plano
+  getImportacion: async (jobId) => {
+    const res = await api.get(`${BASE}importaciones/${jobId}`);
     return res.data;
   },
 };
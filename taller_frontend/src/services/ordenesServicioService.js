@@ -1,9 +1,8 @@
-import api from "./api";
+import api, { getAllPages } from "./api";
 
 const ordenesServicioService = {
   getAll: async () => {
-    const res = await api.get("/ordenes_servicio/");
-    return res.data;
+    return getAllPages("/ordenes_servicio/");
   },
 
   create: async (data) => {
@@ -1,11 +1,10 @@
-import api from "./api";
+import api, { getAllPages } from "./api";
 
 const BASE = "/recepciones/";
 
 const recepcionesService = {
   getAll: async () => {
-    const res = await api.get(BASE);
-    return res.data;
+    return getAllPages(BASE);
   },
 
   create: async (data) => {
@@ -1,12 +1,11 @@
-import api from "./api";
+import api, { getAllPages } from "./api";
 
 const BASE = "/vehiculos/";
 
 const vehiculosService = {
   // Obtener todos los vehículos
   getAll: async () => {
-    const res = await api.get(BASE);
-    return res.data;
+    return getAllPages(BASE);
   },
 
   // Crear un vehículo